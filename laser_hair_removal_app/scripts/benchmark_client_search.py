@@ -0,0 +1,77 @@
+"""Benchmark typeahead client search: FTS5 prefix match versus LIKE '%term%'.
+
+Usage: python -m scripts.benchmark_client_search [clients]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import unicodedata
+from src.backend.client_manager import ClientManager
+from src.database.db_operations import ConnectionManager
+from scripts.benchmark_transactions import _setup_database
+
+FIRST_NAMES = ["Anna", "Małgorzata", "Katarzyna", "Agnieszka", "Żaneta", "Łucja", "Ewa", "Zofia",
+               "Jadwiga", "Bożena", "Grażyna", "Joanna", "Paweł", "Łukasz", "Michał", "Piotr"]
+LAST_NAMES = ["Nowak", "Kowalska", "Wiśniewska", "Wójcik", "Kamińska", "Lewandowska", "Zielińska",
+              "Szymańska", "Woźniak", "Dąbrowska", "Kozłowska", "Jankowska", "Mazur", "Napierała",
+              "Krawczyk", "Piotrowska", "Grabowska", "Pawłowska", "Michalska", "Król", "Wieczorek",
+              "Jabłońska", "Wróbel", "Nowakowska", "Majewska", "Olszewska", "Stępień", "Jaworska"]
+# What staff type while a name is being looked up: growing prefixes, no diacritics
+TYPEAHEAD_TERMS = ["na", "nap", "napi", "napierala", "ko", "kowal", "kowalska a", "zof", "wozn",
+                   "lukasz", "grazyna kozl", "500 012", "+48 500 01", "jablonska7"]
+
+def _ascii(text: str) -> str:
+    """Strip Polish diacritics for synthetic email addresses."""
+    text = text.replace('ł', 'l').replace('Ł', 'L')
+    return unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode().lower()
+
+def _client_rows(count: int) -> list:
+    """Build synthetic (full_name, phone_number, email, dob) rows with unique phones/emails."""
+    rng = random.Random(42)
+    rows = []
+    for i in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        email = f"{_ascii(first)}.{_ascii(last)}{i}@example.com"
+        rows.append((f"{first} {last}", f"+48 {500000000 + i}", email, "1990-01-01"))
+    return rows
+
+def _time_ms(search, term: str, repeats: int) -> list:
+    """Return per-call timings of search(term) in milliseconds."""
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        search(term)
+        timings.append((time.perf_counter() - started) * 1000)
+    return sorted(timings)
+
+def run_benchmark(clients: int = 100000, limit: int = 20, repeats: int = 20) -> dict:
+    """Return p50/p95/max ms per typeahead term for FTS and LIKE search."""
+    with tempfile.TemporaryDirectory() as work_dir:
+        db = _setup_database(work_dir, 'search.db')
+        db.add_clients_bulk(_client_rows(clients))
+        manager = ClientManager(os.path.join(work_dir, 'secrets.yaml'), os.path.join(work_dir, 'search.db'))
+        like_query = "SELECT * FROM clients WHERE full_name LIKE ? AND is_active = TRUE LIMIT ?"
+        results = {}
+        for term in TYPEAHEAD_TERMS:
+            fts = _time_ms(lambda t: manager.search_clients(t, limit=limit), term, repeats)
+            like = _time_ms(lambda t: db.execute_query(like_query, (f"%{t}%", limit)), term, repeats)
+            results[term] = {
+                'fts_p50_ms': fts[len(fts) // 2],
+                'fts_p95_ms': fts[int(len(fts) * 0.95) - 1],
+                'fts_max_ms': fts[-1],
+                'like_p50_ms': like[len(like) // 2],
+                'matches': len(manager.search_clients(term, limit=limit))
+            }
+        ConnectionManager.close_all_managers()
+    return {'clients': clients, 'limit': limit, 'terms': results}
+
+if __name__ == "__main__":
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    result = run_benchmark(clients)
+    print(f"{result['clients']} clients, top {result['limit']} per search")
+    print(f"  {'term':<14} {'fts p50':>8} {'fts p95':>8} {'fts max':>8} {'like p50':>9} {'hits':>5}")
+    for term, row in result['terms'].items():
+        print(f"  {term:<14} {row['fts_p50_ms']:8.2f} {row['fts_p95_ms']:8.2f} {row['fts_max_ms']:8.2f} "
+              f"{row['like_p50_ms']:9.2f} {row['matches']:>5}")
@@ -0,0 +1,122 @@
+"""Benchmark EmailSender with a new SMTP session per message versus one pooled session.
+
+Runs against a local SMTP stand-in that delays the greeting and AUTH the way a
+real server's TLS handshake and login do, so no mail leaves the machine.
+
+Usage: python -m scripts.benchmark_email [messages] [setup_ms]
+"""
+import base64
+import os
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from src.utils.email_sender import EmailSender
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Minimal SMTP dialogue: accepts any login and discards the messages."""
+
+    def _reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode('ascii'))
+
+    def handle(self):
+        time.sleep(self.server.setup_seconds)
+        self._reply("220 localhost stand-in ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('ascii', 'replace').strip()
+            verb = command.split(' ', 1)[0].upper()
+            if verb == 'EHLO':
+                self._reply("250-localhost")
+                self._reply("250 AUTH PLAIN LOGIN")
+            elif verb == 'AUTH':
+                time.sleep(self.server.setup_seconds)
+                if command.upper().startswith('AUTH LOGIN'):
+                    # smtplib sends the username with the command and the password on request
+                    self._reply(f"334 {base64.b64encode(b'Password:').decode('ascii')}")
+                    self.rfile.readline()
+                self._reply("235 Authentication successful")
+            elif verb == 'DATA':
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                self.server.received += 1
+                self._reply("250 OK")
+            elif verb == 'QUIT':
+                self._reply("221 Bye")
+                return
+            elif verb in ('HELO', 'MAIL', 'RCPT', 'RSET', 'NOOP'):
+                self._reply("250 OK")
+            else:
+                self._reply("502 Command not implemented")
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    """Local SMTP server on a free port; setup_seconds is charged on connect and on AUTH."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, setup_seconds: float = 0.02):
+        super().__init__(('127.0.0.1', 0), _SMTPHandler)
+        self.setup_seconds = setup_seconds
+        self.received = 0
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+def _make_sender(work_dir: str, port: int, idle_seconds: float) -> EmailSender:
+    """Write config and secrets pointing at the stand-in and build a sender."""
+    config_path = os.path.join(work_dir, f'app_config_{idle_seconds}.yaml')
+    secrets_path = os.path.join(work_dir, 'secrets.yaml')
+    with open(config_path, 'w') as f:
+        f.write(f"notifications:\n  smtp_starttls: false\n  smtp_idle_seconds: {idle_seconds}\n")
+    with open(secrets_path, 'w') as f:
+        f.write("database:\n  encryption_key: benchmarkkey1234567890123456789012\n"
+                f"notifications:\n  smtp:\n    host: 127.0.0.1\n    port: {port}\n"
+                "    username: benchmark\n    password: benchmark\n")
+    return EmailSender(config_path, secrets_path)
+
+def run_benchmark(messages: int = 80, setup_ms: float = 20.0) -> dict:
+    """Return messages/sec and sender stats for per-message sessions and for send_batch."""
+    server = SMTPStandIn(setup_ms / 1000)
+    batch = [(f"client{i}@example.com", "Appointment Reminder", f"Your appointment is tomorrow ({i}).")
+             for i in range(messages)]
+    try:
+        with tempfile.TemporaryDirectory() as work_dir:
+            # idle_seconds=0 drops the session before every message, like the old sender
+            per_message = _make_sender(work_dir, server.server_address[1], 0)
+            started = time.perf_counter()
+            for to_email, subject, message in batch:
+                per_message.send_email(to_email, subject, message)
+            per_message_seconds = time.perf_counter() - started
+            per_message.close()
+
+            pooled = _make_sender(work_dir, server.server_address[1], 60)
+            started = time.perf_counter()
+            errors = pooled.send_batch(batch)
+            pooled_seconds = time.perf_counter() - started
+            pooled.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    return {
+        'messages': messages,
+        'received': server.received,
+        'failed': sum(1 for error in errors if error is not None),
+        'per_message_per_sec': messages / per_message_seconds,
+        'pooled_per_sec': messages / pooled_seconds,
+        'speedup': per_message_seconds / pooled_seconds,
+        'per_message_stats': per_message.stats(),
+        'pooled_stats': pooled.stats()
+    }
+
+if __name__ == "__main__":
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 80
+    setup_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 20.0
+    result = run_benchmark(messages, setup_ms)
+    print(f"{result['messages']} emails, {setup_ms:.0f} ms connect/login delay, {result['received']} received")
+    print(f"  session per message: {result['per_message_per_sec']:8.1f} msg/sec  {result['per_message_stats']}")
+    print(f"  pooled send_batch:   {result['pooled_per_sec']:8.1f} msg/sec  {result['pooled_stats']}")
+    print(f"  speedup:             {result['speedup']:8.1f}x")
@@ -0,0 +1,113 @@
+"""Benchmark SMSSender one message at a time versus send_many on the worker pool.
+
+Runs against a local HTTP stub gateway that answers POST /send after a fixed
+delay, so no SMS leaves the machine. The rate limit is disabled for the
+comparison; a last run with a small quota shows the token bucket holding it.
+
+Usage: python -m scripts.benchmark_sms [messages] [latency_ms]
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.utils.sms_sender import SMSSender
+
+class _GatewayHandler(BaseHTTPRequestHandler):
+    """Accepts every message after the configured latency."""
+
+    protocol_version = 'HTTP/1.1'  # keep-alive, like a real gateway
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(self.server.latency_seconds)
+        with self.server.lock:
+            self.server.received += 1
+        body = json.dumps({'success': True}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class GatewayStub(ThreadingHTTPServer):
+    """Local SMS gateway on a free port."""
+
+    daemon_threads = True
+
+    def __init__(self, latency_seconds: float = 0.05):
+        super().__init__(('127.0.0.1', 0), _GatewayHandler)
+        self.latency_seconds = latency_seconds
+        self.received = 0
+        self.lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+def _make_sender(work_dir: str, port: int, workers: int, rate: float, burst: float = 1) -> SMSSender:
+    """Write config and secrets pointing at the stub and build a sender."""
+    config_path = os.path.join(work_dir, f'app_config_{workers}_{rate}.yaml')
+    secrets_path = os.path.join(work_dir, 'secrets.yaml')
+    with open(config_path, 'w') as f:
+        f.write(f"notifications:\n  sms_gateway: http://127.0.0.1:{port}\n  sms_max_workers: {workers}\n"
+                f"  sms_rate_per_second: {rate}\n  sms_burst: {burst}\nsms_api_key: benchmark\n")
+    with open(secrets_path, 'w') as f:
+        f.write("database:\n  encryption_key: benchmarkkey1234567890123456789012\n")
+    return SMSSender(config_path, secrets_path)
+
+def _timed(send) -> float:
+    """Return the seconds send() took."""
+    started = time.perf_counter()
+    send()
+    return time.perf_counter() - started
+
+def run_benchmark(messages: int = 80, latency_ms: float = 50.0, workers: int = 8) -> dict:
+    """Return messages/sec and sender stats for sequential sends, send_many and a rate-limited send_many."""
+    server = GatewayStub(latency_ms / 1000)
+    batch = [(f"+48600{i:06d}", f"Your appointment is tomorrow ({i}).") for i in range(messages)]
+    quota = 20.0
+    try:
+        with tempfile.TemporaryDirectory() as work_dir:
+            port = server.server_address[1]
+            sequential = _make_sender(work_dir, port, 1, 0)
+            sequential_seconds = _timed(lambda: [sequential.send_sms(to, text) for to, text in batch])
+            sequential.close()
+
+            pooled = _make_sender(work_dir, port, workers, 0)
+            errors = []
+            pooled_seconds = _timed(lambda: errors.extend(pooled.send_many(batch)))
+            pooled.close()
+
+            limited = _make_sender(work_dir, port, workers, quota)
+            limited_seconds = _timed(lambda: errors.extend(limited.send_many(batch)))
+            limited.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    return {
+        'messages': messages,
+        'received': server.received,
+        'failed': sum(1 for error in errors if error is not None),
+        'sequential_per_sec': messages / sequential_seconds,
+        'pooled_per_sec': messages / pooled_seconds,
+        'limited_per_sec': messages / limited_seconds,
+        'quota_per_sec': quota,
+        'speedup': sequential_seconds / pooled_seconds,
+        'sequential_stats': sequential.stats(),
+        'pooled_stats': pooled.stats(),
+        'limited_stats': limited.stats()
+    }
+
+if __name__ == "__main__":
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 80
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 50.0
+    result = run_benchmark(messages, latency_ms)
+    print(f"{result['messages']} SMS, {latency_ms:.0f} ms gateway latency, {result['received']} received")
+    print(f"  one at a time:     {result['sequential_per_sec']:8.1f} msg/sec  {result['sequential_stats']}")
+    print(f"  send_many:         {result['pooled_per_sec']:8.1f} msg/sec  {result['pooled_stats']}")
+    print(f"  send_many, {result['quota_per_sec']:.0f}/s:  {result['limited_per_sec']:8.1f} msg/sec  {result['limited_stats']}")
+    print(f"  speedup:           {result['speedup']:8.1f}x")
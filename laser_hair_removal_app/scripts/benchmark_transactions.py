@@ -0,0 +1,54 @@
+"""Benchmark client inserts with per-statement commits versus one unit of work.
+
+Usage: python -m scripts.benchmark_transactions [rows]
+"""
+import os
+import sys
+import tempfile
+import time
+from src.database.db_operations import DatabaseOperations, ConnectionManager
+
+def _setup_database(work_dir: str, name: str) -> DatabaseOperations:
+    """Create a fresh encrypted database with the current schema."""
+    secrets_path = os.path.join(work_dir, 'secrets.yaml')
+    if not os.path.exists(secrets_path):
+        with open(secrets_path, 'w') as f:
+            f.write("database:\n  encryption_key: benchmarkkey1234567890123456789012\n")
+    db = DatabaseOperations(secrets_path, os.path.join(work_dir, name))
+    db.initialize_database()
+    return db
+
+def _insert_clients(db: DatabaseOperations, rows: int, offset: int = 0) -> None:
+    """Insert synthetic clients through the regular CRUD method."""
+    for i in range(offset, offset + rows):
+        db.add_client(f"Client {i}", f"{500000000 + i}", f"client{i}@example.com", "1990-01-01")
+
+def run_benchmark(rows: int = 10000) -> dict:
+    """Return rows/sec for autocommitted inserts and for a single transaction."""
+    with tempfile.TemporaryDirectory() as work_dir:
+        db = _setup_database(work_dir, 'autocommit.db')
+        started = time.perf_counter()
+        _insert_clients(db, rows)
+        autocommit_seconds = time.perf_counter() - started
+
+        db = _setup_database(work_dir, 'transaction.db')
+        started = time.perf_counter()
+        with db.transaction():
+            _insert_clients(db, rows)
+        transaction_seconds = time.perf_counter() - started
+        ConnectionManager.close_all_managers()
+
+    return {
+        'rows': rows,
+        'autocommit_rows_per_sec': rows / autocommit_seconds,
+        'transaction_rows_per_sec': rows / transaction_seconds,
+        'speedup': autocommit_seconds / transaction_seconds
+    }
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    result = run_benchmark(rows)
+    print(f"{result['rows']} inserts")
+    print(f"  commit per row:   {result['autocommit_rows_per_sec']:10.0f} rows/sec")
+    print(f"  one transaction:  {result['transaction_rows_per_sec']:10.0f} rows/sec")
+    print(f"  speedup:          {result['speedup']:10.1f}x")
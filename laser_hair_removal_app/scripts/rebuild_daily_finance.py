@@ -0,0 +1,12 @@
+"""Regenerate the daily_finance rollup from appointments and expenses.
+
+Usage: python -m scripts.rebuild_daily_finance [secrets_path] [db_path]
+"""
+import sys
+from src.backend.finance_manager import FinanceManager
+
+if __name__ == "__main__":
+    secrets_path = sys.argv[1] if len(sys.argv) > 1 else "config/secrets.yaml"
+    db_path = sys.argv[2] if len(sys.argv) > 2 else "data/database.db"
+    days = FinanceManager(secrets_path, db_path).rebuild_daily_finance()
+    print(f"Rebuilt daily_finance: {days} days")
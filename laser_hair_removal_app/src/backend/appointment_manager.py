@@ -1,51 +1,67 @@
+from src.backend.outbox import Outbox
 from src.database.db_operations import DatabaseOperations
 from src.models.appointment import Appointment
 from src.models.client import Client
-from src.utils.calendar_sync import CalendarSync
-from src.utils.email_sender import EmailSender
-from src.utils.sms_sender import SMSSender
 import logging
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Iterator, List, Optional
 
 class AppointmentManager:
     """Manages appointment-related operations for the laser hair removal application."""
     
+    SLOT_FORMAT = '%Y-%m-%d %H:%M'
+    DEFAULT_HARDWARE_ID = 1
+    WEEKDAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+    DEFAULT_OPENING_HOURS = {day: ["09:00", "18:00"] for day in WEEKDAYS[:5]}
+    RESCHEDULE_STRATEGIES = ('earliest', 'same_time')
+    
     def __init__(self, config_path: str, db_path: str):
         """Initialize with database configuration and path."""
         self.db = DatabaseOperations(config_path, db_path)
         self.logger = logging.getLogger(__name__)
-        self.calendar_sync = CalendarSync(config_path)
-        self.email_sender = EmailSender(config_path)
-        self.sms_sender = SMSSender(config_path)
+        self.outbox = Outbox(self.db)
     
     def schedule_appointment(self, client_id: int, service_id: int, area_id: int, 
                             appointment_date: str, session_number: int, power: float = None, 
-                            amount: float = None, payment_method_id: int = None) -> int:
-        """Schedule a new appointment and return the appointment_id."""
+                            amount: float = None, payment_method_id: int = None, start_time: str = None,
+                            duration_minutes: int = None, hardware_id: int = DEFAULT_HARDWARE_ID) -> int:
+        """Schedule a new appointment and return the appointment_id.
+        
+        With start_time ('HH:MM') the appointment occupies the machine for
+        duration_minutes (e.g. TreatmentArea.estimated_duration_minutes) or
+        the service's duration, and overlapping bookings are rejected.
+        """
         try:
-            client = self._get_client(client_id)
-            if not client or not client.is_active:
-                raise ValueError("Client is inactive or not found")
-            
-            # Validate visit spacing
-            previous_appointment = self.get_previous_appointment(client_id, area_id)
-            new_appointment = Appointment(0, client_id, service_id, area_id, appointment_date, session_number, power, amount=amount, payment_method_id=payment_method_id)
-            if previous_appointment and not new_appointment.validate_visit_spacing(previous_appointment):
-                raise ValueError("Insufficient waiting period since last appointment")
+            with self.db.transaction():
+                client = self._get_client(client_id)
+                if not client or not client.is_active:
+                    raise ValueError("Client is inactive or not found")
+                
+                # Validate visit spacing
+                previous_appointment = self.get_previous_appointment(client_id, area_id)
+                new_appointment = Appointment(0, client_id, service_id, area_id, appointment_date, session_number, power, amount=amount, payment_method_id=payment_method_id)
+                if previous_appointment and not new_appointment.validate_visit_spacing(previous_appointment):
+                    raise ValueError("Insufficient waiting period since last appointment")
+                
+                slot_start = slot_end = None
+                if start_time:
+                    slot_start, slot_end = self.slot_bounds(appointment_date, start_time, service_id, duration_minutes)
+                    self._ensure_slot_free(hardware_id, slot_start, slot_end)
+                
+                # Insert appointment
+                query = """
+                    INSERT INTO appointments (client_id, service_id, area_id, appointment_date, session_number_for_area, power, 
+                    appointment_status, amount, payment_method_id, start_time, end_time, hardware_id)
+                    VALUES (?, ?, ?, ?, ?, ?, 'Scheduled', ?, ?, ?, ?, ?)
+                """
+                params = (client_id, service_id, area_id, appointment_date, session_number, power, amount, payment_method_id,
+                          slot_start, slot_end, hardware_id)
+                self.db.execute_query(query, params)
+                appointment_id = self.db.conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                
+                # Calendar sync and reminder are queued with the booking and sent in the background
+                self._queue_sync_and_notify(appointment_id, appointment_date, client, slot_start, slot_end)
             
-            # Insert appointment
-            query = """
-                INSERT INTO appointments (client_id, service_id, area_id, appointment_date, session_number_for_area, power, 
-                appointment_status, amount, payment_method_id)
-                VALUES (?, ?, ?, ?, ?, ?, 'Scheduled', ?, ?)
-            """
-            params = (client_id, service_id, area_id, appointment_date, session_number, power, amount, payment_method_id)
-            self.db.execute_query(query, params)
-            appointment_id = self.db.conn.execute("SELECT last_insert_rowid()").fetchone()[0]
-            
-            # Sync to calendar and send reminder
-            self._sync_and_notify(appointment_id, appointment_date, client)
             self.logger.info(f"Scheduled appointment {appointment_id} for client {client_id}")
             return appointment_id
         except ValueError as e:
@@ -55,6 +71,347 @@ class AppointmentManager:
             self.logger.error(f"Error scheduling appointment: {e}")
             raise
     
+    def schedule_visit(self, client_id: int, service_id: int, appointment_date: str, areas: List[tuple],
+                       payment_method_id: int = None, start_time: str = None,
+                       hardware_id: int = DEFAULT_HARDWARE_ID) -> List[int]:
+        """Schedule one visit treating several areas; return the appointment_ids in area order.
+        
+        areas holds (area_id, session_number, power, amount) tuples, with an
+        optional fifth duration_minutes. Spacing is checked for every area
+        with one query and the rows go in with one executemany. With
+        start_time the areas are booked back to back on the machine, each
+        for its duration or the service's. The visit gets one calendar event
+        and one notification.
+        """
+        try:
+            if not areas:
+                raise ValueError("A visit needs at least one area")
+            # Each area is checked like a single booking (ids, date, session 1-10) before anything is written
+            appointments = [Appointment(0, client_id, service_id, area[0], appointment_date, area[1], area[2],
+                                        amount=area[3], payment_method_id=payment_method_id, hardware_id=hardware_id)
+                            for area in areas]
+            area_ids = [appointment.area_id for appointment in appointments]
+            if len(set(area_ids)) != len(area_ids):
+                raise ValueError("Each area can only be treated once per visit")
+            with self.db.transaction():
+                client = self._get_client(client_id)
+                if not client or not client.is_active:
+                    raise ValueError("Client is inactive or not found")
+                
+                visit_day = datetime.strptime(appointment_date, '%Y-%m-%d')
+                too_early = [area_id for area_id, earliest in self.earliest_dates_by_area(client_id, area_ids).items()
+                             if visit_day < earliest]
+                if too_early:
+                    raise ValueError(f"Insufficient waiting period since last appointment for areas {sorted(too_early)}")
+                
+                slots = [(None, None)] * len(areas)
+                if start_time:
+                    slots = []
+                    slot_end = f"{appointment_date} {start_time}"
+                    for area in areas:
+                        duration = area[4] if len(area) > 4 else None
+                        slots.append(self.slot_bounds(appointment_date, slot_end[-5:], service_id, duration))
+                        slot_end = slots[-1][1]
+                    self._ensure_slot_free(hardware_id, slots[0][0], slots[-1][1])
+                
+                query = """
+                    INSERT INTO appointments (client_id, service_id, area_id, appointment_date, session_number_for_area, power, 
+                    appointment_status, amount, payment_method_id, start_time, end_time, hardware_id)
+                    VALUES (?, ?, ?, ?, ?, ?, 'Scheduled', ?, ?, ?, ?, ?)
+                """
+                rows = [(a.client_id, a.service_id, a.area_id, a.appointment_date, a.session_number, a.power, a.amount,
+                         a.payment_method_id, slot_start, slot_end, a.hardware_id)
+                        for a, (slot_start, slot_end) in zip(appointments, slots)]
+                self.db.execute_many(query, rows)
+                # The write lock is held, so AUTOINCREMENT handed out consecutive ids
+                last_id = self.db.conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                appointment_ids = list(range(last_id - len(rows) + 1, last_id + 1))
+                self._queue_sync_and_notify(appointment_ids[0], appointment_date, client, slots[0][0], slots[-1][1])
+            
+            self.logger.info(f"Scheduled visit for client {client_id} on {appointment_date}: appointments {appointment_ids}")
+            return appointment_ids
+        except ValueError as e:
+            self.logger.error(f"Validation error scheduling visit: {e}")
+            raise
+        except Exception as e:
+            self.logger.error(f"Error scheduling visit: {e}")
+            raise
+    
+    def slot_bounds(self, appointment_date: str, start_time: str, service_id: int,
+                    duration_minutes: int = None) -> tuple:
+        """Return the ('YYYY-MM-DD HH:MM', 'YYYY-MM-DD HH:MM') slot of a booking starting at start_time."""
+        if not duration_minutes:
+            rows = self.db.execute_query("SELECT duration FROM services WHERE service_id = ?", (service_id,))
+            if not rows:
+                raise ValueError(f"Service {service_id} not found")
+            duration_minutes = rows[0]['duration']
+        try:
+            start = datetime.strptime(f"{appointment_date} {start_time}", self.SLOT_FORMAT)
+        except ValueError:
+            raise ValueError("Start time must be in HH:MM format")
+        end = start + timedelta(minutes=duration_minutes)
+        return start.strftime(self.SLOT_FORMAT), end.strftime(self.SLOT_FORMAT)
+    
+    def find_conflict(self, hardware_id: int, slot_start: str, slot_end: str,
+                      exclude_appointment_id: int = 0) -> Optional[dict]:
+        """Return the booking on hardware_id overlapping [slot_start, slot_end), or None.
+        
+        Booked slots never overlap each other, so only the latest one starting
+        before slot_end can reach into the new slot; one index probe finds it.
+        """
+        query = """
+            SELECT appointment_id, client_id, start_time, end_time FROM appointments
+            WHERE hardware_id = ? AND start_time < ? AND appointment_id != ?
+              AND appointment_status IN ('Scheduled', 'Rescheduled', 'Completed')
+            ORDER BY start_time DESC LIMIT 1
+        """
+        results = self.db.execute_query(query, (hardware_id, slot_end, exclude_appointment_id))
+        if results and results[0]['end_time'] > slot_start:
+            return results[0]
+        return None
+    
+    def _ensure_slot_free(self, hardware_id: int, slot_start: str, slot_end: str,
+                          exclude_appointment_id: int = 0) -> None:
+        """Raise ValueError if the slot overlaps another booking on the same machine."""
+        conflict = self.find_conflict(hardware_id, slot_start, slot_end, exclude_appointment_id)
+        if conflict:
+            raise ValueError(f"Slot {slot_start}-{slot_end[-5:]} overlaps appointment {conflict['appointment_id']} "
+                             f"({conflict['start_time']}-{conflict['end_time'][-5:]})")
+    
+    def find_available_slots(self, client_id: int, area_ids: List[int], from_date: str, days: int = 60,
+                             duration: int = None, limit: int = 20, hardware_ids: List[int] = None) -> List[dict]:
+        """Return up to limit free slots for treating area_ids in one visit, best first.
+        
+        Slots fall within scheduling.opening_hours, do not overlap bookings on
+        the machine and start no earlier than the spacing rule allows for
+        every area. Ranking is earliest day first, then slots that sit against
+        a booking or the opening/closing time (so the day stays unfragmented).
+        Each slot is a dict with date, start_time, end_time ('YYYY-MM-DD HH:MM')
+        and hardware_id; start_time[-5:] can be passed to schedule_appointment.
+        limit=None returns every free slot in the window.
+        """
+        try:
+            duration = duration or int(self.db.config.get('application.default_appointment_duration_minutes', 60))
+            first_day = datetime.strptime(from_date, '%Y-%m-%d')
+            earliest = self.earliest_allowed_date(client_id, area_ids)
+            if earliest and earliest > first_day:
+                days -= (earliest - first_day).days
+                first_day = earliest
+            if days <= 0:
+                return []
+            grid = self._slot_grid(first_day, days, hardware_ids)
+            needed = -(-duration // grid['slot_minutes'])  # slots covered, rounded up
+            slots = [self._grid_slot(grid, offset, index, hardware_id, duration)
+                     for offset, _, index, hardware_id in self._rank_free_starts(grid, 0, needed, limit)]
+            self.logger.info(f"Found {len(slots)} free slots for client {client_id} from {first_day:%Y-%m-%d}")
+            return slots
+        except Exception as e:
+            self.logger.error(f"Error finding available slots for client {client_id}: {e}")
+            raise
+    
+    def _slot_grid(self, first_day: datetime, days: int, hardware_ids: List[int] = None) -> dict:
+        """Read the scheduling settings and the machines' bookings for days from first_day in one query."""
+        slot_minutes = int(self.db.config.get('scheduling.slot_minutes', 15))
+        hardware_ids = hardware_ids or self.db.config.get('scheduling.machines', [self.DEFAULT_HARDWARE_ID])
+        return {
+            'first_day': first_day,
+            'days': days,
+            'slot_minutes': slot_minutes,
+            'hardware_ids': hardware_ids,
+            'opening_hours': self.db.config.get('scheduling.opening_hours', self.DEFAULT_OPENING_HOURS),
+            'occupancy': self._occupancy_bitmaps(hardware_ids, first_day, days, slot_minutes),
+            'now': datetime.now()
+        }
+    
+    def _free_starts(self, grid: dict, offset: int, needed: int) -> Iterator[tuple]:
+        """Yield (hardware_id, free mask, start mask) for one day of grid; start bit i means slots i .. i+needed-1 are free."""
+        day = grid['first_day'] + timedelta(days=offset)
+        slot_minutes, now = grid['slot_minutes'], grid['now']
+        open_mask = self._opening_mask(grid['opening_hours'].get(self.WEEKDAYS[day.weekday()]), slot_minutes)
+        if day.date() == now.date():
+            open_mask &= ~((1 << -(-(now.hour * 60 + now.minute) // slot_minutes)) - 1)
+        for hardware_id in grid['hardware_ids']:
+            free = open_mask & ~grid['occupancy'].get((hardware_id, offset), 0)
+            starts = free
+            for shift in range(1, needed):
+                starts &= free >> shift
+            yield hardware_id, free, starts
+    
+    @staticmethod
+    def _packing_score(free: int, index: int, needed: int) -> int:
+        """Count the free slots either side of a booking at index; fewer means a less fragmented day."""
+        before_free = index > 0 and (free >> (index - 1)) & 1
+        after_free = (free >> (index + needed)) & 1
+        return int(before_free) + int(after_free)
+    
+    def _rank_free_starts(self, grid: dict, first_offset: int, needed: int, limit: Optional[int]) -> List[tuple]:
+        """Return up to limit (day offset, packing score, slot index, hardware_id) starts in grid, best first."""
+        ranked = []
+        for offset in range(first_offset, grid['days']):
+            for hardware_id, free, starts in self._free_starts(grid, offset, needed):
+                while starts:
+                    index = (starts & -starts).bit_length() - 1
+                    starts &= starts - 1
+                    ranked.append((offset, self._packing_score(free, index, needed), index, hardware_id))
+            if limit and len(ranked) >= limit and offset >= ranked[limit - 1][0]:
+                break  # later days rank below every slot already found
+        ranked.sort()
+        return ranked[:limit]
+    
+    def _same_time_start(self, grid: dict, first_offset: int, needed: int, index: int) -> Optional[tuple]:
+        """Return the best start at slot index on the first day of grid any machine has it free, or None."""
+        for offset in range(first_offset, grid['days']):
+            fits = [(self._packing_score(free, index, needed), hardware_id)
+                    for hardware_id, free, starts in self._free_starts(grid, offset, needed) if (starts >> index) & 1]
+            if fits:
+                score, hardware_id = min(fits)
+                return offset, score, index, hardware_id
+        return None
+    
+    def _grid_slot(self, grid: dict, offset: int, index: int, hardware_id: int, duration: int) -> dict:
+        """Return the slot dict for a start found in grid."""
+        start = grid['first_day'] + timedelta(days=offset, minutes=index * grid['slot_minutes'])
+        return {
+            'date': start.strftime('%Y-%m-%d'),
+            'start_time': start.strftime(self.SLOT_FORMAT),
+            'end_time': (start + timedelta(minutes=duration)).strftime(self.SLOT_FORMAT),
+            'hardware_id': hardware_id
+        }
+    
+    def earliest_allowed_date(self, client_id: int, area_ids: List[int]) -> Optional[datetime]:
+        """Return the first date every area's waiting period has passed, or None if none applies."""
+        dates = self.earliest_dates_by_area(client_id, area_ids).values()
+        return max(dates) if dates else None
+    
+    def earliest_dates_by_area(self, client_id: int, area_ids: List[int]) -> dict:
+        """Return {area_id: first allowed date} for the areas with a completed session, in one query."""
+        if not area_ids:
+            return {}
+        placeholders = ', '.join('?' for _ in area_ids)
+        query = f"""
+            SELECT area_id, appointment_date, session_number_for_area FROM (
+                SELECT area_id, appointment_date, session_number_for_area,
+                       ROW_NUMBER() OVER (PARTITION BY area_id ORDER BY appointment_date DESC, appointment_id DESC) AS recency
+                FROM appointments
+                WHERE client_id = ? AND area_id IN ({placeholders}) AND appointment_status = 'Completed'
+            )
+            WHERE recency = 1
+        """
+        results = self.db.execute_query(query, (client_id, *area_ids))
+        return {row['area_id']: Appointment.earliest_next_date(row['appointment_date'], row['session_number_for_area'])
+                for row in results}
+    
+    def _earliest_dates_by_client_area(self, client_ids: List[int]) -> dict:
+        """Return {(client_id, area_id): first allowed date} for every treated area of client_ids, in one query."""
+        if not client_ids:
+            return {}
+        placeholders = ', '.join('?' for _ in client_ids)
+        query = f"""
+            SELECT client_id, area_id, appointment_date, session_number_for_area FROM (
+                SELECT client_id, area_id, appointment_date, session_number_for_area,
+                       ROW_NUMBER() OVER (PARTITION BY client_id, area_id
+                                          ORDER BY appointment_date DESC, appointment_id DESC) AS recency
+                FROM appointments
+                WHERE client_id IN ({placeholders}) AND area_id IS NOT NULL AND appointment_status = 'Completed'
+            )
+            WHERE recency = 1
+        """
+        results = self.db.execute_query(query, tuple(client_ids))
+        return {(row['client_id'], row['area_id']):
+                Appointment.earliest_next_date(row['appointment_date'], row['session_number_for_area'])
+                for row in results}
+    
+    def plan_next_sessions(self, as_of: str = None) -> List[dict]:
+        """Compute the next due date for every client/area pair and return the overdue ones.
+        
+        The latest completed session of each pair gets its
+        next_suggested_appointment_date set from MIN_WAITING_PERIODS in one
+        UPDATE; a pair is overdue when that date is before as_of (default
+        today) and nothing is booked for the area since. Overdue rows are
+        returned most overdue first.
+        """
+        as_of = as_of or datetime.now().strftime('%Y-%m-%d')
+        # date() arithmetic needs the waiting period inline, so the model's table becomes a CASE
+        last_listed = max(Appointment.MIN_WAITING_PERIODS)
+        waits = ' '.join(f"WHEN {number} THEN {Appointment.waiting_weeks(number) * 7}" for number in range(1, last_listed))
+        next_date = (f"date(appointment_date, '+' || (CASE session_number_for_area {waits} "
+                     f"ELSE {Appointment.waiting_weeks(last_listed) * 7} END) || ' days')")
+        latest = """
+            SELECT appointment_id, client_id, area_id, appointment_date, session_number_for_area,
+                   next_suggested_appointment_date
+            FROM (
+                SELECT appointment_id, client_id, area_id, appointment_date, session_number_for_area,
+                       next_suggested_appointment_date,
+                       ROW_NUMBER() OVER (PARTITION BY client_id, area_id
+                                          ORDER BY appointment_date DESC, appointment_id DESC) AS recency
+                FROM appointments
+                WHERE appointment_status = 'Completed' AND area_id IS NOT NULL
+            )
+            WHERE recency = 1
+        """
+        try:
+            with self.db.transaction():
+                self.db.execute_query(f"""
+                    UPDATE appointments SET next_suggested_appointment_date = {next_date}
+                    WHERE appointment_id IN (SELECT appointment_id FROM ({latest}))
+                      AND next_suggested_appointment_date IS NOT {next_date}
+                """)
+                updated = self.db.conn.execute("SELECT changes()").fetchone()[0]
+                overdue = self.db.execute_query(f"""
+                    SELECT l.client_id, c.full_name, c.phone_number, l.area_id,
+                           l.appointment_date AS last_session_date,
+                           l.session_number_for_area AS last_session_number,
+                           l.next_suggested_appointment_date AS due_date,
+                           CAST(julianday(?) - julianday(l.next_suggested_appointment_date) AS INTEGER) AS days_overdue
+                    FROM ({latest}) l
+                    JOIN clients c ON c.client_id = l.client_id
+                    WHERE c.is_active = 1 AND l.next_suggested_appointment_date < ?
+                      AND NOT EXISTS (
+                          SELECT 1 FROM appointments booked
+                          WHERE booked.client_id = l.client_id AND booked.area_id = l.area_id
+                            AND booked.appointment_status IN ('Scheduled', 'Rescheduled')
+                            AND booked.appointment_date >= l.appointment_date
+                      )
+                    ORDER BY l.next_suggested_appointment_date, l.client_id, l.area_id
+                """, (as_of, as_of))
+            self.logger.info(f"Planned next sessions ({updated} due dates changed), {len(overdue)} overdue as of {as_of}")
+            return overdue
+        except Exception as e:
+            self.logger.error(f"Error planning next sessions: {e}")
+            raise
+    
+    def _occupancy_bitmaps(self, hardware_ids: List[int], first_day: datetime, days: int, slot_minutes: int) -> dict:
+        """Return {(hardware_id, day offset): bitmask} where bit i marks slot i of that day as booked."""
+        placeholders = ', '.join('?' for _ in hardware_ids)
+        query = f"""
+            SELECT hardware_id, start_time, end_time FROM appointments
+            WHERE hardware_id IN ({placeholders}) AND start_time >= ? AND start_time < ?
+              AND appointment_status IN ('Scheduled', 'Rescheduled', 'Completed')
+        """
+        last_day = first_day + timedelta(days=days)
+        results = self.db.execute_query(query, (*hardware_ids, first_day.strftime(self.SLOT_FORMAT),
+                                                last_day.strftime(self.SLOT_FORMAT)))
+        offsets = {(first_day + timedelta(days=offset)).strftime('%Y-%m-%d'): offset for offset in range(days)}
+        occupancy = {}
+        for row in results:
+            start, end = row['start_time'], row['end_time']  # fixed-width 'YYYY-MM-DD HH:MM'
+            first_slot = (int(start[11:13]) * 60 + int(start[14:16])) // slot_minutes
+            end_minutes = int(end[11:13]) * 60 + int(end[14:16]) if end[:10] == start[:10] else 24 * 60
+            last_slot = -(-end_minutes // slot_minutes)  # partly used slots count as booked
+            key = (row['hardware_id'], offsets[start[:10]])
+            occupancy[key] = occupancy.get(key, 0) | ((1 << last_slot) - (1 << first_slot))
+        return occupancy
+    
+    @staticmethod
+    def _opening_mask(hours: Optional[list], slot_minutes: int) -> int:
+        """Return the bitmask of slots between opening and closing time; 0 on closed days."""
+        if not hours:
+            return 0
+        opens, closes = (int(t[:2]) * 60 + int(t[3:5]) for t in hours)
+        first_slot = -(-opens // slot_minutes)
+        last_slot = closes // slot_minutes
+        return (1 << last_slot) - (1 << first_slot) if last_slot > first_slot else 0
+    
     def get_previous_appointment(self, client_id: int, area_id: int) -> Optional[Appointment]:
         """Retrieve the most recent completed appointment for the given client and area."""
         try:
@@ -69,16 +426,39 @@ class AppointmentManager:
             self.logger.error(f"Error retrieving previous appointment: {e}")
             raise
     
-    def reschedule_appointment(self, appointment_id: int, new_date: str) -> bool:
-        """Reschedule an existing appointment to a new date."""
+    def reschedule_appointment(self, appointment_id: int, new_date: str, start_time: str = None) -> bool:
+        """Reschedule an existing appointment to a new date, and start_time ('HH:MM') if given.
+        
+        A timed appointment keeps its length and, without start_time, its time of day.
+        """
         try:
-            appointment = self._get_appointment(appointment_id)
-            if not appointment or appointment.appointment_status not in ['Scheduled', 'Rescheduled']:
-                raise ValueError("Appointment not available for rescheduling")
-            
-            query = "UPDATE appointments SET appointment_date = ?, appointment_status = 'Rescheduled' WHERE appointment_id = ?"
-            self.db.execute_query(query, (new_date, appointment_id))
-            self._sync_and_notify(appointment_id, new_date, self._get_client(appointment.client_id))
+            with self.db.transaction():
+                appointment = self._get_appointment(appointment_id)
+                if not appointment or appointment.appointment_status not in ['Scheduled', 'Rescheduled']:
+                    raise ValueError("Appointment not available for rescheduling")
+                
+                slot_start = slot_end = None
+                if appointment.start_time or start_time:
+                    duration = None
+                    if appointment.start_time:
+                        old_start = datetime.strptime(appointment.start_time, self.SLOT_FORMAT)
+                        duration = int((datetime.strptime(appointment.end_time, self.SLOT_FORMAT) - old_start).total_seconds() // 60)
+                    slot_start, slot_end = self.slot_bounds(new_date, start_time or appointment.start_time[-5:],
+                                                            appointment.service_id, duration)
+                    self._ensure_slot_free(appointment.hardware_id, slot_start, slot_end, appointment_id)
+                
+                query = """
+                    UPDATE appointments SET appointment_date = ?, start_time = ?, end_time = ?, appointment_status = 'Rescheduled',
+                           revision = revision + 1
+                    WHERE appointment_id = ?
+                """
+                self.db.execute_query(query, (new_date, slot_start, slot_end, appointment_id))
+                current = self.db.execute_query(
+                    "SELECT revision, calendar_event_id FROM appointments WHERE appointment_id = ?", (appointment_id,)
+                )[0]
+                client = self._get_client(appointment.client_id)
+                self._queue_sync_and_notify(appointment_id, new_date, client, slot_start, slot_end, current['revision'],
+                                            current['calendar_event_id'])
             self.logger.info(f"Rescheduled appointment {appointment_id} to {new_date}")
             return True
         except ValueError as e:
@@ -88,15 +468,104 @@ class AppointmentManager:
             self.logger.error(f"Error rescheduling appointment {appointment_id}: {e}")
             raise
     
+    def bulk_reschedule(self, date: str, strategy: str = 'earliest', hardware_id: int = None,
+                        days: int = 60) -> dict:
+        """Move every booking on date (only hardware_id's if given) to free slots after it.
+        
+        strategy 'earliest' takes each appointment's best free slot;
+        'same_time' keeps its time of day on the first day that time is free,
+        falling back to 'earliest'. Appointments are placed in start order,
+        honouring the spacing rule and each other's new slots, in one
+        transaction. Those with no slot within days stay put and are listed
+        under 'unplaced'. Calendar events and client messages are queued in
+        the same transaction for OutboxDispatcher, which sends calendar
+        inserts as batched calls and then deletes the events they replace.
+        Returns {'moved': [...], 'unplaced': [...]}.
+        
+        The machines' bookings are read once into occupancy bitmaps that
+        each placed move updates in memory, and the spacing dates of every
+        affected client come from one query.
+        """
+        if strategy not in self.RESCHEDULE_STRATEGIES:
+            raise ValueError(f"Strategy must be one of {self.RESCHEDULE_STRATEGIES}")
+        next_day = (datetime.strptime(date, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+        query = """
+            SELECT a.appointment_id, a.client_id, a.service_id, a.area_id, a.start_time, a.end_time, a.revision,
+                   a.calendar_event_id, s.duration
+            FROM appointments a JOIN services s ON s.service_id = a.service_id
+            WHERE a.appointment_date = ? AND a.appointment_status IN ('Scheduled', 'Rescheduled')
+        """
+        params = (date,)
+        if hardware_id is not None:
+            query += " AND a.hardware_id = ?"
+            params += (hardware_id,)
+        query += " ORDER BY a.start_time IS NULL, a.start_time, a.appointment_id"
+        try:
+            moved, unplaced = [], []
+            with self.db.transaction():
+                rows = self.db.execute_query(query, params)
+                grid = self._slot_grid(datetime.strptime(next_day, '%Y-%m-%d'), days)
+                earliest = self._earliest_dates_by_client_area(sorted({row['client_id'] for row in rows}))
+                for row in rows:
+                    duration = row['duration']
+                    if row['start_time']:
+                        duration = int((datetime.strptime(row['end_time'], self.SLOT_FORMAT)
+                                        - datetime.strptime(row['start_time'], self.SLOT_FORMAT)).total_seconds() // 60)
+                    slot = self._pick_slot(grid, row, strategy, duration, earliest.get((row['client_id'], row['area_id'])))
+                    if not slot:
+                        unplaced.append(row['appointment_id'])
+                        continue
+                    revision = row['revision'] + 1
+                    calendar_key = self._calendar_key(row['appointment_id'], revision, slot['start_time'])
+                    self.db.execute_query("""
+                        UPDATE appointments SET appointment_date = ?, start_time = ?, end_time = ?, hardware_id = ?,
+                               appointment_status = 'Rescheduled', revision = ?, calendar_event_id = ?
+                        WHERE appointment_id = ?
+                    """, (slot['date'], slot['start_time'], slot['end_time'], slot['hardware_id'], revision,
+                          Outbox.event_id(calendar_key), row['appointment_id']))
+                    moved.append({'appointment_id': row['appointment_id'], 'client_id': row['client_id'],
+                                  'from': row['start_time'] or date, **slot})
+                    self._queue_rescheduled(moved[-1], revision, self._get_client(row['client_id']),
+                                            row['calendar_event_id'])
+            if unplaced:
+                self.logger.warning(f"No free slot within {days} days for appointments {unplaced}")
+            self.logger.info(f"Bulk rescheduled {len(moved)} appointments off {date} ({strategy})")
+            return {'moved': moved, 'unplaced': unplaced}
+        except Exception as e:
+            self.logger.error(f"Error bulk rescheduling appointments on {date}: {e}")
+            raise
+    
+    def _pick_slot(self, grid: dict, appointment: dict, strategy: str, duration: int,
+                   earliest: Optional[datetime]) -> Optional[dict]:
+        """Return the free slot bulk_reschedule should move appointment to and mark it booked in grid, or None."""
+        first_offset = max(0, (earliest - grid['first_day']).days) if earliest else 0
+        slot_minutes = grid['slot_minutes']
+        needed = -(-duration // slot_minutes)
+        start = None
+        if strategy == 'same_time' and appointment['start_time']:
+            minutes = int(appointment['start_time'][11:13]) * 60 + int(appointment['start_time'][14:16])
+            if minutes % slot_minutes == 0:
+                start = self._same_time_start(grid, first_offset, needed, minutes // slot_minutes)
+        if not start:
+            ranked = self._rank_free_starts(grid, first_offset, needed, limit=1)
+            start = ranked[0] if ranked else None
+        if not start:
+            return None
+        offset, _, index, hardware_id = start
+        key = (hardware_id, offset)
+        grid['occupancy'][key] = grid['occupancy'].get(key, 0) | (((1 << needed) - 1) << index)
+        return self._grid_slot(grid, offset, index, hardware_id, duration)
+    
     def cancel_appointment(self, appointment_id: int) -> bool:
         """Cancel an existing appointment."""
         try:
-            appointment = self._get_appointment(appointment_id)
-            if not appointment or appointment.appointment_status not in ['Scheduled', 'Rescheduled']:
-                raise ValueError("Appointment not available for cancellation")
-            
-            query = "UPDATE appointments SET appointment_status = 'Cancelled' WHERE appointment_id = ?"
-            self.db.execute_query(query, (appointment_id,))
+            with self.db.transaction():
+                appointment = self._get_appointment(appointment_id)
+                if not appointment or appointment.appointment_status not in ['Scheduled', 'Rescheduled']:
+                    raise ValueError("Appointment not available for cancellation")
+                
+                query = "UPDATE appointments SET appointment_status = 'Cancelled' WHERE appointment_id = ?"
+                self.db.execute_query(query, (appointment_id,))
             self.logger.info(f"Cancelled appointment {appointment_id}")
             return True
         except ValueError as e:
@@ -116,34 +585,83 @@ class AppointmentManager:
             self.logger.error(f"Error retrieving appointments for {date}: {e}")
             raise
     
+    def iter_appointments(self, client_id: int = None, date: str = None, statuses: List[str] = None,
+                          page_size: int = DatabaseOperations.DEFAULT_PAGE_SIZE) -> Iterator[Appointment]:
+        """Lazily yield appointments in appointment_id order, e.g. a client's full visit history."""
+        try:
+            for result in self.db.iter_appointments(client_id, date, statuses, page_size=page_size):
+                yield Appointment.from_dict(result)
+        except Exception as e:
+            self.logger.error(f"Error iterating appointments: {e}")
+            raise
+    
+    def get_appointment(self, appointment_id: int) -> Optional[Appointment]:
+        """Retrieve an appointment by appointment_id."""
+        try:
+            return self._get_appointment(appointment_id)
+        except Exception as e:
+            self.logger.error(f"Error retrieving appointment {appointment_id}: {e}")
+            raise
+    
     def _get_client(self, client_id: int) -> Optional[Client]:
-        """Helper method to retrieve client."""
-        with self.db as db:
-            result = db.get_client(client_id)
-            return Client.from_dict(result) if result else None
+        """Helper method to retrieve client through the shared identity map."""
+        result = self.db.get_client(client_id)
+        return Client.from_dict(result) if result else None
     
     def _get_appointment(self, appointment_id: int) -> Optional[Appointment]:
-        """Helper method to retrieve appointment."""
-        with self.db as db:
-            query = "SELECT * FROM appointments WHERE appointment_id = ?"
-            results = db.execute_query(query, (appointment_id,))
-            return Appointment.from_dict(results[0]) if results else None
+        """Helper method to retrieve appointment through the shared identity map."""
+        result = self.db.get_appointment(appointment_id)
+        return Appointment.from_dict(result) if result else None
     
-    def _sync_and_notify(self, appointment_id: int, appointment_date: str, client: Client) -> None:
-        """Sync appointment to calendar and send reminder."""
-        try:
-            # Sync to calendar
-            self.calendar_sync.add_event(appointment_id, appointment_date, client.full_name)
-            
-            # Send reminder (e.g., 24 hours before)
-            reminder_date = (datetime.strptime(appointment_date, '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d')
-            if datetime.now().date() <= datetime.strptime(reminder_date, '%Y-%m-%d').date():
-                message = f"Reminder: Your appointment on {appointment_date} is tomorrow."
-                self.email_sender.send_email(client.email, "Appointment Reminder", message)
-                self.sms_sender.send_sms(client.phone_number, message)
-                self.logger.info(f"Sent reminder for appointment {appointment_id}")
-        except Exception as e:
-            self.logger.error(f"Error syncing or notifying for appointment {appointment_id}: {e}")
+    @staticmethod
+    def _calendar_key(appointment_id: int, revision: int, when: str) -> str:
+        """Return the outbox key of an appointment's calendar event; Outbox.event_id derives the event id from it."""
+        return f"calendar:{appointment_id}:{revision}:{when}"
+    
+    def _queue_sync_and_notify(self, appointment_id: int, appointment_date: str, client: Client,
+                               start_time: str = None, end_time: str = None, revision: int = 0,
+                               replaces_event_id: str = None) -> None:
+        """Queue the calendar event and reminder in the caller's transaction; OutboxDispatcher sends them.
+        
+        Keys carry the appointment's revision, so moving it back to an earlier
+        time queues new rows rather than matching the ones already sent. The
+        new event id is stored on the appointment, and the event it replaces
+        is deleted by the dispatcher once the new one is in.
+        """
+        when = start_time or appointment_date
+        calendar_key = self._calendar_key(appointment_id, revision, when)
+        self.outbox.enqueue('calendar', calendar_key, {
+            'appointment_id': appointment_id, 'appointment_date': appointment_date,
+            'client_name': client.full_name, 'slot_start': start_time, 'slot_end': end_time,
+            'replaces_event_id': replaces_event_id
+        })
+        self.db.execute_query("UPDATE appointments SET calendar_event_id = ? WHERE appointment_id = ?",
+                              (Outbox.event_id(calendar_key), appointment_id))
+        
+        # Send reminder (e.g., 24 hours before)
+        reminder_date = (datetime.strptime(appointment_date, '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d')
+        if datetime.now().date() <= datetime.strptime(reminder_date, '%Y-%m-%d').date():
+            message = f"Reminder: Your appointment on {appointment_date} is tomorrow."
+            self._queue_message(f"reminder:{appointment_id}:{revision}:{when}", client, "Appointment Reminder", message)
+    
+    def _queue_rescheduled(self, move: dict, revision: int, client: Client, replaces_event_id: str = None) -> None:
+        """Queue the calendar event and client notice for one bulk_reschedule move at its new revision."""
+        key = f"{move['appointment_id']}:{revision}:{move['start_time']}"
+        self.outbox.enqueue('calendar', self._calendar_key(move['appointment_id'], revision, move['start_time']), {
+            'appointment_id': move['appointment_id'], 'appointment_date': move['date'],
+            'client_name': client.full_name, 'slot_start': move['start_time'], 'slot_end': move['end_time'],
+            'replaces_event_id': replaces_event_id
+        })
+        message = f"Your appointment on {move['from']} has been moved to {move['start_time']}."
+        self._queue_message(f"rescheduled:{key}", client,
+                            "Appointment Rescheduled", message)
+    
+    def _queue_message(self, key: str, client: Client, subject: str, message: str) -> None:
+        """Queue an email and an SMS to the client, skipping channels without a contact."""
+        if client.email:
+            self.outbox.enqueue('email', f"email:{key}", {'to': client.email, 'subject': subject, 'message': message})
+        if client.phone_number:
+            self.outbox.enqueue('sms', f"sms:{key}", {'to': client.phone_number, 'message': message})
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
@@ -166,5 +684,9 @@ if __name__ == "__main__":
         # Get appointments for a date
         appointments = manager.get_appointments_by_date("2025-07-18")
         print(f"Appointments on 2025-07-18: {[str(a) for a in appointments]}")
+        
+        # Refresh next-session due dates and list overdue clients
+        for row in manager.plan_next_sessions():
+            print(f"Overdue: {row['full_name']} area {row['area_id']} due {row['due_date']} ({row['days_overdue']} days)")
     except Exception as e:
         print(f"Error: {e}")
\ No newline at end of file
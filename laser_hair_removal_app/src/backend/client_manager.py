@@ -1,14 +1,24 @@
 from src.database.db_operations import DatabaseOperations
+from src.backend.duplicate_detector import DuplicateDetector
 from src.models.client import Client
-from src.utils.csv_importer import CSVImporter
+from src.utils.phone import normalize_phone
 import logging
-from typing import List, Optional
+import re
+from typing import Iterator, List, Optional
 import os
 from pathlib import Path
 
+# owner_reminders of these types point related_id at a hardware_id (see HardwareManager);
+# every other reminder type is about the client in related_id
+HARDWARE_REMINDER_TYPES = ('Maintenance', 'Insurance')
+CLIENT_REMINDER_CONDITION = f"reminder_type NOT IN ({', '.join(repr(t) for t in HARDWARE_REMINDER_TYPES)})"
+
 class ClientManager:
     """Manages client-related operations for the laser hair removal application."""
     
+    _SEARCH_TOKEN = re.compile(r'\w+')
+    _PHONE_LIKE = re.compile(r'^[\d\s+().-]+$')
+    
     def __init__(self, config_path: str, db_path: str):
         """Initialize with database configuration and path."""
         self.db = DatabaseOperations(config_path, db_path)
@@ -40,30 +50,102 @@ class ClientManager:
             self.logger.error(f"Error retrieving client {client_id}: {e}")
             raise
     
+    def get_client_summary(self, client_id: int) -> Optional[dict]:
+        """Return a client's treatment picture for the client view, or None if not found.
+        
+        Keys: client, areas (per area: sessions_completed, last_session_date,
+        last_power, next_suggested_date, spend), sessions_completed,
+        total_spend and outstanding_reminders. Served from the shared identity
+        map; writes to clients, appointments or owner_reminders invalidate it.
+        """
+        try:
+            client = self.get_client(client_id)
+            if client is None:
+                return None
+            summary = self.db.get_cached('client_summary', client_id, lambda: self._load_client_summary(client_id))
+            return dict(summary, client=client, areas=[dict(area) for area in summary['areas']],
+                        outstanding_reminders=[dict(reminder) for reminder in summary['outstanding_reminders']])
+        except Exception as e:
+            self.logger.error(f"Error building summary for client {client_id}: {e}")
+            raise
+    
+    def _load_client_summary(self, client_id: int) -> dict:
+        """Aggregate completed sessions per area in one pass, plus the client's active reminders."""
+        # recency = 1 marks each area's latest completed session, which holds the
+        # power to continue from and the suggested date of the next visit
+        areas = self.db.execute_query(
+            """
+            SELECT area_id,
+                   COUNT(*) AS sessions_completed,
+                   MAX(appointment_date) AS last_session_date,
+                   MAX(CASE WHEN recency = 1 THEN power END) AS last_power,
+                   MAX(CASE WHEN recency = 1 THEN next_suggested_appointment_date END) AS next_suggested_date,
+                   ROUND(SUM(amount), 2) AS spend
+            FROM (
+                SELECT area_id, appointment_date, power, amount, next_suggested_appointment_date,
+                       ROW_NUMBER() OVER (PARTITION BY area_id ORDER BY appointment_date DESC, appointment_id DESC) AS recency
+                FROM appointments
+                WHERE client_id = ? AND appointment_status = 'Completed'
+            )
+            GROUP BY area_id
+            ORDER BY area_id
+            """,
+            (client_id,)
+        )
+        reminders = self.db.execute_query(
+            f"""
+            SELECT reminder_id, reminder_type, due_date, reminder_date, message, delivery_method
+            FROM owner_reminders
+            WHERE related_id = ? AND is_active = TRUE AND {CLIENT_REMINDER_CONDITION}
+            ORDER BY reminder_date
+            """,
+            (client_id,)
+        )
+        return {
+            'client_id': client_id,
+            'areas': areas,
+            'sessions_completed': sum(area['sessions_completed'] for area in areas),
+            'total_spend': round(sum(area['spend'] or 0 for area in areas), 2),
+            'outstanding_reminders': reminders
+        }
+    
+    def find_by_phone(self, raw_phone: str) -> Optional[Client]:
+        """Return the client whose phone matches raw_phone in any format, e.g. for caller ID."""
+        phone_e164 = normalize_phone(raw_phone)
+        if phone_e164 is None:
+            return None
+        try:
+            results = self.db.execute_query("SELECT * FROM clients WHERE phone_e164 = ?", (phone_e164,))
+            return Client.from_dict(results[0]) if results else None
+        except Exception as e:
+            self.logger.error(f"Error finding client by phone {raw_phone}: {e}")
+            raise
+    
     def update_client(self, client_id: int, full_name: str = None, phone_number: str = None, 
                       email: str = None, dob: str = None, is_blacklisted: bool = None, 
                       is_active: bool = None, notes: str = None) -> bool:
         """Update client details and return success status."""
         try:
-            current_client = self.get_client(client_id)
-            if not current_client:
-                self.logger.warning(f"Client {client_id} not found for update")
-                return False
+            with self.db.transaction():
+                current_client = self.get_client(client_id)
+                if not current_client:
+                    self.logger.warning(f"Client {client_id} not found for update")
+                    return False
             
-            # Use existing values if not provided
-            full_name = full_name or current_client.full_name
-            phone_number = phone_number or current_client.phone_number
-            email = email or current_client.email
-            dob = dob or current_client.dob
-            is_blacklisted = is_blacklisted if is_blacklisted is not None else current_client.is_blacklisted
-            is_active = is_active if is_active is not None else current_client.is_active
-            notes = notes or current_client.notes
+                # Use existing values if not provided
+                full_name = full_name or current_client.full_name
+                phone_number = phone_number or current_client.phone_number
+                email = email or current_client.email
+                dob = dob or current_client.dob
+                is_blacklisted = is_blacklisted if is_blacklisted is not None else current_client.is_blacklisted
+                is_active = is_active if is_active is not None else current_client.is_active
+                notes = notes or current_client.notes
             
-            client = Client(client_id, full_name, phone_number, email, dob, is_blacklisted, is_active, notes)
-            success = self.db.update_client(
-                client_id, client.full_name, client.phone_number, client.email, client.dob,
-                client.is_blacklisted, client.is_active, client.notes
-            )
+                client = Client(client_id, full_name, phone_number, email, dob, is_blacklisted, is_active, notes)
+                success = self.db.update_client(
+                    client_id, client.full_name, client.phone_number, client.email, client.dob,
+                    client.is_blacklisted, client.is_active, client.notes
+                )
             if success:
                 self.logger.info(f"Updated client {client_id}")
             return success
@@ -74,6 +156,69 @@ class ClientManager:
             self.logger.error(f"Error updating client {client_id}: {e}")
             raise
     
+    def find_duplicates(self, min_score: float = 0.6, limit: int = None) -> List[dict]:
+        """Return the ranked merge queue of likely duplicate clients (keep_id, drop_id, score, reasons)."""
+        return DuplicateDetector(self.db, min_score=min_score).merge_queue(limit)
+    
+    def merge_clients(self, keep_id: int, drop_id: int) -> int:
+        """Fold drop_id into keep_id in one transaction; return the number of appointments moved.
+        
+        Appointments, client reminders and the open checklist move to keep_id
+        (keep_id's own checklist wins), empty email/dob fields are filled from
+        drop_id, notes are combined, and drop_id is deleted after its details
+        are recorded in client_merges.
+        """
+        if keep_id == drop_id:
+            raise ValueError("Cannot merge a client into itself")
+        try:
+            with self.db.transaction():
+                rows = self.db.execute_query(
+                    "SELECT * FROM clients WHERE client_id IN (?, ?)", (keep_id, drop_id)
+                )
+                found = {row['client_id']: row for row in rows}
+                if keep_id not in found or drop_id not in found:
+                    raise ValueError(f"Clients {keep_id} and {drop_id} must both exist to merge")
+                keep, drop = found[keep_id], found[drop_id]
+            
+                moved = self.db.execute_query(
+                    "UPDATE appointments SET client_id = ? WHERE client_id = ?", (keep_id, drop_id)
+                )
+                self.db.execute_query(
+                    f"UPDATE owner_reminders SET related_id = ? WHERE related_id = ? AND {CLIENT_REMINDER_CONDITION}",
+                    (keep_id, drop_id)
+                )
+                self.db.execute_query(
+                    "DELETE FROM digital_checklists WHERE client_id = ? "
+                    "AND EXISTS (SELECT 1 FROM digital_checklists WHERE client_id = ?)",
+                    (drop_id, keep_id)
+                )
+                self.db.execute_query(
+                    "UPDATE digital_checklists SET client_id = ? WHERE client_id = ?", (keep_id, drop_id)
+                )
+                self.db.execute_query(
+                    """
+                    INSERT INTO client_merges (keep_id, drop_id, dropped_full_name, dropped_phone_number,
+                                               dropped_email, dropped_dob, appointments_moved)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (keep_id, drop_id, drop['full_name'], drop['phone_number'], drop['email'], drop['dob'], moved)
+                )
+                # Delete first so drop_id's email is free to move to keep_id
+                self.db.execute_query("DELETE FROM clients WHERE client_id = ?", (drop_id,))
+                notes = '\n'.join(note for note in (keep['notes'], drop['notes']) if note) or None
+                self.db.execute_query(
+                    "UPDATE clients SET email = COALESCE(email, ?), dob = COALESCE(dob, ?), notes = ? WHERE client_id = ?",
+                    (drop['email'], drop['dob'], notes, keep_id)
+                )
+            self.logger.info(f"Merged client {drop_id} into {keep_id}, moved {moved} appointments")
+            return moved
+        except ValueError as e:
+            self.logger.error(f"Validation error merging client {drop_id} into {keep_id}: {e}")
+            raise
+        except Exception as e:
+            self.logger.error(f"Error merging client {drop_id} into {keep_id}: {e}")
+            raise
+    
     def deactivate_client(self, client_id: int) -> bool:
         """Deactivate a client by setting is_active to False."""
         try:
@@ -89,19 +234,58 @@ class ClientManager:
             self.logger.error(f"Error deactivating client {client_id}: {e}")
             raise
     
-    def search_clients(self, search_term: str) -> List[Client]:
-        """Search clients by name and return a list of matching clients."""
+    @classmethod
+    def fts_query(cls, search_term: str) -> str:
+        """Turn free text into an FTS5 prefix query; every word must match.
+        
+        Folds ł like clients_fts_source does; unicode61 handles case and the
+        remaining Polish diacritics on both sides. Phone-like input becomes a
+        single digit prefix, so "123 45" matches "+48 123 456 789".
+        """
+        if cls._PHONE_LIKE.match(search_term) and any(ch.isdigit() for ch in search_term):
+            return '"{}"*'.format(''.join(ch for ch in search_term if ch.isdigit()))
+        folded = search_term.replace('ł', 'l').replace('Ł', 'L')
+        return ' '.join(f'"{token}"*' for token in cls._SEARCH_TOKEN.findall(folded))
+    
+    def search_clients(self, search_term: str, limit: int = None) -> List[Client]:
+        """Search active clients by name, phone, email or notes, best matches first.
+        
+        Each word is a prefix match, so "napi" finds "NAPIERAŁA". An empty
+        term returns every active client in client_id order.
+        """
+        match = self.fts_query(search_term)
+        if not match:
+            return list(self.iter_clients(""))
         try:
-            with self.db as db:
-                query = "SELECT * FROM clients WHERE full_name LIKE ? AND is_active = TRUE"
-                results = db.execute_query(query, ('%' + search_term + '%',))
-                return [Client.from_dict(result) for result in results]
+            # clients_fts holds active clients only, so ranking and LIMIT run
+            # inside FTS before the join back to clients
+            query = """
+                SELECT c.* FROM (
+                    SELECT rowid, rank FROM clients_fts 
+                    WHERE clients_fts MATCH ? 
+                    ORDER BY rank LIMIT ?
+                ) AS hits
+                JOIN clients c ON c.client_id = hits.rowid
+                ORDER BY hits.rank
+            """
+            results = self.db.execute_query(query, (match, -1 if limit is None else limit))
+            return [Client.from_dict(result) for result in results]
+        except Exception as e:
+            self.logger.error(f"Error searching clients: {e}")
+            raise
+    
+    def iter_clients(self, search_term: str = "", page_size: int = DatabaseOperations.DEFAULT_PAGE_SIZE) -> Iterator[Client]:
+        """Lazily yield active clients whose name contains search_term, in client_id order."""
+        try:
+            for result in self.db.iter_clients(search_term, page_size=page_size):
+                yield Client.from_dict(result)
         except Exception as e:
             self.logger.error(f"Error searching clients: {e}")
             raise
     
     def import_clients_from_csv(self, csv_path: str) -> int:
         """Import clients from a CSV file and return the number of imported clients."""
+        from src.utils.csv_importer import CSVImporter  # csv_importer imports this module
         try:
             importer = CSVImporter(self.db)
             imported_count = importer.import_clients(csv_path)
@@ -0,0 +1,157 @@
+from src.database.db_operations import DatabaseOperations
+from src.utils.phone import normalize_phone
+import logging
+import re
+import unicodedata
+from collections import defaultdict
+from itertools import combinations
+from typing import List, Optional
+
+class DuplicateDetector:
+    """Finds likely duplicate clients without comparing every pair.
+
+    Clients are bucketed by normalized phone, email local part and name
+    trigrams; only clients sharing a bucket are scored. Buckets larger than
+    max_block_size (a shared front-desk phone, "ska" in Polish surnames) carry
+    no signal and are skipped, which keeps the work close to linear in the number of clients.
+    """
+
+    # Score contributions; a pair is queued when the total reaches min_score
+    PHONE_WEIGHT = 0.5
+    EMAIL_WEIGHT = 0.3
+    EMAIL_LOCAL_WEIGHT = 0.2
+    NAME_WEIGHT = 0.4
+    DOB_MATCH_WEIGHT = 0.1
+    DOB_CONFLICT_PENALTY = 0.3
+    MIN_SHARED_TRIGRAMS = 3
+
+    _NON_LETTERS = re.compile(r'[^a-z\s]')
+
+    def __init__(self, db: DatabaseOperations, min_score: float = 0.6, max_block_size: int = 50):
+        """Initialize with the database and scoring thresholds."""
+        self.db = db
+        self.min_score = min_score
+        self.max_block_size = max_block_size
+        self.logger = logging.getLogger(__name__)
+
+    @classmethod
+    def fold_name(cls, name: str) -> str:
+        """Lowercase, strip Polish diacritics and sort words so "Nowak Anna" equals "Anna Nowak"."""
+        name = (name or '').replace('ł', 'l').replace('Ł', 'L')
+        name = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode().lower()
+        return ' '.join(sorted(cls._NON_LETTERS.sub(' ', name).split()))
+
+    @staticmethod
+    def trigrams(folded_name: str) -> set:
+        """Return the padded character trigrams of each word in a folded name."""
+        grams = set()
+        for word in folded_name.split():
+            padded = f"  {word} "
+            grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+        return grams
+
+    @staticmethod
+    def email_local_part(email: Optional[str]) -> Optional[str]:
+        """Return the mailbox name without dots or +tags, e.g. anna.nowak+spa -> annanowak."""
+        if not email or '@' not in email:
+            return None
+        local = email.split('@', 1)[0].lower().split('+', 1)[0].replace('.', '')
+        return local or None
+
+    def _load_clients(self) -> dict:
+        """Read active clients once into compact comparison records keyed by client_id."""
+        clients = {}
+        for row in self.db.iter_clients():
+            folded = self.fold_name(row['full_name'])
+            email = row['email'].lower() if row['email'] else None
+            clients[row['client_id']] = {
+                'phone': row.get('phone_e164') or normalize_phone(row['phone_number']) or row['phone_number'],
+                'email': email,
+                'email_local': self.email_local_part(email),
+                'trigrams': self.trigrams(folded),
+                'dob': row['dob']
+            }
+        return clients
+
+    def _candidate_pairs(self, clients: dict) -> set:
+        """Return (low_id, high_id) pairs that share a phone, mailbox or enough name trigrams."""
+        exact_blocks = defaultdict(list)
+        trigram_blocks = defaultdict(list)
+        for client_id, client in clients.items():
+            exact_blocks[('phone', client['phone'])].append(client_id)
+            if client['email_local']:
+                exact_blocks[('email', client['email_local'])].append(client_id)
+            for gram in client['trigrams']:
+                trigram_blocks[gram].append(client_id)
+
+        pairs = set()
+        skipped = 0
+        for members in exact_blocks.values():
+            # A front-desk phone or a mailbox like "biuro" shared by many clients identifies none of them
+            if len(members) > self.max_block_size:
+                skipped += 1
+                continue
+            pairs.update(combinations(sorted(members), 2))
+        shared = defaultdict(int)
+        for members in trigram_blocks.values():
+            if len(members) > self.max_block_size:
+                skipped += 1
+                continue
+            for pair in combinations(sorted(members), 2):
+                shared[pair] += 1
+        pairs.update(pair for pair, count in shared.items() if count >= self.MIN_SHARED_TRIGRAMS)
+        self.logger.info(f"Blocking produced {len(pairs)} candidate pairs from {len(clients)} clients "
+                         f"({skipped} oversized blocks skipped)")
+        return pairs
+
+    def score(self, first: dict, second: dict) -> tuple:
+        """Return (score, reasons) for two comparison records."""
+        score, reasons = 0.0, []
+        if first['phone'] and first['phone'] == second['phone']:
+            score += self.PHONE_WEIGHT
+            reasons.append('same phone')
+        if first['email'] and first['email'] == second['email']:
+            score += self.EMAIL_WEIGHT
+            reasons.append('same email')
+        elif first['email_local'] and first['email_local'] == second['email_local']:
+            score += self.EMAIL_LOCAL_WEIGHT
+            reasons.append('same email mailbox')
+        union = first['trigrams'] | second['trigrams']
+        if union:
+            similarity = len(first['trigrams'] & second['trigrams']) / len(union)
+            score += self.NAME_WEIGHT * similarity
+            if similarity >= 0.5:
+                reasons.append(f"similar name ({similarity:.0%})")
+        if first['dob'] and second['dob']:
+            if first['dob'] == second['dob']:
+                score += self.DOB_MATCH_WEIGHT
+                reasons.append('same date of birth')
+            else:
+                score -= self.DOB_CONFLICT_PENALTY
+                reasons.append('different date of birth')
+        return round(max(0.0, min(1.0, score)), 3), reasons
+
+    def merge_queue(self, limit: int = None) -> List[dict]:
+        """Return candidate duplicates, best first, as keep_id/drop_id/score/reasons dicts.
+
+        The older record (lower client_id) is proposed as the one to keep.
+        """
+        try:
+            clients = self._load_clients()
+            queue = []
+            for keep_id, drop_id in self._candidate_pairs(clients):
+                score, reasons = self.score(clients[keep_id], clients[drop_id])
+                if score >= self.min_score:
+                    queue.append({'keep_id': keep_id, 'drop_id': drop_id, 'score': score, 'reasons': reasons})
+            queue.sort(key=lambda item: (-item['score'], item['keep_id'], item['drop_id']))
+            self.logger.info(f"Found {len(queue)} likely duplicate pairs")
+            return queue[:limit] if limit is not None else queue
+        except Exception as e:
+            self.logger.error(f"Error detecting duplicate clients: {e}")
+            raise
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    detector = DuplicateDetector(DatabaseOperations("config/secrets.yaml", "data/database.db"))
+    for item in detector.merge_queue(limit=20):
+        print(f"{item['score']:.2f}  keep {item['keep_id']}  drop {item['drop_id']}  {', '.join(item['reasons'])}")
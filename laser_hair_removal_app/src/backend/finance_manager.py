@@ -7,6 +7,24 @@ from typing import List, Optional
 class FinanceManager:
     """Manages financial operations for the laser hair removal application."""
     
+    # Same aggregation migration 003 uses to backfill daily_finance
+    DAILY_FINANCE_SOURCE = """
+        SELECT day, SUM(revenue), SUM(expenses), SUM(appointment_count)
+        FROM (
+            SELECT appointment_date AS day, amount AS revenue, 0 AS expenses, 1 AS appointment_count
+            FROM appointments WHERE appointment_status = 'Completed'
+            UNION ALL
+            SELECT expense_date, 0, amount, 0 FROM expenses
+        )
+        GROUP BY day
+    """
+    # Bucket start date for each get_pnl granularity; weeks start on Monday
+    PNL_BUCKETS = {
+        'day': "day",
+        'week': "date(day, 'weekday 0', '-6 days')",
+        'month': "strftime('%Y-%m-01', day)"
+    }
+    
     def __init__(self, config_path: str, db_path: str):
         """Initialize with database configuration and path."""
         self.db = DatabaseOperations(config_path, db_path)
@@ -40,8 +58,9 @@ class FinanceManager:
                 VALUES (?, ?, ?, ?)
             """
             params = (expense.expense_date, expense.amount, expense.description, expense.category_id)
-            self.db.execute_query(query, params)
-            expense_id = self.db.conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+            with self.db.transaction():
+                self.db.execute_query(query, params)
+                expense_id = self.db.conn.execute("SELECT last_insert_rowid()").fetchone()[0]
             self.logger.info(f"Added expense {amount} with ID {expense_id}")
             return expense_id
         except ValueError as e:
@@ -69,9 +88,9 @@ class FinanceManager:
         """Calculate total revenue from completed appointments between dates."""
         try:
             query = """
-                SELECT SUM(amount) as total_revenue 
-                FROM appointments 
-                WHERE appointment_date BETWEEN ? AND ? AND appointment_status = 'Completed'
+                SELECT COALESCE(SUM(revenue), 0) as total_revenue 
+                FROM daily_finance 
+                WHERE day BETWEEN ? AND ?
             """
             results = self.db.execute_query(query, (start_date, end_date))
             return float(results[0].get('total_revenue', 0.0)) if results else 0.0
@@ -79,17 +98,75 @@ class FinanceManager:
             self.logger.error(f"Error calculating revenue between {start_date} and {end_date}: {e}")
             raise
     
+    def get_expense_total_by_date(self, start_date: str, end_date: str) -> float:
+        """Calculate total expenses between dates."""
+        try:
+            query = """
+                SELECT COALESCE(SUM(expenses), 0) as total_expenses 
+                FROM daily_finance 
+                WHERE day BETWEEN ? AND ?
+            """
+            results = self.db.execute_query(query, (start_date, end_date))
+            return float(results[0].get('total_expenses', 0.0)) if results else 0.0
+        except Exception as e:
+            self.logger.error(f"Error calculating expenses between {start_date} and {end_date}: {e}")
+            raise
+    
     def get_profit_by_date(self, start_date: str, end_date: str) -> float:
         """Calculate profit as revenue minus expenses between dates."""
         try:
-            revenue = self.get_revenue_by_date(start_date, end_date)
-            expenses = sum(exp.amount for exp in self.get_expenses_by_date(start_date, end_date))
-            profit = revenue - expenses
+            query = """
+                SELECT COALESCE(SUM(revenue), 0) - COALESCE(SUM(expenses), 0) as profit 
+                FROM daily_finance 
+                WHERE day BETWEEN ? AND ?
+            """
+            results = self.db.execute_query(query, (start_date, end_date))
+            profit = float(results[0].get('profit', 0.0)) if results else 0.0
             self.logger.info(f"Calculated profit {profit} between {start_date} and {end_date}")
             return profit
         except Exception as e:
             self.logger.error(f"Error calculating profit between {start_date} and {end_date}: {e}")
             raise
+    
+    def get_pnl(self, start_date: str, end_date: str, granularity: str = 'day') -> List[dict]:
+        """Return revenue, expenses, profit and completed appointments per bucket between dates.
+        
+        Each row is keyed by ``period``, the first day of its bucket; buckets
+        with no activity are omitted. One grouped query over daily_finance.
+        """
+        bucket = self.PNL_BUCKETS.get(granularity)
+        if bucket is None:
+            raise ValueError(f"Granularity must be one of {list(self.PNL_BUCKETS)}")
+        try:
+            query = f"""
+                SELECT {bucket} as period,
+                       SUM(revenue) as revenue,
+                       SUM(expenses) as expenses,
+                       SUM(revenue) - SUM(expenses) as profit,
+                       SUM(appointment_count) as appointment_count
+                FROM daily_finance
+                WHERE day BETWEEN ? AND ?
+                GROUP BY period
+                ORDER BY period ASC
+            """
+            return self.db.execute_query(query, (start_date, end_date))
+        except Exception as e:
+            self.logger.error(f"Error calculating P&L between {start_date} and {end_date}: {e}")
+            raise
+    
+    def rebuild_daily_finance(self) -> int:
+        """Regenerate daily_finance from appointments and expenses; return the number of days."""
+        try:
+            with self.db.transaction():
+                self.db.execute_query("DELETE FROM daily_finance")
+                days = self.db.execute_query(
+                    "INSERT INTO daily_finance (day, revenue, expenses, appointment_count)" + self.DAILY_FINANCE_SOURCE
+                )
+            self.logger.info(f"Rebuilt daily_finance with {days} days")
+            return days
+        except Exception as e:
+            self.logger.error(f"Error rebuilding daily_finance: {e}")
+            raise
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
@@ -24,9 +24,10 @@ class HardwareManager:
                 VALUES (?, ?, ?)
             """
             params = (hardware.equipment_name, hardware.purchase_date, hardware.maximum_impulses_on_purchase)
-            self.db.execute_query(query, params)
-            hardware_id = self.db.conn.execute("SELECT last_insert_rowid()").fetchone()[0]
-            self._schedule_initial_reminders(hardware_id)
+            with self.db.transaction():
+                self.db.execute_query(query, params)
+                hardware_id = self.db.conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                self._schedule_initial_reminders(hardware_id)
             self.logger.info(f"Added hardware {equipment_name} with ID {hardware_id}")
             return hardware_id
         except ValueError as e:
@@ -39,17 +40,18 @@ class HardwareManager:
     def record_impulse(self, hardware_id: int, impulses: int) -> bool:
         """Record impulses used and update total_impulses_recorded."""
         try:
-            current_hardware = self.get_hardware(hardware_id)
-            if not current_hardware:
-                self.logger.warning(f"Hardware {hardware_id} not found for impulse recording")
-                return False
-            new_total = current_hardware.total_impulses_recorded + impulses
-            hardware = Hardware(hardware_id, current_hardware.equipment_name, current_hardware.purchase_date,
-                              current_hardware.last_maintenance_date, current_hardware.next_maintenance_due_date,
-                              current_hardware.last_insurance_date, current_hardware.next_insurance_date,
-                              current_hardware.maximum_impulses_on_purchase, new_total)
-            query = "UPDATE hardware SET total_impulses_recorded = ? WHERE hardware_id = ?"
-            self.db.execute_query(query, (hardware.total_impulses_recorded, hardware_id))
+            with self.db.transaction():
+                current_hardware = self.get_hardware(hardware_id)
+                if not current_hardware:
+                    self.logger.warning(f"Hardware {hardware_id} not found for impulse recording")
+                    return False
+                new_total = current_hardware.total_impulses_recorded + impulses
+                hardware = Hardware(hardware_id, current_hardware.equipment_name, current_hardware.purchase_date,
+                                  current_hardware.last_maintenance_date, current_hardware.next_maintenance_due_date,
+                                  current_hardware.last_insurance_date, current_hardware.next_insurance_date,
+                                  current_hardware.maximum_impulses_on_purchase, new_total)
+                query = "UPDATE hardware SET total_impulses_recorded = ? WHERE hardware_id = ?"
+                self.db.execute_query(query, (hardware.total_impulses_recorded, hardware_id))
             self.logger.info(f"Recorded {impulses} impulses for hardware {hardware_id}")
             return True
         except ValueError as e:
@@ -21,8 +21,9 @@ class InventoryManager:
                 VALUES (?, ?, ?, ?)
             """
             params = (inventory.item_name, inventory.current_quantity, inventory.unit, inventory.low_stock_threshold)
-            self.db.execute_query(query, params)
-            item_id = self.db.conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+            with self.db.transaction():
+                self.db.execute_query(query, params)
+                item_id = self.db.conn.execute("SELECT last_insert_rowid()").fetchone()[0]
             self.logger.info(f"Added inventory item {item_name} with ID {item_id}")
             return item_id
         except ValueError as e:
@@ -35,13 +36,14 @@ class InventoryManager:
     def update_quantity(self, item_id: int, new_quantity: float) -> bool:
         """Update the current quantity of an inventory item."""
         try:
-            current_item = self.get_item(item_id)
-            if not current_item:
-                self.logger.warning(f"Inventory item {item_id} not found for update")
-                return False
-            inventory = Inventory(item_id, current_item.item_name, new_quantity, current_item.unit, current_item.low_stock_threshold)
-            query = "UPDATE inventory SET current_quantity = ? WHERE item_id = ?"
-            self.db.execute_query(query, (inventory.current_quantity, item_id))
+            with self.db.transaction():
+                current_item = self.get_item(item_id)
+                if not current_item:
+                    self.logger.warning(f"Inventory item {item_id} not found for update")
+                    return False
+                inventory = Inventory(item_id, current_item.item_name, new_quantity, current_item.unit, current_item.low_stock_threshold)
+                query = "UPDATE inventory SET current_quantity = ? WHERE item_id = ?"
+                self.db.execute_query(query, (inventory.current_quantity, item_id))
             self.logger.info(f"Updated quantity for item {item_id} to {new_quantity}")
             return True
         except ValueError as e:
@@ -0,0 +1,228 @@
+from src.database.db_operations import DatabaseOperations
+import hashlib
+import json
+import logging
+import random
+import threading
+from collections import defaultdict
+from typing import List
+
+class Outbox:
+    """Durable queue of calendar, email and SMS side effects, stored in the outbox table.
+
+    enqueue() is meant to run inside the caller's transaction, so a side
+    effect is recorded if and only if the booking that caused it commits.
+    """
+
+    CHANNELS = ('calendar', 'email', 'sms')
+
+    def __init__(self, db: DatabaseOperations):
+        """Initialize with the database holding the outbox table."""
+        self.db = db
+        self.logger = logging.getLogger(__name__)
+
+    def enqueue(self, channel: str, idempotency_key: str, payload: dict) -> bool:
+        """Record a side effect; return False if one with the same key was already queued."""
+        if channel not in self.CHANNELS:
+            raise ValueError(f"Channel must be one of {self.CHANNELS}")
+        query = "INSERT OR IGNORE INTO outbox (idempotency_key, channel, payload) VALUES (?, ?, ?)"
+        return self.db.execute_query(query, (idempotency_key, channel, json.dumps(payload))) == 1
+
+    @staticmethod
+    def event_id(idempotency_key: str) -> str:
+        """Return a stable Google Calendar event id (base32hex alphabet) for a key."""
+        return hashlib.sha1(idempotency_key.encode('utf-8')).hexdigest()
+
+    def claim(self, limit: int, lease_seconds: int, channels: tuple = CHANNELS) -> List[dict]:
+        """Return up to limit due messages and push their next attempt past the lease.
+
+        A dispatcher that dies mid-send leaves its messages to be picked up
+        again once the lease runs out, so delivery is at least once.
+        """
+        placeholders = ', '.join('?' for _ in channels)
+        with self.db.transaction():
+            messages = self.db.execute_query(f"""
+                SELECT message_id, idempotency_key, channel, payload, attempts FROM outbox
+                WHERE status = 'pending' AND next_attempt_at <= datetime('now') AND channel IN ({placeholders})
+                ORDER BY next_attempt_at, message_id LIMIT ?
+            """, (*channels, limit))
+            if messages:
+                self.db.execute_many("UPDATE outbox SET next_attempt_at = datetime('now', ?) WHERE message_id = ?",
+                                     [(f"+{lease_seconds} seconds", message['message_id']) for message in messages])
+        for message in messages:
+            message['payload'] = json.loads(message['payload'])
+        return messages
+
+    def mark_sent(self, message_ids: List[int]) -> None:
+        """Mark messages delivered."""
+        self.db.execute_many("UPDATE outbox SET status = 'sent', sent_at = CURRENT_TIMESTAMP, last_error = NULL "
+                             "WHERE message_id = ?", [(message_id,) for message_id in message_ids])
+
+    def mark_failed(self, failures: List[tuple], max_attempts: int, backoff_seconds: float,
+                    max_backoff_seconds: float, permanent: bool = False) -> None:
+        """Schedule a retry for each (message, error) with jittered exponential backoff.
+
+        A message gives up (status 'failed') after max_attempts, or at once
+        when permanent is set.
+        """
+        rows = []
+        for message, error in failures:
+            attempts = message['attempts'] + 1
+            delay = min(max_backoff_seconds, backoff_seconds * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+            status = 'failed' if permanent or attempts >= max_attempts else 'pending'
+            rows.append((attempts, str(error)[:500], status, f"+{int(delay)} seconds", message['message_id']))
+        self.db.execute_many("""
+            UPDATE outbox SET attempts = ?, last_error = ?, status = ?, next_attempt_at = datetime('now', ?)
+            WHERE message_id = ?
+        """, rows)
+
+    def requeue_failed(self) -> int:
+        """Give failed messages a fresh set of attempts; return how many were requeued."""
+        return self.db.execute_query("""
+            UPDATE outbox SET status = 'pending', attempts = 0, next_attempt_at = CURRENT_TIMESTAMP
+            WHERE status = 'failed'
+        """)
+
+    def purge_sent(self, older_than_days: int = 30) -> int:
+        """Delete delivered messages older than the given number of days."""
+        return self.db.execute_query("DELETE FROM outbox WHERE status = 'sent' AND sent_at < datetime('now', ?)",
+                                     (f"-{older_than_days} days",))
+
+    def counts(self) -> dict:
+        """Return {status: count} for the outbox."""
+        rows = self.db.execute_query("SELECT status, COUNT(*) AS count FROM outbox GROUP BY status")
+        return {row['status']: row['count'] for row in rows}
+
+class OutboxDispatcher(threading.Thread):
+    """Background worker that drains the outbox through the calendar, email and SMS senders.
+
+    Each round claims a batch of due messages, sends them grouped by channel
+    (calendar inserts as one batched API call) and records the outcome.
+    ValueError from a sender is treated as permanent (bad address, gateway
+    not configured); anything else is retried with backoff. Channels without
+    a sender are left queued.
+    """
+
+    def __init__(self, db: DatabaseOperations, calendar_sync=None, email_sender=None, sms_sender=None):
+        """Initialize with the database and whichever senders are available."""
+        super().__init__(name='outbox-dispatcher', daemon=True)
+        self.outbox = Outbox(db)
+        self.logger = logging.getLogger(__name__)
+        self.calendar_sync = calendar_sync
+        self.email_sender = email_sender
+        self.sms_sender = sms_sender
+        self.senders = {'calendar': self._send_calendar, 'email': self._send_email, 'sms': self._send_sms}
+        self.channels = tuple(channel for channel, sender in
+                              (('calendar', calendar_sync), ('email', email_sender), ('sms', sms_sender)) if sender)
+        self.poll_seconds = float(db.config.get('outbox.poll_seconds', 1.0))
+        self.batch_size = int(db.config.get('outbox.batch_size', 50))
+        self.lease_seconds = int(db.config.get('outbox.lease_seconds', 300))
+        self.max_attempts = int(db.config.get('outbox.max_attempts', 8))
+        self.backoff_seconds = float(db.config.get('outbox.backoff_seconds', 30))
+        self.max_backoff_seconds = float(db.config.get('outbox.max_backoff_seconds', 3600))
+        self._stopping = threading.Event()
+        self._wakeup = threading.Event()
+
+    def run(self):
+        """Dispatch until stop() is called, sleeping between rounds while the outbox is empty."""
+        try:
+            self.outbox.purge_sent(int(self.outbox.db.config.get('outbox.keep_sent_days', 30)))
+            while not self._stopping.is_set():
+                try:
+                    handled = self.dispatch_once()
+                except Exception as e:
+                    self.logger.error(f"Error dispatching outbox: {e}")
+                    handled = 0
+                if handled < self.batch_size:
+                    self._wakeup.wait(self.poll_seconds)
+                    self._wakeup.clear()
+        finally:
+            for sender in (self.email_sender, self.sms_sender):
+                if sender:
+                    sender.close()
+            self.outbox.db.close_connection()
+
+    def wake(self) -> None:
+        """Start the next round now instead of after the poll interval."""
+        self._wakeup.set()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Finish the current round and stop the worker."""
+        self._stopping.set()
+        self._wakeup.set()
+        if self.is_alive():
+            self.join(timeout)
+
+    def dispatch_once(self) -> int:
+        """Send one batch of due messages; return how many were handled."""
+        if not self.channels:
+            return 0
+        messages = self.outbox.claim(self.batch_size, self.lease_seconds, self.channels)
+        by_channel = defaultdict(list)
+        for message in messages:
+            by_channel[message['channel']].append(message)
+
+        sent, retry, permanent = [], [], []
+        for channel, batch in by_channel.items():
+            for message, error in self.senders[channel](batch):
+                if error is None:
+                    sent.append(message['message_id'])
+                elif isinstance(error, ValueError):
+                    permanent.append((message, error))
+                else:
+                    retry.append((message, error))
+        if sent:
+            self.outbox.mark_sent(sent)
+        for failures, is_permanent in ((retry, False), (permanent, True)):
+            if failures:
+                self.outbox.mark_failed(failures, self.max_attempts, self.backoff_seconds,
+                                        self.max_backoff_seconds, permanent=is_permanent)
+        if messages:
+            self.logger.info(f"Outbox: {len(sent)} sent, {len(retry)} to retry, {len(permanent)} failed")
+        return len(messages)
+
+    def _send_calendar(self, messages: List[dict]) -> List[tuple]:
+        """Insert calendar events in one batched call, then delete the events they replace in another.
+        
+        Event ids derived from the key make retries idempotent: a repeated
+        insert is a conflict and a repeated delete finds nothing, and both
+        count as done. A message is only sent once its replaced event is gone.
+        """
+        events = [(m['payload']['appointment_id'], m['payload']['appointment_date'], m['payload']['client_name'],
+                   m['payload'].get('slot_start'), m['payload'].get('slot_end'), self.outbox.event_id(m['idempotency_key']))
+                  for m in messages]
+        try:
+            event_ids = self.calendar_sync.add_events(events)
+        except Exception as e:
+            return [(message, e) for message in messages]
+        results = [(message, None if event_id else RuntimeError("Calendar insert failed"))
+                   for message, event_id in zip(messages, event_ids)]
+        
+        replaced = [(index, message['payload']['replaces_event_id']) for index, (message, error) in enumerate(results)
+                    if error is None and message['payload'].get('replaces_event_id')]
+        if replaced:
+            try:
+                deleted = self.calendar_sync.delete_events([event_id for _, event_id in replaced])
+                errors = [None if done else RuntimeError("Calendar delete failed") for done in deleted]
+            except Exception as e:
+                errors = [e] * len(replaced)
+            for (index, _), error in zip(replaced, errors):
+                if error:
+                    results[index] = (results[index][0], error)
+        return results
+
+    def _send_email(self, messages: List[dict]) -> List[tuple]:
+        """Send the emails over one SMTP session, collecting per-message errors."""
+        errors = self.email_sender.send_batch([(m['payload']['to'], m['payload']['subject'], m['payload']['message'])
+                                               for m in messages])
+        return list(zip(messages, errors))
+
+    def _send_sms(self, messages: List[dict]) -> List[tuple]:
+        """Send the SMS concurrently within the gateway rate limit, collecting per-message errors."""
+        errors = self.sms_sender.send_many([(m['payload']['to'], m['payload']['message']) for m in messages])
+        return list(zip(messages, errors))
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    db = DatabaseOperations("config/secrets.yaml", "data/database.db")
+    print(f"Outbox: {Outbox(db).counts()}")
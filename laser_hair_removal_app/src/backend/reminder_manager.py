@@ -1,4 +1,5 @@
 from src.database.db_operations import DatabaseOperations
+from src.models.client import Client
 from src.models.reminder import Reminder
 from src.utils.email_sender import EmailSender
 from src.utils.sms_sender import SMSSender
@@ -32,8 +33,9 @@ class ReminderManager:
             """
             params = (reminder.reminder_type, reminder.related_id, reminder.due_date, reminder.reminder_date, 
                       reminder.message, reminder.delivery_method)
-            self.db.execute_query(query, params)
-            reminder_id = self.db.conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+            with self.db.transaction():
+                self.db.execute_query(query, params)
+                reminder_id = self.db.conn.execute("SELECT last_insert_rowid()").fetchone()[0]
             self.logger.info(f"Scheduled reminder {reminder_id} for {reminder_type}")
             return reminder_id
         except ValueError as e:
@@ -87,12 +89,11 @@ class ReminderManager:
             self.logger.error(f"Error processing reminders: {e}")
             raise
     
-    def _get_client(self, client_id: int) -> Optional[dict]:
-        """Helper method to retrieve client data (placeholder)."""
+    def _get_client(self, client_id: int) -> Optional[Client]:
+        """Helper method to retrieve client through the shared identity map."""
         try:
-            query = "SELECT * FROM clients WHERE client_id = ?"
-            results = self.db.execute_query(query, (client_id,))
-            return results[0] if results else None
+            result = self.db.get_client(client_id)
+            return Client.from_dict(result) if result else None
         except Exception as e:
             self.logger.error(f"Error retrieving client {client_id}: {e}")
             raise
@@ -49,13 +49,13 @@ class Reporting:
     def get_client_progress_report(self, client_id: int):
         """Generate a client progress report."""
         try:
-            client = self.client_manager.get_client(client_id)
-            if not client:
+            summary = self.client_manager.get_client_summary(client_id)
+            if not summary:
                 raise ValueError(f"Client {client_id} not found")
-            appointments = self.appointment_manager.get_appointments_by_client(client_id)
-            sessions_completed = sum(1 for appt in appointments if appt[7] == 'Completed')  # appointment_status index
-            self.logger.info("Generated client progress report for client %d: %d sessions", client_id, sessions_completed)
-            return {"type": "client_progress", "client_id": client_id, "full_name": client[1], "sessions_completed": sessions_completed, "appointments": appointments}
+            self.logger.info("Generated client progress report for client %d: %d sessions", client_id, summary['sessions_completed'])
+            return {"type": "client_progress", "client_id": client_id, "full_name": summary['client'].full_name,
+                    "sessions_completed": summary['sessions_completed'], "total_spend": summary['total_spend'],
+                    "areas": summary['areas'], "outstanding_reminders": summary['outstanding_reminders']}
         except Exception as e:
             self.logger.error("Error generating client progress report: %s", str(e))
             raise
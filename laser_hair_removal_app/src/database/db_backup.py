@@ -0,0 +1,133 @@
+import os
+import glob
+import time
+from datetime import datetime
+from typing import Callable, Optional
+from pysqlcipher3 import dbapi2 as sqlite3
+from src.database.db_operations import DatabaseOperations
+from src.utils.logger import Logger
+
+class DatabaseBackup:
+    """Online, incremental backups of the encrypted database with rotation."""
+
+    FILE_PREFIX = 'database_'
+    HISTORY_FILE = 'backup_history.csv'
+
+    def __init__(self, db: DatabaseOperations, backup_dir: str = None):
+        """Initialize from a DatabaseOperations instance and optional target directory."""
+        self.db = db
+        self.config = db.config
+        self.logger = Logger().get_logger(__name__)
+        self.backup_dir = backup_dir or self.config.get('backup.dir', 'data/backups')
+        self.pages_per_step = int(self.config.get('backup.pages_per_step', 256))
+        self.keep = int(self.config.get('backup.keep', 7))
+
+    def run(self, progress: Optional[Callable[[int, int], None]] = None) -> dict:
+        """Copy the live database into a new timestamped file and rotate old copies.
+
+        ``progress(copied_pages, total_pages)`` is called after every step. Safe to
+        call from a worker thread: it reads through that thread's own connection,
+        and writers on other connections proceed between steps. Drivers without
+        the backup API fall back to one sqlcipher_export on a separate connection.
+        """
+        os.makedirs(self.backup_dir, exist_ok=True)
+        target = os.path.join(self.backup_dir, f"{self.FILE_PREFIX}{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.db")
+        partial = target + '.partial'
+        started = time.perf_counter()
+        try:
+            source = self.db.get_reader_connection()
+            pages = self._copy(source, partial, progress)
+            os.replace(partial, target)
+        except Exception as e:
+            if os.path.exists(partial):
+                os.remove(partial)
+            self.logger.error("Backup to %s failed: %s", target, str(e))
+            raise
+
+        duration = time.perf_counter() - started
+        size = os.path.getsize(target)
+        result = {
+            'path': target,
+            'pages': pages,
+            'bytes': size,
+            'duration_s': round(duration, 3),
+            'mb_per_s': round(size / (1024 * 1024) / duration, 2) if duration > 0 else 0.0
+        }
+        self._record(result)
+        self.rotate()
+        self.logger.info("Backed up database to %s: %d bytes in %.2f s (%.2f MB/s)",
+                         target, size, duration, result['mb_per_s'])
+        return result
+
+    def _copy(self, source, target_path: str, progress: Optional[Callable[[int, int], None]]) -> int:
+        """Copy pages into an encrypted target keyed like the source; return total pages."""
+        if not self._supports_backup_api(source):
+            return self._export(target_path, progress)
+        target = sqlite3.connect(target_path)
+        try:
+            # The copy gets its own salt, so it is keyed with the passphrase rather than the source's raw key
+            target.execute(f"PRAGMA key = {self.db.connection_manager.passphrase_literal()}")
+            copied = {'total': 0}
+
+            def on_step(status, remaining, total):
+                copied['total'] = total
+                if progress:
+                    progress(total - remaining, total)
+
+            source.backup(target, pages=self.pages_per_step, progress=on_step)
+            return copied['total']
+        finally:
+            target.close()
+
+    @staticmethod
+    def _supports_backup_api(conn) -> bool:
+        """Return True if the driver exposes the online backup API (many pysqlcipher3 builds do not)."""
+        return hasattr(conn, 'backup')
+
+    def _export(self, target_path: str, progress: Optional[Callable[[int, int], None]]) -> int:
+        """Copy through sqlcipher_export on a dedicated connection; return total pages.
+
+        The export writes to an attached file, which a query_only reader
+        refuses, so it gets its own read-write connection. It is a single
+        statement, so progress is reported before and after it.
+        """
+        conn = self.db.connection_manager.open_connection()
+        try:
+            total = conn.execute("PRAGMA page_count").fetchone()[0]
+            if progress:
+                progress(0, total)
+            conn.execute(f"ATTACH DATABASE ? AS backup KEY {self.db.connection_manager.passphrase_literal()}",
+                         (target_path,))
+            try:
+                conn.execute("SELECT sqlcipher_export('backup')")
+                total = conn.execute("PRAGMA backup.page_count").fetchone()[0]
+            finally:
+                conn.execute("DETACH DATABASE backup")
+            if progress:
+                progress(total, total)
+            return total
+        finally:
+            conn.close()
+
+    def _record(self, result: dict) -> None:
+        """Append the run's duration and throughput to the backup history file."""
+        history_path = os.path.join(self.backup_dir, self.HISTORY_FILE)
+        is_new = not os.path.exists(history_path)
+        with open(history_path, 'a') as f:
+            if is_new:
+                f.write("timestamp,path,pages,bytes,duration_s,mb_per_s\n")
+            f.write(f"{datetime.now().isoformat(timespec='seconds')},{result['path']},{result['pages']},"
+                    f"{result['bytes']},{result['duration_s']},{result['mb_per_s']}\n")
+
+    def rotate(self) -> list:
+        """Delete the oldest backups beyond the configured count; return removed paths."""
+        backups = sorted(glob.glob(os.path.join(self.backup_dir, f"{self.FILE_PREFIX}*.db")))
+        removed = backups[:-self.keep] if self.keep > 0 else []
+        for path in removed:
+            os.remove(path)
+            self.logger.info("Removed old backup %s", path)
+        return removed
+
+if __name__ == "__main__":
+    backup = DatabaseBackup(DatabaseOperations("config/secrets.yaml", "data/database.db"))
+    print(backup.run(lambda copied, total: print(f"{copied}/{total} pages")))
@@ -1,53 +1,774 @@
 import logging
+import math
+import threading
+import time
+import atexit
+import hashlib
 from pysqlcipher3 import dbapi2 as sqlite3
 from src.utils.config import Config
+from src.models.client import Client
 from src.utils.logger import Logger
+from src.utils.phone import normalize_phone
 import os
+import re
+from collections import OrderedDict, defaultdict, deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
 
-class DatabaseOperations:
-    """Handles CRUD operations for the encrypted SQLite database."""
+class QueryStats:
+    """Per-statement-shape timing histograms plus a slow-query log with query plans."""
+    
+    _STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+    _NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+    _IN_LIST = re.compile(r"\bIN\s*\((?:\s*\?\s*,?)+\)", re.IGNORECASE)
+    _WHITESPACE = re.compile(r"\s+")
+    SHAPE_CACHE_SIZE = 1024
+    
+    def __init__(self, slow_query_ms: float = 100.0, samples_per_shape: int = 1000, slow_log_size: int = 100):
+        """Keep the last samples_per_shape durations per shape for percentiles."""
+        self.slow_query_ms = slow_query_ms
+        self.samples_per_shape = samples_per_shape
+        self.logger = Logger().get_logger(__name__)
+        self._lock = threading.Lock()
+        self._shapes = {}  # shape -> {'count', 'total', 'max', 'samples', 'plan'}
+        self._shape_cache = {}  # query text -> shape; the managers' SQL strings repeat verbatim
+        self._slow_queries = deque(maxlen=slow_log_size)
+    
+    @classmethod
+    def shape(cls, query: str) -> str:
+        """Collapse literals, IN lists and whitespace so equivalent statements share a key."""
+        shape = cls._STRING_LITERAL.sub('?', query)
+        shape = cls._NUMBER_LITERAL.sub('?', shape)
+        shape = cls._IN_LIST.sub('IN (?)', shape)
+        return cls._WHITESPACE.sub(' ', shape).strip().rstrip(';').rstrip()
+    
+    def record(self, conn, query: str, params: tuple, seconds: float) -> None:
+        """Add one execution; log it with its query plan if it crossed the threshold."""
+        shape = self._shape_cache.get(query)
+        if shape is None:
+            shape = self.shape(query)
+            if len(self._shape_cache) >= self.SHAPE_CACHE_SIZE:
+                # Only SQL built with inlined literals churns the cache; repeated statements refill it at once
+                self._shape_cache.clear()
+            self._shape_cache[query] = shape
+        elapsed_ms = seconds * 1000
+        with self._lock:
+            entry = self._shapes.get(shape)
+            if entry is None:
+                entry = {'count': 0, 'total': 0.0, 'max': 0.0,
+                         'samples': deque(maxlen=self.samples_per_shape), 'plan': None}
+                self._shapes[shape] = entry
+            entry['count'] += 1
+            entry['total'] += elapsed_ms
+            entry['max'] = max(entry['max'], elapsed_ms)
+            entry['samples'].append(elapsed_ms)
+        if elapsed_ms < self.slow_query_ms:
+            return
+        plan = self._explain(conn, query, params)
+        with self._lock:
+            entry['plan'] = plan
+            self._slow_queries.append({'shape': shape, 'ms': round(elapsed_ms, 3), 'plan': plan,
+                                       'at': datetime.now().isoformat(timespec='seconds')})
+        self.logger.warning("Slow query (%.1f ms): %s\n%s", elapsed_ms, shape, '\n'.join(plan))
+    
+    def _explain(self, conn, query: str, params: tuple) -> list:
+        """Return EXPLAIN QUERY PLAN detail lines, indented by depth; empty if not explainable."""
+        if query.lstrip().upper().startswith(('EXPLAIN', 'PRAGMA', 'BEGIN', 'COMMIT', 'ROLLBACK')):
+            return []
+        try:
+            rows = conn.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+        except sqlite3.Error as e:
+            self.logger.warning("Could not explain slow query: %s", str(e))
+            return []
+        depth = {0: 0}
+        lines = []
+        for node_id, parent_id, _, detail in rows:
+            depth[node_id] = depth.get(parent_id, 0) + 1
+            lines.append('  ' * (depth[node_id] - 1) + detail)
+        return lines
+    
+    @staticmethod
+    def _percentile(ordered: list, fraction: float) -> float:
+        """Nearest-rank percentile of an already sorted list."""
+        if not ordered:
+            return 0.0
+        return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+    
+    def snapshot(self) -> list:
+        """Return one row per statement shape, most total time first."""
+        with self._lock:
+            entries = [(shape, dict(entry, samples=sorted(entry['samples']))) for shape, entry in self._shapes.items()]
+        rows = []
+        for shape, entry in entries:
+            rows.append({
+                'query': shape,
+                'count': entry['count'],
+                'total_ms': round(entry['total'], 3),
+                'p50_ms': round(self._percentile(entry['samples'], 0.50), 3),
+                'p95_ms': round(self._percentile(entry['samples'], 0.95), 3),
+                'max_ms': round(entry['max'], 3),
+                'plan': entry['plan']
+            })
+        return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+    
+    def slow_queries(self) -> list:
+        """Return the most recent slow queries, oldest first."""
+        with self._lock:
+            return list(self._slow_queries)
+    
+    def reset(self) -> None:
+        """Forget all recorded timings."""
+        with self._lock:
+            self._shapes.clear()
+            self._slow_queries.clear()
+    
+    @staticmethod
+    def format_table(rows: list) -> str:
+        """Render snapshot rows as a fixed-width text table."""
+        lines = [f"{'count':>7} {'total ms':>10} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}  query"]
+        for row in rows:
+            query = row['query'] if len(row['query']) <= 100 else row['query'][:97] + '...'
+            lines.append(f"{row['count']:>7} {row['total_ms']:>10.1f} {row['p50_ms']:>8.2f} "
+                         f"{row['p95_ms']:>8.2f} {row['max_ms']:>8.2f}  {query}")
+        return '\n'.join(lines)
+
+class IdentityMap:
+    """Shared, size-bounded LRU cache of rows keyed by (table, primary key).
+    
+    Writes through DatabaseOperations invalidate single keys or, for ad-hoc
+    statements, a whole table (by bumping its generation, so stale entries
+    are dropped lazily). Invalidations made inside a transaction are applied
+    again when it ends, since another thread may have cached the pre-commit
+    row meanwhile. Commits from any other connection or process change
+    ``PRAGMA data_version`` on the caller's writer and clear the whole map.
+    """
+    
+    def __init__(self, capacity: int = 1024):
+        """Hold at most capacity rows; 0 disables caching but still counts misses."""
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._rows = OrderedDict()  # (table, key) -> (generation, row), least recently used first
+        self._generations = {}  # table -> generation, bumped by table-wide invalidation
+        self._epoch = 0  # bumped by every invalidation so in-flight loads do not store stale rows
+        self._local = threading.local()  # data_version seen by this thread, pending invalidations
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+    
+    def _pending(self) -> set:
+        """Return the calling thread's invalidations made inside the open transaction."""
+        if not hasattr(self._local, 'pending'):
+            self._local.pending = set()
+        return self._local.pending
+    
+    def sync(self, conn) -> None:
+        """Clear the map if another connection committed since this thread last looked."""
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if getattr(self._local, 'data_version', None) != version:
+            self._local.data_version = version
+            self.clear()
+    
+    def lookup(self, table: str, key, load) -> Optional[dict]:
+        """Return a copy of the cached row, calling load() and caching its result on a miss."""
+        with self._lock:
+            entry = self._rows.get((table, key))
+            if entry is not None and entry[0] == self._generations.get(table, 0):
+                self._rows.move_to_end((table, key))
+                self.hits += 1
+                return dict(entry[1])
+            self.misses += 1
+            epoch = self._epoch
+        row = load()
+        if row is None or self.capacity <= 0:
+            return row
+        pending = self._pending()
+        if (table, key) in pending or (table, None) in pending:
+            return row  # this transaction changed it; the row may never commit
+        with self._lock:
+            if epoch == self._epoch:
+                self._rows[(table, key)] = (self._generations.get(table, 0), dict(row))
+                self._rows.move_to_end((table, key))
+                while len(self._rows) > self.capacity:
+                    self._rows.popitem(last=False)
+                    self.evictions += 1
+        return row
+    
+    def invalidate(self, table: str, key=None, in_transaction: bool = False) -> None:
+        """Drop one cached row, or every row of table when key is None."""
+        with self._lock:
+            if key is None:
+                self._generations[table] = self._generations.get(table, 0) + 1
+            else:
+                self._rows.pop((table, key), None)
+            self._epoch += 1
+            self.invalidations += 1
+        if in_transaction:
+            self._pending().add((table, key))
+    
+    def end_transaction(self) -> None:
+        """Re-apply the calling thread's invalidations once its transaction committed or rolled back."""
+        pending = self._pending()
+        for table, key in pending:
+            self.invalidate(table, key)
+        pending.clear()
+    
+    def clear(self) -> None:
+        """Drop every cached row."""
+        with self._lock:
+            self._rows.clear()
+            self._epoch += 1
+    
+    def stats(self) -> dict:
+        """Return hit/miss/eviction counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._rows),
+                'capacity': self.capacity,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+    
+    def reset_stats(self) -> None:
+        """Zero the counters without dropping cached rows."""
+        with self._lock:
+            self.hits = self.misses = self.evictions = self.invalidations = 0
+
+class ConnectionManager:
+    """Process-wide registry of encrypted connections, one per database file and thread."""
+    
+    _registry = {}
+    _registry_lock = threading.Lock()
+    
+    JOURNAL_MODES = ('delete', 'truncate', 'persist', 'memory', 'wal', 'off')
+    SYNCHRONOUS_LEVELS = ('off', 'normal', 'full', 'extra')
+    WRITER = 'writer'
+    READER = 'reader'
+    KEY_BYTES = 32
+    SALT_BYTES = 16  # stored as the first bytes of an encrypted database file
+    # cipher_default_kdf_algorithm values; SQLCipher before 4.0 has no such pragma and always uses SHA1
+    KDF_ALGORITHMS = {'PBKDF2_HMAC_SHA512': 'sha512', 'PBKDF2_HMAC_SHA256': 'sha256', 'PBKDF2_HMAC_SHA1': 'sha1'}
     
     def __init__(self, secrets_path: str, db_path: str):
-        """Initialize with secrets and database paths."""
+        """Load configuration and resolve the encryption key once for this database."""
         self.config = Config("config/app_config.yaml", secrets_path)
         self.db_path = db_path
         self.logger = Logger().get_logger(__name__)
         self.encryption_key = self.config.get('database.encryption_key', 'default_key')
-        self._ensure_connection()
-
-    def _ensure_connection(self):
-        """Ensure a valid database connection."""
+        self.journal_mode = str(self.config.get('database.journal_mode', 'delete')).lower()
+        if self.journal_mode not in self.JOURNAL_MODES:
+            raise ValueError(f"database.journal_mode must be one of {self.JOURNAL_MODES}")
+        self.use_wal = self.journal_mode == 'wal'
+        self.pragmas = self._load_pragmas()
+        # Prepared statements kept per connection, keyed by SQL text
+        self.statement_cache_size = int(self.config.get('database.statement_cache_size', 256))
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = {}  # (thread ident, role) -> connection
+        self._open_timings = []  # (thread ident, role, seconds) per connection opened
+        self._raw_key = None  # "x'...'" once derived, False when the passphrase has to be used
+        self._raw_key_verified = False
+        self._key_derivation_seconds = 0.0
+        self.query_stats = QueryStats(
+            slow_query_ms=float(self.config.get('database.slow_query_ms', 100)),
+            samples_per_shape=int(self.config.get('database.query_stats_samples', 1000))
+        )
+        # Rows by primary key, shared by every DatabaseOperations on this database
+        self.identity_map = IdentityMap(int(self.config.get('database.identity_map_size', 1024)))
+    
+    def _load_pragmas(self) -> list:
+        """Build the tuning pragmas applied to every new connection."""
+        pragmas = []
+        synchronous = self.config.get('database.synchronous', 'normal' if self.use_wal else None)
+        if synchronous is not None:
+            if str(synchronous).lower() not in self.SYNCHRONOUS_LEVELS:
+                raise ValueError(f"database.synchronous must be one of {self.SYNCHRONOUS_LEVELS}")
+            pragmas.append(f"PRAGMA synchronous = {str(synchronous).upper()}")
+        for name in ('cache_size', 'mmap_size'):
+            value = self.config.get(f'database.{name}')
+            if value is not None:
+                pragmas.append(f"PRAGMA {name} = {int(value)}")
+        return pragmas
+    
+    @classmethod
+    def for_database(cls, secrets_path: str, db_path: str) -> 'ConnectionManager':
+        """Return the shared manager for a database, creating it on first use."""
+        key = (os.path.abspath(db_path), os.path.abspath(secrets_path))
+        with cls._registry_lock:
+            manager = cls._registry.get(key)
+            if manager is None:
+                manager = cls(secrets_path, db_path)
+                cls._registry[key] = manager
+            return manager
+    
+    @classmethod
+    def close_all_managers(cls):
+        """Close every connection held by every registered manager."""
+        with cls._registry_lock:
+            managers = list(cls._registry.values())
+            cls._registry.clear()
+        for manager in managers:
+            manager.close_all()
+    
+    def get_connection(self):
+        """Return the calling thread's read-write connection, opening it on first use."""
+        return self._get(self.WRITER)
+    
+    def get_reader_connection(self):
+        """Return the calling thread's read-only connection.
+        
+        Only WAL mode lets readers run alongside the writer, so in any other
+        journal mode this is the read-write connection.
+        """
+        if not self.use_wal:
+            return self._get(self.WRITER)
+        return self._get(self.READER)
+    
+    def writer_in_transaction(self) -> bool:
+        """Return True if the calling thread's writer has uncommitted changes."""
+        conn = getattr(self._local, self.WRITER, None)
+        return conn is not None and self._is_open(conn) and conn.in_transaction
+    
+    @contextmanager
+    def transaction(self):
+        """Run a unit of work on the calling thread's writer.
+        
+        The outermost block commits once on exit and rolls back on error;
+        nested blocks become savepoints so an inner failure only undoes its own work.
+        """
+        conn = self.get_connection()
+        depth = getattr(self._local, 'depth', 0)
+        savepoint = f"uow_{depth}"
+        conn.execute("BEGIN IMMEDIATE" if depth == 0 else f"SAVEPOINT {savepoint}")
+        self._local.depth = depth + 1
         try:
-            self.conn = sqlite3.connect(self.db_path)
-            self.conn.execute(f"PRAGMA key = '{self.encryption_key}'")
-            self.logger.info("Database connection established at %s", self.db_path)
+            yield conn
+        except BaseException:
+            self._local.depth = depth
+            if depth == 0:
+                conn.execute("ROLLBACK")
+                self.identity_map.end_transaction()
+            else:
+                conn.execute(f"ROLLBACK TO SAVEPOINT {savepoint}")
+                conn.execute(f"RELEASE SAVEPOINT {savepoint}")
+            raise
+        self._local.depth = depth
+        try:
+            conn.execute("COMMIT" if depth == 0 else f"RELEASE SAVEPOINT {savepoint}")
+        except sqlite3.Error:
+            if depth == 0 and conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            if depth == 0:
+                self.identity_map.end_transaction()
+    
+    def _get(self, role: str):
+        """Return the calling thread's connection for a role, opening it if needed."""
+        conn = getattr(self._local, role, None)
+        if conn is not None and self._is_open(conn):
+            return conn
+        conn = self._open_connection(role)
+        setattr(self._local, role, conn)
+        with self._lock:
+            self._connections[(threading.get_ident(), role)] = conn
+        return conn
+    
+    def _open_connection(self, role: str):
+        """Open a new connection, apply the encryption key and tuning pragmas."""
+        started = time.perf_counter()
+        try:
+            # Each connection is only used by the thread that opened it; the flag
+            # lets close_all() release them from the shutdown thread. Statements
+            # autocommit unless they run inside transaction().
+            conn = self._key_connection(self._connect())
+            if role == self.WRITER:
+                conn.execute(f"PRAGMA journal_mode = {self.journal_mode.upper()}")
+            else:
+                conn.execute("PRAGMA query_only = ON")
+            # SQLCipher ignores mmap_size for encrypted pages; it is honoured for
+            # unencrypted databases opened with an empty key.
+            for pragma in self.pragmas:
+                conn.execute(pragma)
         except sqlite3.Error as e:
             self.logger.error("Failed to connect to database: %s", str(e))
             raise
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._open_timings.append((threading.get_ident(), role, elapsed))
+        self.logger.info("Database %s connection established at %s in %.1f ms", role, self.db_path, elapsed * 1000)
+        return conn
+    
+    def open_connection(self):
+        """Open a keyed read-write connection outside the per-thread registry; the caller closes it.
+        
+        For work that cannot share a thread's connections, e.g. a backup
+        export that writes to an attached file, which a query_only reader refuses.
+        """
+        return self._open_connection(self.WRITER)
+    
+    def _connect(self):
+        """Open an unkeyed connection to the database file."""
+        return sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None,
+                               cached_statements=self.statement_cache_size)
+    
+    def passphrase_literal(self) -> str:
+        """Return the passphrase quoted for PRAGMA key / ATTACH ... KEY."""
+        return "'" + str(self.encryption_key or '').replace("'", "''") + "'"
+    
+    def _key_connection(self, conn):
+        """Key a new connection, with the raw key derived for this database once it is known to open it.
+        
+        A passphrase makes SQLCipher run its KDF on every connection; the raw
+        key skips it. If the derived key does not read the file, it is
+        dropped and this and every later connection use the passphrase.
+        """
+        literal = self._raw_key_literal(conn)
+        if literal is None:
+            conn.execute(f"PRAGMA key = {self.passphrase_literal()}")
+            return conn
+        conn.execute(f"PRAGMA key = {literal}")
+        if self._raw_key_verified:
+            return conn
+        try:
+            conn.execute("SELECT count(*) FROM sqlite_master").fetchone()
+            self._raw_key_verified = True
+            return conn
+        except sqlite3.DatabaseError as e:
+            self.logger.warning("Derived key does not open %s (%s), keying with the passphrase", self.db_path, str(e))
+            with self._lock:
+                self._raw_key = False
+            conn.close()
+            conn = self._connect()
+            conn.execute(f"PRAGMA key = {self.passphrase_literal()}")
+            return conn
+    
+    def _raw_key_literal(self, conn) -> Optional[str]:
+        """Return the cached "x'<key>'" for this database, deriving it on first use; None means use the passphrase.
+        
+        The key is derived like SQLCipher derives it from the passphrase,
+        with the KDF settings of the library actually linked and the salt at
+        the start of the file. A file without a salt yet is created with the
+        passphrase, and the key is derived on a later open.
+        """
+        with self._lock:
+            if self._raw_key is not None:
+                return self._raw_key or None
+            if not self.encryption_key:
+                self._raw_key = False
+                return None
+            salt = self._read_salt()
+            if salt is None:
+                return None
+            kdf = self._kdf_settings(conn)
+            if kdf is None:
+                self._raw_key = False
+                return None
+            started = time.perf_counter()
+            algorithm, iterations = kdf
+            key = hashlib.pbkdf2_hmac(algorithm, str(self.encryption_key).encode('utf-8'), salt, iterations, self.KEY_BYTES)
+            self._raw_key = f"\"x'{key.hex()}'\""
+            self._key_derivation_seconds = time.perf_counter() - started
+            self.logger.info("Derived the database key (%s, %d iterations) in %.1f ms",
+                             algorithm, iterations, self._key_derivation_seconds * 1000)
+            return self._raw_key
+    
+    def _kdf_settings(self, conn) -> Optional[tuple]:
+        """Return (hashlib algorithm, iterations) of the linked SQLCipher's default KDF, or None if unknown."""
+        try:
+            version = conn.execute("PRAGMA cipher_version").fetchone()
+            if not version:
+                return None  # not SQLCipher
+            iterations = conn.execute("PRAGMA cipher_default_kdf_iter").fetchone()
+            algorithm = conn.execute("PRAGMA cipher_default_kdf_algorithm").fetchone()
+        except sqlite3.Error:
+            return None
+        if algorithm:
+            name = self.KDF_ALGORITHMS.get(str(algorithm[0]).upper())
+        else:
+            name = 'sha1' if str(version[0]).split('.')[0] in ('1', '2', '3') else None
+        if not name or not iterations:
+            return None
+        return name, int(iterations[0])
+    
+    def _read_salt(self) -> Optional[bytes]:
+        """Return the salt SQLCipher stored at the start of the file, or None if there is none (yet)."""
+        try:
+            with open(self.db_path, 'rb') as f:
+                salt = f.read(self.SALT_BYTES)
+        except FileNotFoundError:
+            return None
+        if len(salt) < self.SALT_BYTES or salt.startswith(b'SQLite format 3'):
+            return None  # empty, or an unencrypted database
+        return salt
+    
+    @staticmethod
+    def _is_open(conn) -> bool:
+        """Check whether a connection is still usable without running a query."""
+        try:
+            conn.total_changes
+            return True
+        except sqlite3.ProgrammingError:
+            return False
+    
+    def close_thread_connection(self):
+        """Close the calling thread's connections, if any."""
+        for role in (self.WRITER, self.READER):
+            conn = getattr(self._local, role, None)
+            if conn is None:
+                continue
+            setattr(self._local, role, None)
+            with self._lock:
+                self._connections.pop((threading.get_ident(), role), None)
+            if self._is_open(conn):
+                conn.close()
+                self.logger.info("Database %s connection closed", role)
+    
+    def close_all(self):
+        """Close the connections of all threads."""
+        with self._lock:
+            connections = list(self._connections.values())
+            self._connections.clear()
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                self.logger.warning("Error closing connection: %s", str(e))
+        self._local = threading.local()
+        self.logger.info("Closed %d database connections", len(connections))
+    
+    def stats(self) -> dict:
+        """Return the number of open connections and how long each open took."""
+        with self._lock:
+            open_roles = [role for (_, role), conn in self._connections.items() if self._is_open(conn)]
+            timings_ms = [round(seconds * 1000, 3) for _, _, seconds in self._open_timings]
+        return {
+            'db_path': self.db_path,
+            'journal_mode': self.journal_mode,
+            'open_connections': len(open_roles),
+            'open_readers': open_roles.count(self.READER),
+            'connections_opened': len(timings_ms),
+            'open_times_ms': timings_ms,
+            'total_open_time_ms': round(sum(timings_ms), 3),
+            'raw_key': bool(self._raw_key),
+            'key_derivation_ms': round(self._key_derivation_seconds * 1000, 3)
+        }
+
+atexit.register(ConnectionManager.close_all_managers)
+
+class DatabaseOperations:
+    """Handles CRUD operations for the encrypted SQLite database."""
+    
+    _WRITE_CLAUSE = r"(INSERT(?:\s+OR\s+(\w+))?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+(\w+)"
+    _WRITE_TARGET = re.compile(r"^\s*" + _WRITE_CLAUSE, re.IGNORECASE)
+    # CTE bodies can only be SELECTs, so in a WITH statement the first write clause is the main one
+    _CTE_WRITE_TARGET = re.compile(r"\b" + _WRITE_CLAUSE, re.IGNORECASE)
+    # Deleting a client cascades to its appointments
+    _CASCADES = {'clients': ('appointments',)}
+    # Aggregates cached in the identity map by client_id, and the tables whose writes make them stale
+    DERIVED_CACHES = {'client_summary': ('clients', 'appointments', 'owner_reminders')}
+    
+    def __init__(self, secrets_path: str, db_path: str):
+        """Initialize with secrets and database paths."""
+        self.connection_manager = ConnectionManager.for_database(secrets_path, db_path)
+        self.config = self.connection_manager.config
+        self.secrets_path = secrets_path
+        self.db_path = db_path
+        self.logger = Logger().get_logger(__name__)
+        self.encryption_key = self.connection_manager.encryption_key
+        self._units = threading.local()
+        self._row_mappers = {}  # column names -> tuple-to-dict mapper
+
+    @property
+    def conn(self):
+        """Shared connection for the calling thread."""
+        return self.connection_manager.get_connection()
 
     def get_connection(self):
         """Return the database connection."""
-        if not hasattr(self, 'conn') or self.conn is None:
-            self._ensure_connection()
-        return self.conn
+        return self.connection_manager.get_connection()
+
+    @contextmanager
+    def transaction(self):
+        """Group statements into one unit of work that commits once.
+        
+        Usage: ``with db.transaction(): db.add_client(...); db.add_appointment(...)``.
+        Nested blocks use savepoints; any exception rolls the block back.
+        """
+        with self.connection_manager.transaction():
+            yield self
+
+    def __enter__(self):
+        """Enter a unit of work; equivalent to ``with db.transaction()``."""
+        if not hasattr(self._units, 'stack'):
+            self._units.stack = []
+        unit = self.transaction()
+        unit.__enter__()
+        self._units.stack.append(unit)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Commit or roll back the unit of work opened by __enter__."""
+        return self._units.stack.pop().__exit__(exc_type, exc_value, traceback)
+
+    def get_reader_connection(self):
+        """Return the read-only connection used for queries outside a transaction."""
+        return self.connection_manager.get_reader_connection()
+
+    def _read_connection(self):
+        """Pick the reader unless the writer has uncommitted work this thread must see."""
+        if self.connection_manager.writer_in_transaction():
+            return self.connection_manager.get_connection()
+        return self.get_reader_connection()
+
+    @classmethod
+    def _is_read_query(cls, query: str) -> bool:
+        """Return True for statements that only read: SELECT, EXPLAIN, or WITH ... SELECT."""
+        keyword = query.lstrip().split(None, 1)[0].upper() if query.strip() else ''
+        if keyword == 'WITH':
+            return cls._cte_write_target(query) is None
+        return keyword in ('SELECT', 'EXPLAIN')
+
+    @classmethod
+    def _cte_write_target(cls, query: str):
+        """Return the write-clause match of a WITH statement, or None if it only reads."""
+        # Blank out string literals first, they may contain any keyword
+        return cls._CTE_WRITE_TARGET.search(QueryStats._STRING_LITERAL.sub("''", query))
+
+    def _row_mapper(self, description):
+        """Return a cached tuple-to-dict converter for a cursor description."""
+        columns = tuple(col[0] for col in description)
+        mapper = self._row_mappers.get(columns)
+        if mapper is None:
+            mapper = lambda row, _columns=columns: dict(zip(_columns, row))
+            self._row_mappers[columns] = mapper
+        return mapper
+
+    def execute_query(self, query: str, params: tuple = ()):
+        """Execute a statement; return rows as dicts for reads, affected row count for writes."""
+        is_read = self._is_read_query(query)
+        conn = self._read_connection() if is_read else self.get_connection()
+        started = time.perf_counter()
+        try:
+            cursor = conn.execute(query, params)
+            if is_read:
+                result = list(map(self._row_mapper(cursor.description), cursor.fetchall()))
+            else:
+                result = cursor.rowcount
+                if result == -1 and query.lstrip()[:4].upper() == 'WITH':
+                    # The sqlite3 module only counts rows for statements that start with the DML keyword
+                    result = conn.execute("SELECT changes()").fetchone()[0]
+                self._invalidate_written_table(query)
+        except sqlite3.Error as e:
+            self.logger.error("Error executing query: %s", str(e))
+            raise
+        self.connection_manager.query_stats.record(conn, query, params, time.perf_counter() - started)
+        return result
+
+    def execute_many(self, query: str, rows: Iterable[tuple]) -> int:
+        """Execute a write statement once per parameter tuple; return the affected row count."""
+        rows = list(rows)
+        conn = self.get_connection()
+        started = time.perf_counter()
+        try:
+            result = conn.executemany(query, rows).rowcount
+            self._invalidate_written_table(query)
+        except sqlite3.Error as e:
+            self.logger.error("Error executing batch: %s", str(e))
+            raise
+        # One stats entry for the whole batch; the first row stands in for EXPLAIN
+        self.connection_manager.query_stats.record(conn, query, rows[0] if rows else (), time.perf_counter() - started)
+        return result
+
+    def _invalidate(self, table: str, key=None, deleted: bool = False, inserted: bool = False):
+        """Drop cached rows (one key, or the whole table) and derived aggregates made stale by a write."""
+        stale = []
+        if table in self.PAGE_KEYS and not inserted:  # new AUTOINCREMENT rows cannot be cached yet
+            stale.append((table, key))
+        if deleted:
+            stale.extend((child, None) for child in self._CASCADES.get(table, ()))
+        stale.extend((name, None) for name, sources in self.DERIVED_CACHES.items() if table in sources)
+        identity_map = self.connection_manager.identity_map
+        in_transaction = self.connection_manager.writer_in_transaction()
+        for name, stale_key in stale:
+            identity_map.invalidate(name, stale_key, in_transaction)
+
+    def _invalidate_written_table(self, query: str):
+        """Invalidate everything cached from the table an ad-hoc write statement targets."""
+        match = self._WRITE_TARGET.match(query)
+        if match is None and query.lstrip()[:4].upper() == 'WITH':
+            match = self._cte_write_target(query)
+        if match is None:
+            return
+        verb = match.group(1).split()[0].upper()
+        replaces = verb == 'REPLACE' or (match.group(2) or '').upper() == 'REPLACE'
+        self._invalidate(match.group(3).lower(), deleted=verb == 'DELETE' or replaces,
+                         inserted=verb == 'INSERT' and not replaces)
+
+    def get_cached(self, name: str, key, load) -> Optional[dict]:
+        """Return load() through the shared identity map under (name, key).
+        
+        ``name`` is a table in PAGE_KEYS or an entry of DERIVED_CACHES, so that
+        writes know what to invalidate. The result is a shallow copy.
+        """
+        identity_map = self.connection_manager.identity_map
+        identity_map.sync(self.get_connection())
+        return identity_map.lookup(name, key, load)
+
+    def get_by_id(self, table: str, key: int) -> Optional[dict]:
+        """Return one clients/appointments row as a dict, served from the identity map when cached."""
+        column = self.PAGE_KEYS.get(table)
+        if column is None:
+            raise ValueError(f"Cached lookups are not supported for table {table}")
+        query = f"SELECT * FROM {table} WHERE {column} = ?"
+        return self.get_cached(table, key, lambda: next(iter(self.execute_query(query, (key,))), None))
+
+    def cache_stats(self) -> dict:
+        """Return hit/miss counters and size of the shared identity map."""
+        return self.connection_manager.identity_map.stats()
 
     def close_connection(self):
-        """Close the database connection."""
-        if hasattr(self, 'conn') and self.conn is not None:
-            self.conn.close()
-            self.logger.info("Database connection closed")
-            self.conn = None
+        """Close the calling thread's shared database connections."""
+        self.connection_manager.close_thread_connection()
+
+    def initialize_database(self, config_path: str = "config/app_config.yaml") -> list:
+        """Create the database if needed and apply pending migrations; return applied versions."""
+        from src.database.db_setup import DatabaseSetup  # db_setup imports this module
+        setup = DatabaseSetup(config_path, self.secrets_path, self.db_path)
+        return setup.apply_migrations()
+
+    def connection_stats(self) -> dict:
+        """Return open-connection count and per-open timings for this database."""
+        return self.connection_manager.stats()
+
+    def stats(self) -> list:
+        """Return count/p50/p95/max per statement shape run through execute_query.
+        
+        Rows are sorted by total time; ``plan`` holds the EXPLAIN QUERY PLAN of
+        the latest slow run of that shape, or None if it was never slow.
+        """
+        return self.connection_manager.query_stats.snapshot()
+
+    def slow_queries(self) -> list:
+        """Return recent statements that exceeded database.slow_query_ms, with their plans."""
+        return self.connection_manager.query_stats.slow_queries()
+
+    def reset_stats(self):
+        """Clear the query histograms, the slow-query log and the identity map counters."""
+        self.connection_manager.query_stats.reset()
+        self.connection_manager.identity_map.reset_stats()
 
     # Client CRUD Operations
-    def add_client(self, full_name: str, phone_number: str, email: str, dob: str) -> int:
+    def add_client(self, full_name: str, phone_number: str, email: str, dob: str, notes: str = None) -> int:
         """Add a new client and return the client_id."""
         try:
             cursor = self.get_connection().cursor()
             cursor.execute(
-                "INSERT INTO clients (full_name, phone_number, email, dob) VALUES (?, ?, ?, ?)",
-                (full_name, phone_number, email, dob)
+                "INSERT INTO clients (full_name, phone_number, email, dob, notes) VALUES (?, ?, ?, ?, ?)",
+                (full_name, phone_number, email, dob, notes)
             )
-            self.conn.commit()
             client_id = cursor.lastrowid
             self.logger.info("Added client %s with ID %d", full_name, client_id)
             return client_id
@@ -55,12 +776,10 @@ class DatabaseOperations:
             self.logger.error("Error adding client: %s", str(e))
             raise
 
-    def get_client(self, client_id: int):
+    def get_client(self, client_id: int) -> Optional[dict]:
         """Retrieve a client by ID."""
         try:
-            cursor = self.get_connection().cursor()
-            cursor.execute("SELECT * FROM clients WHERE client_id = ?", (client_id,))
-            return cursor.fetchone()
+            return self.get_by_id('clients', client_id)
         except sqlite3.Error as e:
             self.logger.error("Error retrieving client %d: %s", client_id, str(e))
             raise
@@ -73,7 +792,7 @@ class DatabaseOperations:
                 "UPDATE clients SET full_name = ?, phone_number = ?, email = ?, dob = ? WHERE client_id = ?",
                 (full_name, phone_number, email, dob, client_id)
             )
-            self.conn.commit()
+            self._invalidate('clients', client_id)
             self.logger.info("Updated client %d", client_id)
         except sqlite3.Error as e:
             self.logger.error("Error updating client %d: %s", client_id, str(e))
@@ -84,7 +803,7 @@ class DatabaseOperations:
         try:
             cursor = self.get_connection().cursor()
             cursor.execute("DELETE FROM clients WHERE client_id = ?", (client_id,))
-            self.conn.commit()
+            self._invalidate('clients', client_id, deleted=True)
             self.logger.info("Deleted client %d", client_id)
         except sqlite3.Error as e:
             self.logger.error("Error deleting client %d: %s", client_id, str(e))
@@ -96,23 +815,21 @@ class DatabaseOperations:
         try:
             cursor = self.get_connection().cursor()
             cursor.execute(
-                "INSERT INTO appointments (client_id, service_id, appointment_date, session_number, power, amount) VALUES (?, ?, ?, ?, ?, ?)",
+                "INSERT INTO appointments (client_id, service_id, appointment_date, session_number_for_area, power, amount) VALUES (?, ?, ?, ?, ?, ?)",
                 (client_id, service_id, appointment_date, session_number, power, amount)
             )
-            self.conn.commit()
             appointment_id = cursor.lastrowid
+            self._invalidate('appointments', inserted=True)
             self.logger.info("Added appointment for client %d with ID %d", client_id, appointment_id)
             return appointment_id
         except sqlite3.Error as e:
             self.logger.error("Error adding appointment: %s", str(e))
             raise
 
-    def get_appointment(self, appointment_id: int):
+    def get_appointment(self, appointment_id: int) -> Optional[dict]:
         """Retrieve an appointment by ID."""
         try:
-            cursor = self.get_connection().cursor()
-            cursor.execute("SELECT * FROM appointments WHERE appointment_id = ?", (appointment_id,))
-            return cursor.fetchone()
+            return self.get_by_id('appointments', appointment_id)
         except sqlite3.Error as e:
             self.logger.error("Error retrieving appointment %d: %s", appointment_id, str(e))
             raise
@@ -122,10 +839,10 @@ class DatabaseOperations:
         try:
             cursor = self.get_connection().cursor()
             cursor.execute(
-                "UPDATE appointments SET client_id = ?, service_id = ?, appointment_date = ?, session_number = ?, power = ?, amount = ?, appointment_status = ? WHERE appointment_id = ?",
+                "UPDATE appointments SET client_id = ?, service_id = ?, appointment_date = ?, session_number_for_area = ?, power = ?, amount = ?, appointment_status = ? WHERE appointment_id = ?",
                 (client_id, service_id, appointment_date, session_number, power, amount, status, appointment_id)
             )
-            self.conn.commit()
+            self._invalidate('appointments', appointment_id)
             self.logger.info("Updated appointment %d", appointment_id)
         except sqlite3.Error as e:
             self.logger.error("Error updating appointment %d: %s", appointment_id, str(e))
@@ -136,7 +853,7 @@ class DatabaseOperations:
         try:
             cursor = self.get_connection().cursor()
             cursor.execute("DELETE FROM appointments WHERE appointment_id = ?", (appointment_id,))
-            self.conn.commit()
+            self._invalidate('appointments', appointment_id)
             self.logger.info("Deleted appointment %d", appointment_id)
         except sqlite3.Error as e:
             self.logger.error("Error deleting appointment %d: %s", appointment_id, str(e))
@@ -152,7 +869,6 @@ class DatabaseOperations:
                 "INSERT INTO inventory (item_name, current_quantity, unit, low_stock_threshold) VALUES (?, ?, ?, ?)",
                 (item_name, current_quantity, unit, low_stock_threshold)
             )
-            self.conn.commit()
             item_id = cursor.lastrowid
             self.logger.info("Added inventory item %s with ID %d", item_name, item_id)
             return item_id
@@ -160,13 +876,307 @@ class DatabaseOperations:
             self.logger.error("Error adding inventory item: %s", str(e))
             raise
 
-    def __del__(self):
-        """Ensure connection is closed when object is destroyed."""
-        self.close_connection()
+    # Streaming reads: keyset pagination on the integer primary key. Each page is
+    # its own short query, so no cursor stays open between pages and memory is
+    # bounded by page_size regardless of table size.
+    PAGE_KEYS = {'clients': 'client_id', 'appointments': 'appointment_id'}
+    DEFAULT_PAGE_SIZE = 500
+
+    def page_after(self, table: str, last_id: int = 0, limit: int = DEFAULT_PAGE_SIZE,
+                   where: str = None, params: tuple = ()) -> list:
+        """Return up to limit rows of table with a primary key above last_id, in key order.
+        
+        ``where`` is an optional SQL condition on the table's columns with ``?``
+        placeholders bound from ``params``. Pass the last row's key back as
+        ``last_id`` to fetch the next page; an empty list means the end.
+        """
+        key = self.PAGE_KEYS.get(table)
+        if key is None:
+            raise ValueError(f"Keyset pagination is not supported for table {table}")
+        condition = f"({where}) AND {key} > ?" if where else f"{key} > ?"
+        query = f"SELECT * FROM {table} WHERE {condition} ORDER BY {key} LIMIT ?"
+        return self.execute_query(query, tuple(params) + (last_id, limit))
+
+    def iter_rows(self, table: str, where: str = None, params: tuple = (),
+                  page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[dict]:
+        """Yield every matching row of table as a dict, one keyset page at a time."""
+        key = self.PAGE_KEYS.get(table)
+        last_id = 0
+        while True:
+            page = self.page_after(table, last_id, page_size, where, params)
+            yield from page
+            if len(page) < page_size:
+                return
+            last_id = page[-1][key]
+
+    def iter_clients(self, name_like: str = None, active_only: bool = True,
+                     page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[dict]:
+        """Yield clients in client_id order, optionally filtered by a name substring."""
+        conditions, params = [], []
+        if active_only:
+            conditions.append("is_active = TRUE")
+        if name_like:
+            conditions.append("full_name LIKE ?")
+            params.append(f"%{name_like}%")
+        return self.iter_rows('clients', ' AND '.join(conditions) or None, tuple(params), page_size)
+
+    def iter_appointments(self, client_id: int = None, appointment_date: str = None,
+                          statuses: Iterable[str] = None,
+                          page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[dict]:
+        """Yield appointments in appointment_id order, optionally by client, date and status."""
+        conditions, params = [], []
+        if client_id is not None:
+            conditions.append("client_id = ?")
+            params.append(client_id)
+        if appointment_date is not None:
+            conditions.append("appointment_date = ?")
+            params.append(appointment_date)
+        if statuses:
+            statuses = tuple(statuses)
+            conditions.append(f"appointment_status IN ({', '.join('?' * len(statuses))})")
+            params.extend(statuses)
+        return self.iter_rows('appointments', ' AND '.join(conditions) or None, tuple(params), page_size)
+
+    # Bulk operations: validate every row in one pass, insert the valid ones with
+    # executemany inside a single transaction and report rejects per row index.
+    BULK_LOOKUP_CHUNK = 500  # stays under SQLite's default 999 bound parameters
+    APPOINTMENT_STATUSES = ('Scheduled', 'Completed', 'Cancelled', 'Rescheduled')
+    SLOT_HOLDING_STATUSES = ('Scheduled', 'Rescheduled', 'Completed')  # as in idx_appointments_machine_slots
+    APPOINTMENT_BULK_COLUMNS = ('client_id', 'service_id', 'area_id', 'appointment_date', 'session_number_for_area',
+                                'power', 'amount', 'appointment_status', 'start_time', 'end_time', 'hardware_id')
+    APPOINTMENT_BULK_DEFAULTS = ('Scheduled', None, None, 1)  # for rows that stop after amount
+
+    def add_clients_bulk(self, rows: Iterable[tuple]) -> dict:
+        """Insert (full_name, phone_number, email, dob) rows; return ids and rejects."""
+        return self._bulk_insert(
+            'clients', ('full_name', 'phone_number', 'email', 'dob'), rows,
+            self._validate_client_row,
+            unique_columns=('phone_number', 'email', ('phone_e164', 'phone_number', normalize_phone))
+        )
+
+    def add_appointments_bulk(self, rows: Iterable[tuple]) -> dict:
+        """Insert rows in APPOINTMENT_BULK_COLUMNS order; return ids and rejects.
+        
+        appointment_status, start_time, end_time and hardware_id may be left
+        off a row and default to an untimed 'Scheduled' booking on machine 1;
+        historic imports pass 'Completed'. Timed rows that overlap a stored
+        booking or an earlier row on the same machine are rejected.
+        """
+        columns = self.APPOINTMENT_BULK_COLUMNS
+        required = len(columns) - len(self.APPOINTMENT_BULK_DEFAULTS)
+        rows = [tuple(row) + self.APPOINTMENT_BULK_DEFAULTS[len(row) - required:]
+                if row and required <= len(row) < len(columns) else row for row in rows]
+        known_clients = self._existing_values('clients', 'client_id', {row[0] for row in rows if row})
+        booked = self._booked_slots(rows)
+        return self._bulk_insert(
+            'appointments', columns, rows, lambda row: self._validate_appointment_row(row, known_clients, booked)
+        )
+
+    def add_inventory_items_bulk(self, rows: Iterable[tuple]) -> dict:
+        """Insert (item_name, current_quantity, unit, low_stock_threshold) rows."""
+        return self._bulk_insert(
+            'inventory', ('item_name', 'current_quantity', 'unit', 'low_stock_threshold'), rows,
+            self._validate_inventory_row, unique_columns=('item_name',)
+        )
+
+    def _bulk_insert(self, table: str, columns: tuple, rows: Iterable[tuple], validate,
+                     unique_columns: tuple = ()) -> dict:
+        """Validate rows, insert the valid ones in one transaction and map ids back to input order.
+        
+        ``unique_columns`` names UNIQUE columns among ``columns``; an entry may
+        also be ``(stored_column, column, key)`` for a UNIQUE column derived
+        from an input column, compared as ``key(value)``.
+        
+        Returns ``{'ids': [...], 'rejects': [(index, reason), ...]}`` where ``ids`` is
+        parallel to the input and holds None for rejected rows.
+        """
+        rows = list(rows)
+        ids = [None] * len(rows)
+        rejects = []
+        valid = []
+        for index, row in enumerate(rows):
+            try:
+                if len(row) != len(columns):
+                    raise ValueError(f"Expected {len(columns)} values, got {len(row)}")
+                valid.append((index, validate(tuple(row))))
+            except (ValueError, TypeError) as e:
+                rejects.append((index, str(e)))
+        valid = self._reject_duplicates(table, columns, unique_columns, valid, rejects)
+
+        placeholders = ', '.join('?' for _ in columns)
+        query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+        try:
+            with self.transaction():
+                conn = self.get_connection()
+                if valid:
+                    # rowcount sums sqlite3_changes(), which excludes rows written by triggers
+                    cursor = conn.executemany(query, [values for _, values in valid])
+                    if cursor.rowcount != len(valid):
+                        raise sqlite3.DatabaseError(f"Bulk insert into {table} wrote an unexpected row count")
+                    # Rowids are handed out consecutively while BEGIN IMMEDIATE holds the write lock
+                    first_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0] - len(valid) + 1
+                    for offset, (index, _) in enumerate(valid):
+                        ids[index] = first_id + offset
+                    self._invalidate(table, inserted=True)
+        except sqlite3.Error as e:
+            self.logger.error("Error bulk inserting into %s: %s", table, str(e))
+            raise
+        rejects.sort()
+        self.logger.info("Bulk inserted %d rows into %s, rejected %d", len(valid), table, len(rejects))
+        return {'ids': ids, 'rejects': rejects}
+
+    def _reject_duplicates(self, table: str, columns: tuple, unique_columns: tuple,
+                           valid: list, rejects: list) -> list:
+        """Drop rows that collide on a UNIQUE column within the batch or with stored rows."""
+        for spec in unique_columns:
+            stored_column, column, key = spec if isinstance(spec, tuple) else (spec, spec, None)
+            position = columns.index(column)
+            keyed = [(index, values, key(values[position]) if key else values[position]) for index, values in valid]
+            existing = self._existing_values(table, stored_column, {value for _, _, value in keyed})
+            seen = set()
+            kept = []
+            for index, values, value in keyed:
+                if value is not None and (value in existing or value in seen):
+                    rejects.append((index, f"Duplicate {stored_column}: {value}"))
+                    continue
+                seen.add(value)
+                kept.append((index, values))
+            valid = kept
+        return valid
+
+    def _existing_values(self, table: str, column: str, values: set) -> set:
+        """Return which of the given values already exist in table.column."""
+        values = [value for value in values if value is not None]
+        found = set()
+        for start in range(0, len(values), self.BULK_LOOKUP_CHUNK):
+            chunk = values[start:start + self.BULK_LOOKUP_CHUNK]
+            placeholders = ', '.join('?' for _ in chunk)
+            cursor = self._read_connection().execute(
+                f"SELECT {column} FROM {table} WHERE {column} IN ({placeholders})", chunk
+            )
+            found.update(row[0] for row in cursor.fetchall())
+        return found
+
+    def _booked_slots(self, rows: list) -> dict:
+        """Return {(hardware_id, date): [(start_time, end_time), ...]} of stored bookings on the rows' timed days."""
+        days = sorted({row[8][:10] for row in rows
+                       if row and len(row) == len(self.APPOINTMENT_BULK_COLUMNS) and isinstance(row[8], str)})
+        booked = defaultdict(list)
+        if days:
+            placeholders = ', '.join('?' for _ in self.SLOT_HOLDING_STATUSES)
+            cursor = self._read_connection().execute(
+                f"""
+                SELECT hardware_id, start_time, end_time FROM appointments
+                WHERE start_time >= ? AND start_time <= ? AND appointment_status IN ({placeholders})
+                """,
+                (days[0], f"{days[-1]} 23:59", *self.SLOT_HOLDING_STATUSES)
+            )
+            for hardware_id, start_time, end_time in cursor.fetchall():
+                booked[(hardware_id, start_time[:10])].append((start_time, end_time))
+        return booked
+
+    @staticmethod
+    def _clean_text(value, field: str, required: bool = True) -> Optional[str]:
+        """Strip a text value; reject it if required and empty."""
+        value = value.strip() if isinstance(value, str) else value
+        if required and not value:
+            raise ValueError(f"{field} is required")
+        return value or None
+
+    @staticmethod
+    def _clean_date(value, field: str, required: bool = True) -> Optional[str]:
+        """Validate a YYYY-MM-DD date string."""
+        if not value:
+            if required:
+                raise ValueError(f"{field} is required")
+            return None
+        datetime.strptime(value, '%Y-%m-%d')
+        return value
+
+    @staticmethod
+    def _clean_slot(appointment_date: str, start_time, end_time) -> tuple:
+        """Validate an optional 'YYYY-MM-DD HH:MM' slot starting on appointment_date."""
+        if start_time is None and end_time is None:
+            return None, None
+        if not start_time or not end_time:
+            raise ValueError("start_time and end_time must be given together")
+        for value in (start_time, end_time):
+            if len(value) != 16:
+                raise ValueError(f"Slot time must be YYYY-MM-DD HH:MM: {value}")
+            datetime.strptime(value, '%Y-%m-%d %H:%M')
+        if start_time[:10] != appointment_date:
+            raise ValueError("start_time must fall on appointment_date")
+        if end_time <= start_time:
+            raise ValueError("end_time must be after start_time")
+        return start_time, end_time
+
+    @staticmethod
+    def _clean_number(value, field: str, minimum: float = 0, required: bool = True) -> Optional[float]:
+        """Validate a number is present (if required) and not below minimum."""
+        if value is None:
+            if required:
+                raise ValueError(f"{field} is required")
+            return None
+        value = float(value)
+        if value < minimum:
+            raise ValueError(f"{field} must be at least {minimum}")
+        return value
+
+    def _validate_client_row(self, row: tuple) -> tuple:
+        """Validate a client row through the Client model, so every stored row loads back as a Client."""
+        full_name, phone_number, email, dob = row
+        client = Client(None, full_name, phone_number, self._clean_text(email, 'email', required=False),
+                        self._clean_text(dob, 'dob', required=False))
+        return client.full_name, client.phone_number, client.email, client.dob
+
+    def _validate_appointment_row(self, row: tuple, known_clients: set, booked: dict) -> tuple:
+        """Validate an appointment row against the appointments table constraints and the machine's bookings.
+        
+        An accepted timed row is added to booked, so later rows in the batch
+        cannot take the same slot.
+        """
+        (client_id, service_id, area_id, appointment_date, session_number, power, amount,
+         appointment_status, start_time, end_time, hardware_id) = row
+        if client_id not in known_clients:
+            raise ValueError(f"Unknown client_id: {client_id}")
+        if not isinstance(service_id, int) or service_id <= 0:
+            raise ValueError("service_id must be a positive integer")
+        if area_id is not None and (not isinstance(area_id, int) or area_id <= 0):
+            raise ValueError("area_id must be a positive integer")
+        if not isinstance(session_number, int) or session_number <= 0:
+            raise ValueError("session_number must be a positive integer")
+        if appointment_status not in self.APPOINTMENT_STATUSES:
+            raise ValueError(f"appointment_status must be one of {self.APPOINTMENT_STATUSES}")
+        if not isinstance(hardware_id, int) or hardware_id <= 0:
+            raise ValueError("hardware_id must be a positive integer")
+        appointment_date = self._clean_date(appointment_date, 'appointment_date')
+        start_time, end_time = self._clean_slot(appointment_date, start_time, end_time)
+        power = self._clean_number(power, 'power', required=False)
+        amount = self._clean_number(amount, 'amount')
+        if start_time and appointment_status in self.SLOT_HOLDING_STATUSES:
+            day = booked[(hardware_id, appointment_date)]
+            clash = next((slot for slot in day if slot[0] < end_time and start_time < slot[1]), None)
+            if clash:
+                raise ValueError(f"Slot {start_time}-{end_time[-5:]} overlaps {clash[0]}-{clash[1][-5:]} "
+                                 f"on hardware {hardware_id}")
+            day.append((start_time, end_time))
+        return (client_id, service_id, area_id, appointment_date, session_number, power, amount,
+                appointment_status, start_time, end_time, hardware_id)
+
+    def _validate_inventory_row(self, row: tuple) -> tuple:
+        """Validate an inventory row against the inventory table constraints."""
+        item_name, current_quantity, unit, low_stock_threshold = row
+        return (
+            self._clean_text(item_name, 'item_name'),
+            self._clean_number(current_quantity, 'current_quantity'),
+            self._clean_text(unit, 'unit'),
+            self._clean_number(low_stock_threshold, 'low_stock_threshold')
+        )
 
 if __name__ == "__main__":
     db = DatabaseOperations("config/secrets.yaml", "data/database.db")
     # Example usage
     client_id = db.add_client("Test User", "1234567890", "test@example.com", "1990-01-01")
     print(f"Added client with ID: {client_id}")
+    print(QueryStats.format_table(db.stats()))
     db.close_connection()
\ No newline at end of file
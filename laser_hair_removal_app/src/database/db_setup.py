@@ -1,109 +1,164 @@
-# db_setup.py 
+# db_setup.py
 
 import os
+import re
+import hashlib
 import logging
 from pysqlcipher3 import dbapi2 as sqlite3
 from src.utils.config import Config
 from src.utils.logger import Logger
 from src.database.db_operations import DatabaseOperations
 
+MIGRATION_DIR = os.path.join(os.path.dirname(__file__), 'migrations')
+MIGRATION_PATTERN = re.compile(r'^(\d{3})_[\w-]+\.sql$')
+
+def _migration_files(migration_dir: str) -> list:
+    """Return (version, path) for every forward migration in migration_dir, sorted by version."""
+    migrations = []
+    for filename in os.listdir(migration_dir):
+        match = MIGRATION_PATTERN.match(filename)
+        if match and not filename.endswith('_rollback.sql'):
+            migrations.append((int(match.group(1)), os.path.join(migration_dir, filename)))
+    return sorted(migrations)
+
 class DatabaseSetup:
     """Handles database initialization and migration management with SQLCipher encryption."""
-    
+
+    # Highest migration shipped in migrations/, read once at import so the
+    # common startup path (user_version already current) skips the listing
+    SCHEMA_VERSION = max((version for version, _ in _migration_files(MIGRATION_DIR)), default=0)
+
     def __init__(self, config_path: str, secrets_path: str, db_path: str):
         """Initialize with configuration and database paths."""
         self.config = Config(config_path, secrets_path)
         self.db_path = db_path
         self.logger = Logger().get_logger(__name__)
         self.db_ops = DatabaseOperations(secrets_path, db_path)
-        self.migration_dir = os.path.join(os.path.dirname(__file__), 'migrations')
-        self.migration_log = os.path.join(self.migration_dir, 'migrations.log')
-        self.encryption_key = self.config.get('database.encryption_key', 'default_key')
+        self.migration_dir = MIGRATION_DIR
 
     def initialize_database(self):
-        """Initialize the database with encryption and apply migrations."""
+        """Create the encrypted database if needed and bring it to the latest schema."""
         if not os.path.exists(self.db_path):
             self.logger.info("Creating new database at %s", self.db_path)
-            conn = sqlite3.connect(self.db_path)
-            conn.execute(f"PRAGMA key = '{self.encryption_key}'")
-            conn.execute("PRAGMA cipher_use_hmac = OFF")  # Optional: Adjust based on security needs
-            conn.close()
-        else:
-            self.logger.info("Database already exists at %s, applying migrations", self.db_path)
-
+        # The shared connection creates and keys the file on first use
         self.apply_migrations()
 
-    def apply_migrations(self):
-        """Apply pending migrations in sequence."""
+    def apply_migrations(self) -> list:
+        """Apply pending migrations in order, each in its own transaction; return applied versions."""
+        conn = self.db_ops.get_connection()
+        if self.get_schema_version() == self.SCHEMA_VERSION:
+            return []
+
         if not os.path.exists(self.migration_dir):
             self.logger.error("Migrations directory not found at %s", self.migration_dir)
             raise FileNotFoundError("Migrations directory missing")
 
+        self._ensure_migrations_table()
         applied_migrations = self.get_applied_migrations()
-        migration_files = [f for f in os.listdir(self.migration_dir) if f.endswith('.sql') and f.isdigit() + f[3:].isdigit()]
-        migration_files.sort()  # Sort by filename (e.g., 001_init_schema.sql)
-
+        applied_now = []
+        for version, migration_path in self.get_migration_files():
+            checksum = self._checksum(migration_path)
+            if version in applied_migrations:
+                if applied_migrations[version] != checksum:
+                    self.logger.error("Migration %s was modified after being applied", migration_path)
+                    raise ValueError(f"Checksum mismatch for applied migration {version}")
+                continue
+            self.logger.info("Applying migration %s", migration_path)
+            with open(migration_path, 'r') as f:
+                sql = f.read()
+            # executescript commits any open transaction first, so the script carries its own
+            self._run_script_transaction(conn, f"""
+                BEGIN IMMEDIATE;
+                {sql}
+                ;
+                INSERT INTO schema_migrations (version, checksum) VALUES ({version}, '{checksum}');
+                PRAGMA user_version = {version};
+                COMMIT;
+            """)
+            applied_now.append(version)
+            self.logger.info("Migration %s applied successfully", version)
+        return applied_now
+
+    def _run_script_transaction(self, conn, script: str) -> None:
+        """Run a BEGIN...COMMIT script, rolling back if any statement fails."""
+        try:
+            conn.executescript(script)
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+    def get_schema_version(self) -> int:
+        """Return the schema version recorded in the database header."""
+        return self.db_ops.get_connection().execute("PRAGMA user_version").fetchone()[0]
+
+    def get_migration_files(self) -> list:
+        """Return (version, path) for every forward migration, sorted by version."""
+        return _migration_files(self.migration_dir)
+
+    def _ensure_migrations_table(self) -> None:
+        """Create schema_migrations, adopting databases created before it existed."""
         conn = self.db_ops.get_connection()
-        cursor = conn.cursor()
-
-        for migration_file in migration_files:
-            migration_version = int(migration_file.split('_')[0])
-            if migration_version not in applied_migrations:
-                migration_path = os.path.join(self.migration_dir, migration_file)
-                self.logger.info("Applying migration %s", migration_path)
-                with open(migration_path, 'r') as f:
-                    cursor.executescript(f.read())
-                with open(self.migration_log, 'a') as f:
-                    f.write(f"{migration_version}\n")
-                self.logger.info("Migration %s applied successfully", migration_version)
-            else:
-                self.logger.info("Migration %s already applied, skipping", migration_version)
-
-        conn.commit()
-        conn.close()
-
-    def get_applied_migrations(self):
-        """Retrieve list of applied migration versions from log."""
-        applied = set()
-        if os.path.exists(self.migration_log):
-            with open(self.migration_log, 'r') as f:
-                applied = {int(line.strip()) for line in f if line.strip().isdigit()}
-        return applied
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                checksum TEXT NOT NULL,
+                applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        has_rows = conn.execute("SELECT 1 FROM schema_migrations LIMIT 1").fetchone()
+        has_schema = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'clients'").fetchone()
+        if not has_rows and has_schema:
+            # Initial schema was loaded by hand before migrations were tracked
+            version, path = self.get_migration_files()[0]
+            conn.execute("INSERT INTO schema_migrations (version, checksum) VALUES (?, ?)", (version, self._checksum(path)))
+            conn.execute(f"PRAGMA user_version = {version}")
+            self.logger.info("Recorded existing schema as migration %d", version)
+
+    @staticmethod
+    def _checksum(path: str) -> str:
+        """Return the SHA-256 of a migration file."""
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    def get_applied_migrations(self) -> dict:
+        """Return {version: checksum} for every applied migration."""
+        rows = self.db_ops.get_connection().execute("SELECT version, checksum FROM schema_migrations").fetchall()
+        return {version: checksum for version, checksum in rows}
 
     def rollback_migration(self, version: int):
-        """Rollback to a specific migration version (simplified, assumes reversible migrations)."""
+        """Roll back every migration above version using NNN_*_rollback.sql scripts."""
+        self._ensure_migrations_table()
         applied_migrations = self.get_applied_migrations()
         if version not in applied_migrations:
             self.logger.error("Migration version %d not applied, cannot rollback", version)
             raise ValueError(f"Migration {version} not found in applied set")
 
         conn = self.db_ops.get_connection()
-        cursor = conn.cursor()
-
-        # Simplified rollback: Reverse apply all migrations after the target version
-        migration_files = [f for f in os.listdir(self.migration_dir) if f.endswith('.sql') and f.isdigit() + f[3:].isdigit()]
-        migration_files.sort(reverse=True)
-
-        rollback_needed = [int(f.split('_')[0]) for f in migration_files if int(f.split('_')[0]) > version]
-        if rollback_needed:
-            for migration_version in sorted(rollback_needed, reverse=True):
-                migration_file = next(f for f in migration_files if int(f.split('_')[0]) == migration_version)
-                migration_path = os.path.join(self.migration_dir, migration_file)
-                self.logger.info("Rolling back migration %s", migration_path)
-                # Assume reverse SQL is provided or manually crafted (e.g., DROP TABLE)
-                with open(migration_path.replace('.sql', '_rollback.sql'), 'r') as f:
-                    cursor.executescript(f.read())  # Requires rollback scripts
-                with open(self.migration_log, 'w') as f:
-                    f.writelines(f"{v}\n" for v in applied_migrations if v <= version)
-                self.logger.info("Rolled back to migration %d", version)
-        else:
+        migration_paths = dict(self.get_migration_files())
+        rollback_needed = sorted((v for v in applied_migrations if v > version), reverse=True)
+        if not rollback_needed:
             self.logger.info("No rollbacks needed, already at or before version %d", version)
-
-        conn.commit()
-        conn.close()
+            return
+
+        for migration_version in rollback_needed:
+            rollback_path = migration_paths[migration_version].replace('.sql', '_rollback.sql')
+            self.logger.info("Rolling back migration %s", rollback_path)
+            with open(rollback_path, 'r') as f:
+                sql = f.read()
+            previous = max((v for v in applied_migrations if v < migration_version), default=0)
+            self._run_script_transaction(conn, f"""
+                BEGIN IMMEDIATE;
+                {sql}
+                ;
+                DELETE FROM schema_migrations WHERE version = {migration_version};
+                PRAGMA user_version = {previous};
+                COMMIT;
+            """)
+        self.logger.info("Rolled back to migration %d", version)
 
 if __name__ == "__main__":
     setup = DatabaseSetup("config/app_config.yaml", "config/secrets.yaml", "data/database.db")
     setup.initialize_database()
     # Example rollback (uncomment to test)
-    # setup.rollback_migration(1)
\ No newline at end of file
+    # setup.rollback_migration(1)
@@ -0,0 +1,49 @@
+-- Columns and tables the managers use but 001 never created
+-- Version: 002
+-- Date: 2026-10-17
+
+-- Columns the managers already query but 001 never created. The appointments
+-- table is rebuilt because session_number becomes session_number_for_area and
+-- the status CHECK has to admit 'Rescheduled'.
+CREATE TABLE appointments_new (
+    appointment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    client_id INTEGER NOT NULL,
+    service_id INTEGER NOT NULL,
+    area_id INTEGER,
+    appointment_date TEXT NOT NULL CHECK (length(appointment_date) = 10), -- YYYY-MM-DD
+    session_number_for_area INTEGER NOT NULL CHECK (session_number_for_area > 0),
+    power REAL,
+    amount REAL NOT NULL DEFAULT 0 CHECK (amount >= 0),
+    appointment_status TEXT NOT NULL DEFAULT 'Scheduled' CHECK (appointment_status IN ('Scheduled', 'Completed', 'Cancelled', 'Rescheduled')),
+    payment_method_id INTEGER,
+    next_suggested_appointment_date TEXT CHECK (length(next_suggested_appointment_date) = 10), -- YYYY-MM-DD
+    FOREIGN KEY (client_id) REFERENCES clients(client_id) ON DELETE CASCADE,
+    FOREIGN KEY (service_id) REFERENCES services(service_id) ON DELETE RESTRICT
+);
+
+INSERT INTO appointments_new (appointment_id, client_id, service_id, appointment_date, session_number_for_area,
+                              power, amount, appointment_status)
+SELECT appointment_id, client_id, service_id, appointment_date, session_number, power, amount, appointment_status
+FROM appointments;
+
+DROP TABLE appointments;
+ALTER TABLE appointments_new RENAME TO appointments;
+
+ALTER TABLE clients ADD COLUMN is_blacklisted INTEGER NOT NULL DEFAULT 0 CHECK (is_blacklisted IN (0, 1));
+ALTER TABLE clients ADD COLUMN is_active INTEGER NOT NULL DEFAULT 1 CHECK (is_active IN (0, 1));
+ALTER TABLE clients ADD COLUMN notes TEXT;
+
+CREATE TABLE owner_reminders (
+    reminder_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    reminder_type TEXT NOT NULL,
+    related_id INTEGER,
+    due_date TEXT NOT NULL CHECK (length(due_date) = 10), -- YYYY-MM-DD
+    reminder_date TEXT NOT NULL CHECK (length(reminder_date) = 10), -- YYYY-MM-DD
+    message TEXT NOT NULL,
+    is_active INTEGER NOT NULL DEFAULT 1 CHECK (is_active IN (0, 1)),
+    delivery_method TEXT NOT NULL DEFAULT 'Popup' CHECK (delivery_method IN ('Popup', 'SMS', 'Email'))
+);
+
+-- Indexes dropped with the old appointments table
+CREATE INDEX idx_appointments_client_id ON appointments(client_id);
+CREATE INDEX idx_appointments_date ON appointments(appointment_date);
@@ -0,0 +1,96 @@
+-- Daily finance rollup kept current by triggers
+-- Version: 003
+-- Date: 2026-10-17
+
+-- FinanceManager writes expense_date/description/category_id but 001 created
+-- date/category. Rebuild expenses with the manager's columns; the old category
+-- text is kept as the description.
+CREATE TABLE expenses_new (
+    expense_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    expense_date TEXT NOT NULL CHECK (length(expense_date) = 10), -- YYYY-MM-DD
+    amount REAL NOT NULL CHECK (amount >= 0),
+    description TEXT,
+    category_id INTEGER,
+    tax_deductible INTEGER NOT NULL CHECK (tax_deductible IN (0, 1)) DEFAULT 0
+);
+
+INSERT INTO expenses_new (expense_id, expense_date, amount, description, tax_deductible)
+SELECT expense_id, date, amount, category, tax_deductible
+FROM expenses;
+
+DROP TABLE expenses;
+ALTER TABLE expenses_new RENAME TO expenses;
+
+CREATE INDEX idx_expenses_date ON expenses(expense_date);
+
+-- One row per calendar day. Revenue and appointment_count cover Completed
+-- appointments only, matching get_revenue_by_date.
+CREATE TABLE daily_finance (
+    day TEXT PRIMARY KEY CHECK (length(day) = 10), -- YYYY-MM-DD
+    revenue REAL NOT NULL DEFAULT 0,
+    expenses REAL NOT NULL DEFAULT 0,
+    appointment_count INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+-- Appointments: add the new row if Completed, subtract the old row if it was.
+-- An UPDATE does both, which covers status changes, moved dates and new amounts.
+CREATE TRIGGER trg_daily_finance_appointment_insert
+AFTER INSERT ON appointments
+WHEN NEW.appointment_status = 'Completed'
+BEGIN
+    INSERT INTO daily_finance (day, revenue, appointment_count) VALUES (NEW.appointment_date, NEW.amount, 1)
+    ON CONFLICT(day) DO UPDATE SET revenue = revenue + excluded.revenue,
+                                   appointment_count = appointment_count + 1;
+END;
+
+CREATE TRIGGER trg_daily_finance_appointment_delete
+AFTER DELETE ON appointments
+WHEN OLD.appointment_status = 'Completed'
+BEGIN
+    UPDATE daily_finance SET revenue = revenue - OLD.amount, appointment_count = appointment_count - 1
+    WHERE day = OLD.appointment_date;
+END;
+
+CREATE TRIGGER trg_daily_finance_appointment_update
+AFTER UPDATE OF appointment_date, amount, appointment_status ON appointments
+WHEN OLD.appointment_status = 'Completed' OR NEW.appointment_status = 'Completed'
+BEGIN
+    UPDATE daily_finance SET revenue = revenue - OLD.amount, appointment_count = appointment_count - 1
+    WHERE day = OLD.appointment_date AND OLD.appointment_status = 'Completed';
+    INSERT INTO daily_finance (day, revenue, appointment_count)
+    SELECT NEW.appointment_date, NEW.amount, 1 WHERE NEW.appointment_status = 'Completed'
+    ON CONFLICT(day) DO UPDATE SET revenue = revenue + excluded.revenue,
+                                   appointment_count = appointment_count + 1;
+END;
+
+CREATE TRIGGER trg_daily_finance_expense_insert
+AFTER INSERT ON expenses
+BEGIN
+    INSERT INTO daily_finance (day, expenses) VALUES (NEW.expense_date, NEW.amount)
+    ON CONFLICT(day) DO UPDATE SET expenses = expenses + excluded.expenses;
+END;
+
+CREATE TRIGGER trg_daily_finance_expense_delete
+AFTER DELETE ON expenses
+BEGIN
+    UPDATE daily_finance SET expenses = expenses - OLD.amount WHERE day = OLD.expense_date;
+END;
+
+CREATE TRIGGER trg_daily_finance_expense_update
+AFTER UPDATE OF expense_date, amount ON expenses
+BEGIN
+    UPDATE daily_finance SET expenses = expenses - OLD.amount WHERE day = OLD.expense_date;
+    INSERT INTO daily_finance (day, expenses) VALUES (NEW.expense_date, NEW.amount)
+    ON CONFLICT(day) DO UPDATE SET expenses = expenses + excluded.expenses;
+END;
+
+-- Backfill from existing rows; FinanceManager.rebuild_daily_finance runs the same query
+INSERT INTO daily_finance (day, revenue, expenses, appointment_count)
+SELECT day, SUM(revenue), SUM(expenses), SUM(appointment_count)
+FROM (
+    SELECT appointment_date AS day, amount AS revenue, 0 AS expenses, 1 AS appointment_count
+    FROM appointments WHERE appointment_status = 'Completed'
+    UNION ALL
+    SELECT expense_date, 0, amount, 0 FROM expenses
+)
+GROUP BY day;
@@ -0,0 +1,72 @@
+-- Full-text client search over name, phone, email and notes
+-- Version: 004
+-- Date: 2026-10-17
+
+-- What gets indexed for each client. unicode61 casefolds and strips combining
+-- accents (ą ć ę ń ó ś ź ż); ł has no decomposition, so it is folded to l here
+-- and ClientManager.fts_query does the same to search terms.
+-- Tokens every client shares would make ranking touch every row, so emails
+-- contribute only their local part and phones only their digits, as dialled
+-- and without the 48 country code.
+CREATE VIEW clients_fts_source AS
+SELECT client_id,
+       is_active,
+       replace(replace(full_name, 'ł', 'l'), 'Ł', 'L') AS full_name,
+       phone_digits || CASE WHEN phone_digits LIKE '48_________' THEN ' ' || substr(phone_digits, 3) ELSE '' END AS phone_number,
+       replace(replace(CASE WHEN instr(email, '@') > 0 THEN substr(email, 1, instr(email, '@') - 1) ELSE email END,
+                       'ł', 'l'), 'Ł', 'L') AS email,
+       replace(replace(notes, 'ł', 'l'), 'Ł', 'L') AS notes
+FROM (
+    SELECT *, replace(replace(replace(replace(replace(replace(phone_number, ' ', ''), '-', ''), '+', ''), '(', ''), ')', ''), '.', '') AS phone_digits
+    FROM clients
+);
+
+-- Contentless index of active clients keyed by client_id; results join back to
+-- clients so the text is not stored twice. Prefix indexes on 2 and 3
+-- characters serve typeahead without scanning the term list.
+CREATE VIRTUAL TABLE clients_fts USING fts5(
+    full_name, phone_number, email, notes,
+    content = '',
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+
+-- ORDER BY rank weighs name matches above phone, email and notes
+INSERT INTO clients_fts (clients_fts, rank) VALUES ('rank', 'bm25(10.0, 5.0, 3.0, 1.0)');
+
+-- A contentless table deletes by re-supplying the indexed values, so removals
+-- run BEFORE the row changes and read the old values through the view.
+CREATE TRIGGER trg_clients_fts_insert
+AFTER INSERT ON clients
+WHEN NEW.is_active
+BEGIN
+    INSERT INTO clients_fts (rowid, full_name, phone_number, email, notes)
+    SELECT client_id, full_name, phone_number, email, notes FROM clients_fts_source WHERE client_id = NEW.client_id;
+END;
+
+CREATE TRIGGER trg_clients_fts_delete
+BEFORE DELETE ON clients
+WHEN OLD.is_active
+BEGIN
+    INSERT INTO clients_fts (clients_fts, rowid, full_name, phone_number, email, notes)
+    SELECT 'delete', client_id, full_name, phone_number, email, notes FROM clients_fts_source WHERE client_id = OLD.client_id;
+END;
+
+CREATE TRIGGER trg_clients_fts_update_remove
+BEFORE UPDATE OF full_name, phone_number, email, notes, is_active ON clients
+WHEN OLD.is_active
+BEGIN
+    INSERT INTO clients_fts (clients_fts, rowid, full_name, phone_number, email, notes)
+    SELECT 'delete', client_id, full_name, phone_number, email, notes FROM clients_fts_source WHERE client_id = OLD.client_id;
+END;
+
+CREATE TRIGGER trg_clients_fts_update_add
+AFTER UPDATE OF full_name, phone_number, email, notes, is_active ON clients
+WHEN NEW.is_active
+BEGIN
+    INSERT INTO clients_fts (rowid, full_name, phone_number, email, notes)
+    SELECT client_id, full_name, phone_number, email, notes FROM clients_fts_source WHERE client_id = NEW.client_id;
+END;
+
+INSERT INTO clients_fts (rowid, full_name, phone_number, email, notes)
+SELECT client_id, full_name, phone_number, email, notes FROM clients_fts_source WHERE is_active;
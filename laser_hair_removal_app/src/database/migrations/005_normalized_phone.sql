@@ -0,0 +1,52 @@
+-- Stored E.164 phone numbers with a unique index for caller lookup
+-- Version: 005
+-- Date: 2026-10-17
+
+ALTER TABLE clients ADD COLUMN phone_e164 TEXT;
+
+-- SQL twin of src/utils/phone.normalize_phone: strip separators, then accept
+-- +CC..., 00CC..., 9-digit Polish numbers and 48-prefixed national numbers.
+-- Anything that is not 8-15 digits afterwards is NULL.
+CREATE VIEW clients_phone_normalized AS
+SELECT client_id,
+       CASE WHEN digits NOT GLOB '*[^0-9]*' AND length(digits) BETWEEN 8 AND 15 THEN '+' || digits END AS phone_e164
+FROM (
+    SELECT client_id,
+           CASE WHEN compact GLOB '+*' THEN substr(compact, 2)
+                WHEN compact GLOB '00*' THEN substr(compact, 3)
+                WHEN length(compact) = 9 THEN '48' || compact
+                WHEN length(compact) = 11 AND compact GLOB '48*' THEN compact
+           END AS digits
+    FROM (
+        SELECT client_id,
+               replace(replace(replace(replace(replace(replace(replace(replace(phone_number,
+                   ' ', ''), char(9), ''), '-', ''), '(', ''), ')', ''), '.', ''), '/', ''), char(160), '') AS compact
+        FROM clients
+    )
+);
+
+-- Existing clients that normalize to the same number are duplicates; only the
+-- oldest keeps the number, the rest stay NULL until they are merged.
+UPDATE clients
+SET phone_e164 = (SELECT n.phone_e164 FROM clients_phone_normalized n WHERE n.client_id = clients.client_id)
+WHERE client_id IN (
+    SELECT MIN(client_id) FROM clients_phone_normalized WHERE phone_e164 IS NOT NULL GROUP BY phone_e164
+);
+
+CREATE UNIQUE INDEX idx_clients_phone_e164 ON clients(phone_e164);
+
+CREATE TRIGGER trg_clients_phone_e164_insert
+AFTER INSERT ON clients
+BEGIN
+    UPDATE clients
+    SET phone_e164 = (SELECT phone_e164 FROM clients_phone_normalized WHERE client_id = NEW.client_id)
+    WHERE client_id = NEW.client_id;
+END;
+
+CREATE TRIGGER trg_clients_phone_e164_update
+AFTER UPDATE OF phone_number ON clients
+BEGIN
+    UPDATE clients
+    SET phone_e164 = (SELECT phone_e164 FROM clients_phone_normalized WHERE client_id = NEW.client_id)
+    WHERE client_id = NEW.client_id;
+END;
@@ -0,0 +1,33 @@
+-- Tables for merging duplicate clients
+-- Version: 006
+-- Date: 2026-10-17
+
+-- ClientManager has always read and written digital_checklists but no
+-- migration created it. One open checklist per client, as its INSERT OR
+-- REPLACE expects.
+CREATE TABLE IF NOT EXISTS digital_checklists (
+    checklist_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    client_id INTEGER NOT NULL UNIQUE,
+    checklist_date TEXT NOT NULL CHECK (length(checklist_date) = 10), -- YYYY-MM-DD
+    questions TEXT,
+    is_completed INTEGER NOT NULL DEFAULT 0 CHECK (is_completed IN (0, 1)),
+    FOREIGN KEY (client_id) REFERENCES clients(client_id) ON DELETE CASCADE
+);
+
+-- Audit trail: the dropped client's identifying fields survive the merge
+CREATE TABLE client_merges (
+    merge_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    keep_id INTEGER NOT NULL,
+    drop_id INTEGER NOT NULL,
+    dropped_full_name TEXT NOT NULL,
+    dropped_phone_number TEXT NOT NULL,
+    dropped_email TEXT,
+    dropped_dob TEXT,
+    appointments_moved INTEGER NOT NULL DEFAULT 0,
+    merged_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_client_merges_keep_id ON client_merges(keep_id);
+
+-- merge_clients re-points client reminders by related_id
+CREATE INDEX idx_owner_reminders_related_id ON owner_reminders(related_id);
@@ -0,0 +1,17 @@
+-- Appointment start/end times on a machine with an index for overlap checks
+-- Version: 007
+-- Date: 2026-10-17
+
+-- Local wall-clock 'YYYY-MM-DD HH:MM', so text order is time order. Appointments
+-- booked before slots existed keep NULL times and never block a slot.
+ALTER TABLE appointments ADD COLUMN start_time TEXT CHECK (start_time IS NULL OR length(start_time) = 16);
+ALTER TABLE appointments ADD COLUMN end_time TEXT CHECK (end_time IS NULL OR (length(end_time) = 16 AND end_time > start_time));
+-- The laser the session runs on; one salon machine unless more are added to hardware
+ALTER TABLE appointments ADD COLUMN hardware_id INTEGER NOT NULL DEFAULT 1;
+
+-- Slots on one machine never overlap, so the only booking that can collide with
+-- [start, end) is the one with the latest start_time before end: AppointmentManager
+-- finds it with one descending probe of this index (ORDER BY start_time DESC LIMIT 1).
+CREATE INDEX idx_appointments_machine_slots
+    ON appointments(hardware_id, start_time, end_time)
+    WHERE start_time IS NOT NULL AND appointment_status IN ('Scheduled', 'Rescheduled', 'Completed');
@@ -0,0 +1,24 @@
+-- Transactional outbox for calendar, email and SMS side effects
+-- Version: 008
+-- Date: 2026-10-17
+
+-- AppointmentManager writes one row per side effect in the same transaction
+-- as the appointment; OutboxDispatcher drains it on a background thread.
+-- idempotency_key is UNIQUE so enqueueing the same effect twice is a no-op.
+CREATE TABLE outbox (
+    message_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    channel TEXT NOT NULL CHECK (channel IN ('calendar', 'email', 'sms')),
+    payload TEXT NOT NULL, -- JSON
+    status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'sent', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0 CHECK (attempts >= 0),
+    next_attempt_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP, -- also the claim lease while sending
+    last_error TEXT,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    sent_at DATETIME
+);
+
+-- OutboxDispatcher's claim:
+--   status = 'pending' AND next_attempt_at <= datetime('now') ORDER BY next_attempt_at LIMIT ?
+-- Sent and failed rows drop out of the index, so it stays the size of the backlog.
+CREATE INDEX idx_outbox_due ON outbox(next_attempt_at) WHERE status = 'pending';
@@ -0,0 +1,24 @@
+-- Composite and partial indexes for the managers' hot queries
+-- Version: 009
+-- Date: 2026-10-17
+
+-- AppointmentManager.get_previous_appointment:
+--   client_id = ? AND area_id = ? AND appointment_status = 'Completed' ORDER BY appointment_date DESC LIMIT 1
+-- Equality columns first, then the sort column, so the newest row is the first index entry.
+CREATE INDEX idx_appointments_completed_client_area_date
+    ON appointments(client_id, area_id, appointment_date)
+    WHERE appointment_status = 'Completed';
+
+-- FinanceManager.get_revenue_by_date and get_pnl read the daily_finance
+-- rollup (003) by its primary key, so completed appointments need no
+-- date/amount index of their own.
+
+-- ReminderManager.get_due_reminders:
+--   reminder_date <= ? AND is_active = TRUE
+-- The partial-index WHERE must be written exactly as the query writes it
+-- (TRUE, not 1) or the planner will not prove it applies.
+CREATE INDEX idx_owner_reminders_active_reminder_date
+    ON owner_reminders(reminder_date)
+    WHERE is_active = TRUE;
+
+ANALYZE;
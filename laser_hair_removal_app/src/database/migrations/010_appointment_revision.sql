@@ -0,0 +1,8 @@
+-- Appointment revision counter for outbox idempotency keys
+-- Version: 010
+-- Date: 2026-10-17
+
+-- Bumped by every reschedule. AppointmentManager puts it in the outbox keys
+-- so a booking moved A -> B -> A queues a fresh calendar update and reminder
+-- for the move back instead of colliding with the rows queued for the first A.
+ALTER TABLE appointments ADD COLUMN revision INTEGER NOT NULL DEFAULT 0 CHECK (revision >= 0);
@@ -0,0 +1,10 @@
+-- Calendar event id per appointment, for replacing the event on reschedule
+-- Version: 011
+-- Date: 2026-10-17
+
+-- The id of the appointment's latest queued calendar event (derived from its
+-- outbox key, so it is known before the event is sent). A reschedule queues
+-- the new event with this id as the one it replaces, and OutboxDispatcher
+-- deletes the old event once the new one is in. Kept here because sent
+-- outbox rows are purged.
+ALTER TABLE appointments ADD COLUMN calendar_event_id TEXT;
@@ -5,8 +5,29 @@ import logging
 from src.utils.logger import Logger
 from src.utils.config import Config
 from src.database.db_operations import DatabaseOperations
+from src.backend.outbox import OutboxDispatcher
+from src.utils.calendar_sync import CalendarSync
+from src.utils.email_sender import EmailSender
+from src.utils.sms_sender import SMSSender
 import os
 
+def start_outbox_dispatcher(config_path: str, secrets_path: str, db: DatabaseOperations) -> OutboxDispatcher:
+    """Start the background sender for queued calendar, email and SMS side effects.
+    
+    A sender that cannot be set up (e.g. no calendar credentials) is left
+    out; its messages stay queued until a later start can deliver them.
+    """
+    logger = logging.getLogger(__name__)
+    senders = {}
+    for name, sender_class in (('calendar_sync', CalendarSync), ('email_sender', EmailSender), ('sms_sender', SMSSender)):
+        try:
+            senders[name] = sender_class(config_path, secrets_path)
+        except Exception as e:
+            logger.warning(f"{sender_class.__name__} unavailable, its outbox messages stay queued: {e}")
+    dispatcher = OutboxDispatcher(db, **senders)
+    dispatcher.start()
+    return dispatcher
+
 def main():
     """Main entry point for the laser hair removal application."""
     # Initialize logging
@@ -25,6 +46,7 @@ def main():
     db_path = f"{data_dir}/database.db"
     db = DatabaseOperations(secrets_path, db_path)
     db.initialize_database()
+    dispatcher = start_outbox_dispatcher(config_path, secrets_path, db)
     
     # Set up application
     app = QApplication(sys.argv)
@@ -32,7 +54,9 @@ def main():
     window.show()
     
     logger.info("Application started successfully at 06:56 PM CEST, July 20, 2025")
-    sys.exit(app.exec_())
+    exit_code = app.exec_()
+    dispatcher.stop()
+    sys.exit(exit_code)
 
 if __name__ == "__main__":
     try:
@@ -24,7 +24,8 @@ class Appointment:
     def __init__(self, appointment_id: int, client_id: int, service_id: int, area_id: int, 
                  appointment_date: str, session_number: int, power: float = None, 
                  appointment_status: str = 'Scheduled', amount: float = None, 
-                 payment_method_id: int = None, next_suggested_appointment_date: str = None):
+                 payment_method_id: int = None, next_suggested_appointment_date: str = None,
+                 start_time: str = None, end_time: str = None, hardware_id: int = 1):
         """Initialize an Appointment instance with provided attributes."""
         self.appointment_id = appointment_id
         self.client_id = self._validate_client_id(client_id)
@@ -37,6 +38,8 @@ class Appointment:
         self.amount = amount
         self.payment_method_id = payment_method_id
         self.next_suggested_appointment_date = self._validate_date(next_suggested_appointment_date) if next_suggested_appointment_date else None
+        self.start_time, self.end_time = self._validate_slot(start_time, end_time)
+        self.hardware_id = hardware_id
     
     def _validate_client_id(self, client_id: int) -> int:
         """Validate client_id is a positive integer."""
@@ -66,6 +69,19 @@ class Appointment:
                 raise ValueError("Date must be in YYYY-MM-DD format")
         return None
     
+    def _validate_slot(self, start_time: str, end_time: str) -> tuple:
+        """Validate an optional 'YYYY-MM-DD HH:MM' slot that ends after it starts."""
+        if start_time is None and end_time is None:
+            return None, None
+        try:
+            start = datetime.strptime(start_time, '%Y-%m-%d %H:%M')
+            end = datetime.strptime(end_time, '%Y-%m-%d %H:%M')
+        except (TypeError, ValueError):
+            raise ValueError("Start and end times must be in YYYY-MM-DD HH:MM format")
+        if end <= start:
+            raise ValueError("Appointment must end after it starts")
+        return start_time, end_time
+    
     def _validate_session_number(self, session_number: int) -> int:
         """Validate session number is a positive integer up to 10."""
         if not isinstance(session_number, int) or session_number < 1 or session_number > 10:
@@ -84,13 +100,21 @@ class Appointment:
         if not previous_appointment or previous_appointment.area_id != self.area_id:
             return True  # No previous appointment or different area, assume valid
         
-        prev_date = datetime.strptime(previous_appointment.appointment_date, '%Y-%m-%d')
         curr_date = datetime.strptime(self.appointment_date, '%Y-%m-%d')
-        min_weeks = self.MIN_WAITING_PERIODS.get(previous_appointment.session_number, 20)
-        min_date = prev_date + timedelta(weeks=min_weeks)
+        min_date = self.earliest_next_date(previous_appointment.appointment_date, previous_appointment.session_number)
         
         return curr_date >= min_date
     
+    @classmethod
+    def waiting_weeks(cls, previous_session_number: int) -> int:
+        """Return the minimum weeks to wait after the given session, e.g. 4 after Session 1."""
+        return cls.MIN_WAITING_PERIODS.get(previous_session_number + 1, 20)
+    
+    @classmethod
+    def earliest_next_date(cls, previous_date: str, previous_session_number: int) -> datetime:
+        """Return the first date the next session for an area may take place."""
+        return datetime.strptime(previous_date, '%Y-%m-%d') + timedelta(weeks=cls.waiting_weeks(previous_session_number))
+    
     def to_dict(self) -> dict:
         """Convert appointment data to a dictionary for database storage or display."""
         return {
@@ -104,7 +128,10 @@ class Appointment:
             'appointment_status': self.appointment_status,
             'amount': self.amount,
             'payment_method_id': self.payment_method_id,
-            'next_suggested_appointment_date': self.next_suggested_appointment_date
+            'next_suggested_appointment_date': self.next_suggested_appointment_date,
+            'start_time': self.start_time,
+            'end_time': self.end_time,
+            'hardware_id': self.hardware_id
         }
     
     @classmethod
@@ -121,7 +148,10 @@ class Appointment:
             appointment_status=data.get('appointment_status', 'Scheduled'),
             amount=data.get('amount'),
             payment_method_id=data.get('payment_method_id'),
-            next_suggested_appointment_date=data.get('next_suggested_appointment_date')
+            next_suggested_appointment_date=data.get('next_suggested_appointment_date'),
+            start_time=data.get('start_time'),
+            end_time=data.get('end_time'),
+            hardware_id=data.get('hardware_id', 1)
         )
 
     def __str__(self) -> str:
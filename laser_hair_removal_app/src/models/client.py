@@ -19,8 +19,8 @@ class Client:
         self.notes = notes
     
     def _validate_name(self, name: str) -> str:
-        """Validate that the name is non-empty and contains only letters and spaces."""
-        if not name or not isinstance(name, str) or not re.match(r'^[a-zA-Z\s]+$', name.strip()):
+        """Validate that the name is non-empty and contains only letters (including Polish) and spaces."""
+        if not name or not isinstance(name, str) or not re.match(r'^(?:[^\W\d_]|\s)+$', name.strip()):
             raise ValueError("Full name must contain only letters and spaces")
         return name.strip()
     
@@ -1,6 +1,7 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, 
                             QPushButton, QTableWidget, QTableWidgetItem, QComboBox, 
-                            QMessageBox, QDateEdit)
+                            QMessageBox, QDateEdit, QTimeEdit)
+from PyQt5.QtCore import QTime
 from src.backend.appointment_manager import AppointmentManager
 from src.backend.client_manager import ClientManager
 from src.models.treatment_area import TreatmentArea
@@ -31,15 +32,16 @@ class AppointmentView(QWidget):
         self.client_id_input = QComboBox(self)
         self.date_input = QDateEdit(self)
         self.date_input.setDate(datetime.now())
+        self.time_input = QTimeEdit(QTime(10, 0), self)
+        self.time_input.setDisplayFormat("HH:mm")
         self.session_input = QLineEdit(self)
         self.power_input = QLineEdit(self)
         self.amount_input = QLineEdit(self)
         self.area_input = QComboBox(self)
         
         # Populate client dropdown
-        clients = self.client_manager.search_clients("")
         self.client_id_input.addItem("Select Client", "")
-        for client in clients:
+        for client in self.client_manager.iter_clients(""):
             self.client_id_input.addItem(f"{client.full_name} (ID: {client.client_id})", client.client_id)
         
         # Populate area dropdown
@@ -51,6 +53,8 @@ class AppointmentView(QWidget):
         input_layout.addWidget(self.client_id_input)
         input_layout.addWidget(QLabel("Date:"))
         input_layout.addWidget(self.date_input)
+        input_layout.addWidget(QLabel("Time:"))
+        input_layout.addWidget(self.time_input)
         input_layout.addWidget(QLabel("Session #:"))
         input_layout.addWidget(self.session_input)
         input_layout.addWidget(QLabel("Power:"))
@@ -99,6 +103,7 @@ class AppointmentView(QWidget):
             area_id = self.area_input.currentData()
             if not client_id or not area_id:
                 raise ValueError("Select a client and area")
+            area = next((area for area in self.areas if area.area_id == area_id), None)
             appointment_id = self.appointment_manager.schedule_appointment(
                 client_id,
                 1,  # Placeholder service_id
@@ -106,7 +111,9 @@ class AppointmentView(QWidget):
                 self.date_input.date().toString("yyyy-MM-dd"),
                 int(self.session_input.text() or 1),
                 float(self.power_input.text()) if self.power_input.text() else None,
-                float(self.amount_input.text()) if self.amount_input.text() else None
+                float(self.amount_input.text()) if self.amount_input.text() else None,
+                start_time=self.time_input.time().toString("HH:mm"),
+                duration_minutes=area.estimated_duration_minutes if area else None  # 0 falls back to the service duration
             )
             QMessageBox.information(self, "Success", f"Appointment scheduled with ID {appointment_id}")
             self.refresh_table()
@@ -127,7 +134,8 @@ class AppointmentView(QWidget):
             appointment_id = int(self.table.item(selected, 0).text())
             self.appointment_manager.reschedule_appointment(
                 appointment_id,
-                self.date_input.date().toString("yyyy-MM-dd")
+                self.date_input.date().toString("yyyy-MM-dd"),
+                self.time_input.time().toString("HH:mm")
             )
             QMessageBox.information(self, "Success", f"Appointment {appointment_id} rescheduled")
             self.refresh_table()
@@ -160,13 +168,17 @@ class AppointmentView(QWidget):
         """Refresh the appointment table with current data."""
         try:
             today = datetime.now().strftime('%Y-%m-%d')
-            appointments = self.appointment_manager.get_appointments_by_date(today)
-            self.table.setRowCount(len(appointments))
+            self.table.setRowCount(0)
+            appointments = self.appointment_manager.iter_appointments(
+                date=today, statuses=['Scheduled', 'Rescheduled']
+            )
             for row, appointment in enumerate(appointments):
+                self.table.insertRow(row)
                 self.table.setItem(row, 0, QTableWidgetItem(str(appointment.appointment_id)))
                 client = self.client_manager.get_client(appointment.client_id)
                 self.table.setItem(row, 1, QTableWidgetItem(client.full_name if client else "Unknown"))
-                self.table.setItem(row, 2, QTableWidgetItem(appointment.appointment_date))
+                when = f"{appointment.start_time}-{appointment.end_time[-5:]}" if appointment.start_time else appointment.appointment_date
+                self.table.setItem(row, 2, QTableWidgetItem(when))
                 self.table.setItem(row, 3, QTableWidgetItem(str(appointment.session_number)))
                 self.table.setItem(row, 4, QTableWidgetItem(str(appointment.power) if appointment.power else ""))
                 self.table.setItem(row, 5, QTableWidgetItem(str(appointment.amount) if appointment.amount else ""))
@@ -183,6 +195,7 @@ class AppointmentView(QWidget):
         """Clear all input fields."""
         self.client_id_input.setCurrentIndex(0)
         self.date_input.setDate(datetime.now())
+        self.time_input.setTime(QTime(10, 0))
         self.session_input.clear()
         self.power_input.clear()
         self.amount_input.clear()
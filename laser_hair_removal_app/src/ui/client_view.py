@@ -2,17 +2,21 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdi
                             QPushButton, QTableWidget, QTableWidgetItem, QMessageBox)
 from src.backend.client_manager import ClientManager
 import logging
+from itertools import islice
 from src.utils.config import Config
 
 class ClientView(QWidget):
     """UI component for managing client data."""
     
+    PAGE_SIZE = 200  # rows added to the table per scroll-to-bottom
+    
     def __init__(self, config_path: str, db_path: str, parent=None):
         """Initialize the client view with configuration and database paths."""
         super().__init__(parent)
         self.config = Config(config_path, db_path)
         self.client_manager = ClientManager(config_path, db_path)
         self.logger = logging.getLogger(__name__)
+        self._pending_clients = iter(())
         self.init_ui()
     
     def init_ui(self):
@@ -51,11 +55,18 @@ class ClientView(QWidget):
         self.table.setColumnCount(5)
         self.table.setHorizontalHeaderLabels(["ID", "Name", "Phone", "Email", "DOB"])
         self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.verticalScrollBar().valueChanged.connect(self._on_scroll)
+        self.table.itemSelectionChanged.connect(self.show_summary)
+        
+        # Treatment summary of the selected client
+        self.summary_label = QLabel("", self)
+        self.summary_label.setWordWrap(True)
         
         # Add layouts
         layout.addLayout(input_layout)
         layout.addLayout(button_layout)
         layout.addWidget(self.table)
+        layout.addWidget(self.summary_label)
         
         self.setLayout(layout)
         
@@ -109,21 +120,59 @@ class ClientView(QWidget):
             QMessageBox.critical(self, "Error", "Failed to update client")
     
     def refresh_table(self):
-        """Refresh the client table with current data."""
+        """Refresh the client table, loading the first page of clients."""
         try:
-            clients = self.client_manager.search_clients("")
-            self.table.setRowCount(len(clients))
-            for row, client in enumerate(clients):
-                self.table.setItem(row, 0, QTableWidgetItem(str(client.client_id)))
-                self.table.setItem(row, 1, QTableWidgetItem(client.full_name))
-                self.table.setItem(row, 2, QTableWidgetItem(client.phone_number))
-                self.table.setItem(row, 3, QTableWidgetItem(client.email or ""))
-                self.table.setItem(row, 4, QTableWidgetItem(client.dob or ""))
+            self._pending_clients = self.client_manager.iter_clients("", page_size=self.PAGE_SIZE)
+            self.table.setRowCount(0)
+            self.load_more_rows()
             self.logger.info("Client table refreshed")
         except Exception as e:
             self.logger.error(f"Error refreshing client table: {e}")
             QMessageBox.critical(self, "Error", "Failed to refresh client list")
     
+    def load_more_rows(self):
+        """Append the next page of clients from the pending iterator."""
+        for client in islice(self._pending_clients, self.PAGE_SIZE):
+            row = self.table.rowCount()
+            self.table.insertRow(row)
+            self.table.setItem(row, 0, QTableWidgetItem(str(client.client_id)))
+            self.table.setItem(row, 1, QTableWidgetItem(client.full_name))
+            self.table.setItem(row, 2, QTableWidgetItem(client.phone_number))
+            self.table.setItem(row, 3, QTableWidgetItem(client.email or ""))
+            self.table.setItem(row, 4, QTableWidgetItem(client.dob or ""))
+    
+    def show_summary(self):
+        """Show per-area progress, spend and open reminders for the selected client."""
+        selected = self.table.currentRow()
+        if selected < 0 or self.table.item(selected, 0) is None:
+            self.summary_label.clear()
+            return
+        try:
+            summary = self.client_manager.get_client_summary(int(self.table.item(selected, 0).text()))
+            if summary is None:
+                self.summary_label.clear()
+                return
+            lines = [f"{summary['sessions_completed']} sessions, total spend {summary['total_spend']:.2f}"]
+            for area in summary['areas']:
+                power = f"{area['last_power']}" if area['last_power'] is not None else "-"
+                lines.append(f"Area {area['area_id']}: {area['sessions_completed']} sessions, last {area['last_session_date']} "
+                             f"at power {power}, next suggested {area['next_suggested_date'] or '-'}")
+            if summary['outstanding_reminders']:
+                lines.append(f"{len(summary['outstanding_reminders'])} outstanding reminders, next on "
+                             f"{summary['outstanding_reminders'][0]['reminder_date']}")
+            self.summary_label.setText('\n'.join(lines))
+        except Exception as e:
+            self.logger.error(f"Error loading client summary: {e}")
+            self.summary_label.setText("Summary unavailable")
+    
+    def _on_scroll(self, value: int):
+        """Load the next page once the table is scrolled to the bottom."""
+        if value == self.table.verticalScrollBar().maximum():
+            try:
+                self.load_more_rows()
+            except Exception as e:
+                self.logger.error(f"Error loading more clients: {e}")
+    
     def clear_inputs(self):
         """Clear all input fields."""
         self.name_input.clear()
@@ -3,7 +3,7 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushBut
 from src.backend.finance_manager import FinanceManager
 import logging
 from src.utils.config import Config
-from datetime import datetime
+from datetime import datetime, timedelta
 
 class FinanceView(QWidget):
     """UI component for managing financial data."""
@@ -82,10 +82,8 @@ class FinanceView(QWidget):
         """Display the daily financial report."""
         try:
             today = datetime.now().strftime('%Y-%m-%d')
-            report = self.finance_manager.get_revenue_by_date(today, today), \
-                     sum(exp.amount for exp in self.finance_manager.get_expenses_by_date(today, today)), \
-                     self.finance_manager.get_profit_by_date(today, today), \
-                     len(self.finance_manager.get_expenses_by_date(today, today))  # Placeholder for appointments
+            buckets = self.finance_manager.get_pnl(today, today, 'day')
+            report = self._totals(buckets)
             self.update_summary(*report)
             self.update_table([(today, *report[:3])])
             self.logger.info(f"Displayed daily report for {today}")
@@ -98,12 +96,9 @@ class FinanceView(QWidget):
         try:
             end_date = datetime.now().strftime('%Y-%m-%d')
             start_date = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
-            report = self.finance_manager.get_revenue_by_date(start_date, end_date), \
-                     sum(exp.amount for exp in self.finance_manager.get_expenses_by_date(start_date, end_date)), \
-                     self.finance_manager.get_profit_by_date(start_date, end_date), \
-                     sum(len(self.finance_manager.get_expenses_by_date(start_date, end_date)))  # Placeholder
-            self.update_summary(*report)
-            self.update_table([(f"{start_date} to {end_date}", *report[:3])])
+            buckets = self.finance_manager.get_pnl(start_date, end_date, 'day')
+            self.update_summary(*self._totals(buckets))
+            self.update_table([(row['period'], row['revenue'], row['expenses'], row['profit']) for row in buckets])
             self.logger.info(f"Displayed weekly report for {start_date} to {end_date}")
         except Exception as e:
             self.logger.error(f"Error displaying weekly report: {e}")
@@ -122,6 +117,14 @@ class FinanceView(QWidget):
             self.logger.error(f"Error displaying client activity report: {e}")
             QMessageBox.critical(self, "Error", "Failed to display client activity report")
     
+    @staticmethod
+    def _totals(buckets: list) -> tuple:
+        """Sum get_pnl buckets into (revenue, expenses, profit, appointments)."""
+        return (sum(row['revenue'] for row in buckets),
+                sum(row['expenses'] for row in buckets),
+                sum(row['profit'] for row in buckets),
+                sum(row['appointment_count'] for row in buckets))
+    
     def update_summary(self, revenue: float, expenses: float, profit: float, appointments: int):
         """Update the financial summary labels."""
         self.revenue_label.setText(f"Revenue: ${revenue:.2f}")
@@ -1,7 +1,9 @@
 import sys
 import os
 import logging
-from PyQt5.QtWidgets import (QMainWindow, QTabWidget, QAction, QFileDialog, QMessageBox, QApplication)
+from PyQt5.QtWidgets import (QMainWindow, QTabWidget, QAction, QFileDialog, QMessageBox, QApplication,
+                            QProgressDialog)
+from PyQt5.QtCore import QThread, pyqtSignal
 from src.ui.client_view import ClientView
 from src.ui.appointment_view import AppointmentView
 from src.ui.finance_view import FinanceView
@@ -11,8 +13,31 @@ from src.ui.report_view import ReportView
 from src.utils.config import Config
 from src.utils.logger import Logger
 from src.database.db_operations import DatabaseOperations
+from src.database.db_backup import DatabaseBackup
 from src.backend.reporting import Reporting
 
+class BackupWorker(QThread):
+    """Runs a DatabaseBackup off the UI thread and reports progress."""
+    
+    progress = pyqtSignal(int, int)
+    succeeded = pyqtSignal(dict)
+    failed = pyqtSignal(str)
+    
+    def __init__(self, backup: DatabaseBackup, parent=None):
+        """Initialize with the backup engine to run."""
+        super().__init__(parent)
+        self.backup = backup
+    
+    def run(self):
+        """Copy the database page by page, emitting progress after each step."""
+        try:
+            result = self.backup.run(lambda copied, total: self.progress.emit(copied, total))
+            self.succeeded.emit(result)
+        except Exception as e:
+            self.failed.emit(str(e))
+        finally:
+            self.backup.db.close_connection()
+
 class MainWindow(QMainWindow):
     """Main application window with tabbed navigation."""
     
@@ -73,18 +98,37 @@ class MainWindow(QMainWindow):
         self.show()
 
     def backup_database(self):
-        """Create a backup of the database."""
-        backup_path, _ = QFileDialog.getSaveFileName(self, "Save Database Backup", "", "SQLite Database (*.db)")
-        if backup_path:
-            try:
-                with open(backup_path, 'wb') as backup_file:
-                    with open(self.db.db_path, 'rb') as db_file:
-                        backup_file.write(db_file.read())
-                QMessageBox.information(self, "Success", f"Database backed up to {backup_path}")
-                self.logger.info("Database backed up to %s", backup_path)
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Failed to backup database: {str(e)}")
-                self.logger.error("Backup failed: %s", str(e))
+        """Back up the live database in the background into the chosen directory."""
+        default_dir = self.config.get('backup.dir', 'data/backups')
+        backup_dir = QFileDialog.getExistingDirectory(self, "Select Backup Directory", default_dir)
+        if not backup_dir:
+            return
+        self.backup_progress = QProgressDialog("Backing up database...", None, 0, 100, self)
+        self.backup_progress.setWindowTitle("Backup")
+        self.backup_progress.setMinimumDuration(0)
+        self.backup_worker = BackupWorker(DatabaseBackup(self.db, backup_dir), self)
+        self.backup_worker.progress.connect(self._on_backup_progress)
+        self.backup_worker.succeeded.connect(self._on_backup_succeeded)
+        self.backup_worker.failed.connect(self._on_backup_failed)
+        self.backup_worker.start()
+
+    def _on_backup_progress(self, copied: int, total: int):
+        """Update the progress dialog with copied pages."""
+        self.backup_progress.setMaximum(max(total, 1))
+        self.backup_progress.setValue(copied)
+
+    def _on_backup_succeeded(self, result: dict):
+        """Report a finished backup with its duration and throughput."""
+        self.backup_progress.close()
+        QMessageBox.information(self, "Success", f"Database backed up to {result['path']} "
+                                f"in {result['duration_s']:.1f} s ({result['mb_per_s']:.1f} MB/s)")
+        self.logger.info("Database backed up to %s", result['path'])
+
+    def _on_backup_failed(self, error: str):
+        """Report a failed backup."""
+        self.backup_progress.close()
+        QMessageBox.critical(self, "Error", f"Failed to backup database: {error}")
+        self.logger.error("Backup failed: %s", error)
 
     def export_reports(self):
         """Export all reports to a directory."""
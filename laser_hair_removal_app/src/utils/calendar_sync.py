@@ -1,16 +1,18 @@
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from src.utils.config import Config
 import logging
 from datetime import datetime, timedelta
 import os
-from typing import Optional
+from typing import List, Optional
 
 class CalendarSync:
     """Handles synchronization of appointments with an external calendar."""
     
     SCOPES = ['https://www.googleapis.com/auth/calendar']
+    BATCH_SIZE = 50  # calls per batch request; Google recommends staying at or below 50
     
     def __init__(self, config_path: str, secrets_path: str):
         """Initialize with configuration and secrets paths."""
@@ -39,21 +41,15 @@ class CalendarSync:
         
         return creds
     
-    def add_event(self, appointment_id: int, appointment_date: str, client_name: str) -> Optional[str]:
-        """Add an appointment as an event to the calendar."""
+    def add_event(self, appointment_id: int, appointment_date: str, client_name: str,
+                  slot_start: str = None, slot_end: str = None) -> Optional[str]:
+        """Add an appointment as an event to the calendar.
+        
+        slot_start/slot_end are the appointment's 'YYYY-MM-DD HH:MM' Warsaw
+        times; appointments without a slot default to 10:00-11:00.
+        """
         try:
-            # Parse date and set time (e.g., 10:00 AM to 11:00 AM)
-            date = datetime.strptime(appointment_date, '%Y-%m-%d')
-            start_time = date.replace(hour=10, minute=0, second=0).isoformat() + 'Z'
-            end_time = date.replace(hour=11, minute=0, second=0).isoformat() + 'Z'
-            
-            event = {
-                'summary': f"Appointment {appointment_id} - {client_name}",
-                'start': {'dateTime': start_time, 'timeZone': 'Europe/Warsaw'},
-                'end': {'dateTime': end_time, 'timeZone': 'Europe/Warsaw'},
-                'description': f"Client: {client_name}, Appointment ID: {appointment_id}"
-            }
-            
+            event = self._event_body(appointment_id, appointment_date, client_name, slot_start, slot_end)
             event = self.service.events().insert(calendarId='primary', body=event).execute()
             self.logger.info(f"Added event {event.get('id')} for appointment {appointment_id}")
             return event.get('id')
@@ -61,6 +57,90 @@ class CalendarSync:
             self.logger.error(f"Error adding event for appointment {appointment_id}: {e}")
             raise
     
+    def add_events(self, appointments: List[tuple]) -> List[Optional[str]]:
+        """Add many (appointment_id, appointment_date, client_name, slot_start, slot_end[, event_id]) events.
+        
+        Inserts go out as Google API batch requests of up to BATCH_SIZE calls,
+        one HTTP round trip each. With an event_id a retried insert that
+        already went through (HTTP 409) counts as done. Returns the event id
+        per input, or None where the insert failed (logged).
+        """
+        event_ids = [None] * len(appointments)
+        
+        def collect(request_id, response, exception):
+            index = int(request_id)
+            if exception is None:
+                event_ids[index] = response.get('id')
+            elif isinstance(exception, HttpError) and exception.resp.status == 409 and len(appointments[index]) > 5:
+                event_ids[index] = appointments[index][5]
+            else:
+                self.logger.error(f"Error adding event for appointment {appointments[index][0]}: {exception}")
+        
+        try:
+            for first in range(0, len(appointments), self.BATCH_SIZE):
+                batch = self.service.new_batch_http_request(callback=collect)
+                for index in range(first, min(first + self.BATCH_SIZE, len(appointments))):
+                    event = self._event_body(*appointments[index])
+                    batch.add(self.service.events().insert(calendarId='primary', body=event), request_id=str(index))
+                batch.execute()
+            self.logger.info(f"Added {sum(1 for event_id in event_ids if event_id)} of {len(appointments)} events in batches")
+            return event_ids
+        except Exception as e:
+            self.logger.error(f"Error adding events in batch: {e}")
+            raise
+    
+    def delete_events(self, event_ids: List[str]) -> List[bool]:
+        """Delete many events in batch requests of up to BATCH_SIZE calls.
+        
+        An event that is already gone (HTTP 404 or 410) counts as deleted, so
+        a retried delete is harmless. Returns per input whether the event is
+        gone, False where the delete failed (logged).
+        """
+        deleted = [False] * len(event_ids)
+        
+        def collect(request_id, response, exception):
+            index = int(request_id)
+            if exception is None or (isinstance(exception, HttpError) and exception.resp.status in (404, 410)):
+                deleted[index] = True
+            else:
+                self.logger.error(f"Error deleting event {event_ids[index]}: {exception}")
+        
+        try:
+            for first in range(0, len(event_ids), self.BATCH_SIZE):
+                batch = self.service.new_batch_http_request(callback=collect)
+                for index in range(first, min(first + self.BATCH_SIZE, len(event_ids))):
+                    batch.add(self.service.events().delete(calendarId='primary', eventId=event_ids[index]),
+                              request_id=str(index))
+                batch.execute()
+            self.logger.info(f"Deleted {sum(deleted)} of {len(event_ids)} events in batches")
+            return deleted
+        except Exception as e:
+            self.logger.error(f"Error deleting events in batch: {e}")
+            raise
+    
+    @staticmethod
+    def _event_body(appointment_id: int, appointment_date: str, client_name: str,
+                    slot_start: str = None, slot_end: str = None, event_id: str = None) -> dict:
+        """Build the event resource for an appointment; event_id, if given, is client-chosen."""
+        if slot_start and slot_end:
+            start_time = datetime.strptime(slot_start, '%Y-%m-%d %H:%M').isoformat()
+            end_time = datetime.strptime(slot_end, '%Y-%m-%d %H:%M').isoformat()
+        else:
+            # Parse date and set time (e.g., 10:00 AM to 11:00 AM)
+            date = datetime.strptime(appointment_date, '%Y-%m-%d')
+            start_time = date.replace(hour=10, minute=0, second=0).isoformat() + 'Z'
+            end_time = date.replace(hour=11, minute=0, second=0).isoformat() + 'Z'
+        
+        event = {
+            'summary': f"Appointment {appointment_id} - {client_name}",
+            'start': {'dateTime': start_time, 'timeZone': 'Europe/Warsaw'},
+            'end': {'dateTime': end_time, 'timeZone': 'Europe/Warsaw'},
+            'description': f"Client: {client_name}, Appointment ID: {appointment_id}"
+        }
+        if event_id:
+            event['id'] = event_id
+        return event
+    
     def update_event(self, event_id: str, appointment_date: str, client_name: str) -> bool:
         """Update an existing calendar event for a rescheduled appointment."""
         try:
@@ -99,6 +99,10 @@ class Config:
             self.logger.warning("Key %s not found, returning default %s", key, default)
         return value
 
+    def get_notification_config(self) -> dict:
+        """Return the notifications section, app_config values over secrets (smtp, twilio, ...)."""
+        return {**(self.secrets_data.get('notifications') or {}), **(self.config_data.get('notifications') or {})}
+
     def get_logging_level(self) -> str:
         """Retrieve logging level with fallback."""
         level = self.get('logging.level')
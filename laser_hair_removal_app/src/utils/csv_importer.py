@@ -12,7 +12,7 @@ class CSVImporter:
         """Initialize with configuration and database paths."""
         self.config = Config(config_path, secrets_path)
         self.logger = Logger().get_logger(__name__)
-        self.client_manager = ClientManager(config_path, db_path)
+        self.client_manager = ClientManager(secrets_path, db_path)
         self.import_dir = self.config.get('paths.imports_dir', 'data/imports')
         self.default_file = os.path.join(self.import_dir, 'clients.csv')
 
@@ -31,6 +31,7 @@ class CSVImporter:
                     self.logger.error("CSV file %s missing required fields: %s", file_path, required_fields)
                     raise ValueError(f"Missing required fields: {required_fields}")
 
+                rows, sources = [], []
                 for row in reader:
                     try:
                         # Validate and clean data
@@ -45,14 +46,21 @@ class CSVImporter:
                         if dob and len(dob) != 10:  # Expect YYYY-MM-DD
                             self.logger.warning("Invalid DOB format in row %s, skipping", row)
                             continue
-
-                        # Add client to database
-                        client_id = self.client_manager.add_client(full_name, phone_number, email, dob)
-                        self.logger.info("Imported client %s with ID %d", full_name, client_id)
+                        rows.append((full_name, phone_number, email, dob))
+                        sources.append(row)
                     except Exception as e:
                         self.logger.error("Error processing row %s: %s", row, str(e))
                         continue
 
+            # Add all clients with one executemany in one transaction
+            result = self.client_manager.db.add_clients_bulk(rows)
+            for index, reason in result['rejects']:
+                self.logger.error("Error processing row %s: %s", sources[index], reason)
+            for (full_name, *_), client_id in zip(rows, result['ids']):
+                if client_id is not None:
+                    self.logger.info("Imported client %s with ID %d", full_name, client_id)
+            self.logger.info("Imported %d clients, rejected %d",
+                             len(rows) - len(result['rejects']), len(result['rejects']))
             self.logger.info("Successfully imported clients from %s", file_path)
             return True
         except Exception as e:
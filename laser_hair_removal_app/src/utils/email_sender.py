@@ -1,35 +1,46 @@
+import math
 import smtplib
+import threading
+import time
+from collections import deque
 from email.mime.text import MIMEText
 from src.utils.config import Config
 import logging
-from typing import Optional
+from typing import List, Optional
 
 class EmailSender:
-    """Handles sending email notifications for the application."""
+    """Handles sending email notifications for the application.
+    
+    One authenticated SMTP session is kept open and reused, so STARTTLS and
+    LOGIN happen once per session rather than once per message. The session
+    is reopened after smtp_idle_seconds without use, and once on a dropped
+    connection mid-send.
+    """
     
     def __init__(self, config_path: str, secrets_path: str):
         """Initialize with configuration and secrets paths."""
         self.config = Config(config_path, secrets_path)
         self.logger = logging.getLogger(__name__)
         self.notification_config = self.config.get_notification_config()
+        smtp = self.notification_config.get('smtp') or {}
+        self.smtp_host = self.notification_config.get('smtp_server') or smtp.get('host', 'localhost')
+        self.smtp_port = int(self.notification_config.get('smtp_port') or smtp.get('port', 587))
+        self.smtp_username = smtp.get('username') or self.config.get('smtp_username')
+        self.smtp_password = smtp.get('password') or self.config.get('smtp_password')
+        self.use_starttls = bool(self.notification_config.get('smtp_starttls', True))
+        self.idle_seconds = float(self.notification_config.get('smtp_idle_seconds', 60))
+        self.timeout = float(self.notification_config.get('smtp_timeout_seconds', 30))
+        self._server = None
+        self._last_used = 0.0
+        self._lock = threading.Lock()
+        self._timings = deque(maxlen=1000)  # ms per delivered message, including any reconnect
+        self.connects = self.sent = self.failed = 0
     
     def send_email(self, to_email: str, subject: str, message: str) -> bool:
         """Send an email to the specified recipient."""
         try:
-            if not to_email or not isinstance(to_email, str):
-                raise ValueError("Invalid recipient email address")
-            
-            msg = MIMEText(message)
-            msg['Subject'] = subject
-            msg['From'] = self.notification_config.get('email_from', 'no-reply@laserapp.com')
-            msg['To'] = to_email
-            
-            with smtplib.SMTP(self.notification_config.get('smtp_server', 'localhost'),
-                            int(self.notification_config.get('smtp_port', 587))) as server:
-                server.starttls()
-                server.login(self.config.get('smtp_username'), self.config.get('smtp_password'))
-                server.send_message(msg)
-            
+            with self._lock:
+                self._deliver(to_email, subject, message)
             self.logger.info(f"Email sent to {to_email} with subject '{subject}'")
             return True
         except ValueError as e:
@@ -41,6 +52,102 @@ class EmailSender:
         except Exception as e:
             self.logger.error(f"Error sending email to {to_email}: {e}")
             raise
+    
+    def send_batch(self, messages: List[tuple]) -> List[Optional[Exception]]:
+        """Send (to_email, subject, message) tuples back to back over one session.
+        
+        Returns the exception per message, or None where it was sent; one bad
+        recipient does not stop the rest. Authentication failures abort the
+        batch, since every remaining message would fail the same way.
+        """
+        results = []
+        started = time.perf_counter()
+        with self._lock:
+            for to_email, subject, message in messages:
+                try:
+                    self._deliver(to_email, subject, message)
+                    results.append(None)
+                except smtplib.SMTPAuthenticationError as e:
+                    self.logger.error(f"Authentication failed, skipping {len(messages) - len(results)} emails")
+                    results.extend([e] * (len(messages) - len(results)))
+                    break
+                except Exception as e:
+                    self.logger.error(f"Error sending email to {to_email}: {e}")
+                    results.append(e)
+        sent = sum(1 for error in results if error is None)
+        self.logger.info(f"Sent {sent} of {len(messages)} emails in {(time.perf_counter() - started) * 1000:.0f} ms")
+        return results
+    
+    def _deliver(self, to_email: str, subject: str, message: str) -> None:
+        """Send one message over the shared session; the caller holds the lock."""
+        if not to_email or not isinstance(to_email, str):
+            self.failed += 1
+            raise ValueError("Invalid recipient email address")
+        
+        msg = MIMEText(message)
+        msg['Subject'] = subject
+        msg['From'] = self.notification_config.get('email_from', 'no-reply@laserapp.com')
+        msg['To'] = to_email
+        
+        started = time.perf_counter()
+        try:
+            try:
+                self._session().send_message(msg)
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                # The server dropped an idle or broken session; reconnect once and resend
+                self.close()
+                self._session().send_message(msg)
+        except Exception:
+            self.failed += 1
+            raise
+        self._last_used = time.monotonic()
+        self._timings.append((time.perf_counter() - started) * 1000)
+        self.sent += 1
+    
+    def _session(self) -> smtplib.SMTP:
+        """Return the open SMTP session, connecting and logging in if needed."""
+        if self._server is not None and time.monotonic() - self._last_used > self.idle_seconds:
+            self.close()
+        if self._server is None:
+            server = smtplib.SMTP(self.smtp_host, self.smtp_port, timeout=self.timeout)
+            try:
+                if self.use_starttls:
+                    server.starttls()
+                if self.smtp_username:
+                    server.login(self.smtp_username, self.smtp_password)
+            except Exception:
+                server.close()
+                raise
+            self._server = server
+            self._last_used = time.monotonic()
+            self.connects += 1
+        return self._server
+    
+    def close(self) -> None:
+        """End the SMTP session, if one is open."""
+        server, self._server = self._server, None
+        if server is not None:
+            try:
+                server.quit()
+            except (smtplib.SMTPException, OSError):
+                server.close()
+    
+    def stats(self) -> dict:
+        """Return send counts, SMTP sessions opened and per-message latency percentiles (ms)."""
+        timings = sorted(self._timings)
+        
+        def percentile(fraction: float) -> float:
+            # Nearest rank, as in QueryStats
+            return round(timings[max(0, math.ceil(fraction * len(timings)) - 1)], 3) if timings else 0.0
+        
+        return {
+            'sent': self.sent,
+            'failed': self.failed,
+            'connects': self.connects,
+            'p50_ms': percentile(0.50),
+            'p95_ms': percentile(0.95),
+            'max_ms': round(timings[-1], 3) if timings else 0.0
+        }
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
@@ -52,5 +159,12 @@ if __name__ == "__main__":
             "Your appointment is scheduled for tomorrow at 10:00 AM."
         )
         print(f"Email sent: {success}")
+        results = sender.send_batch([
+            ("client1@example.com", "Appointment Reminder", "Your appointment is tomorrow at 9:00 AM."),
+            ("client2@example.com", "Appointment Reminder", "Your appointment is tomorrow at 11:00 AM.")
+        ])
+        print(f"Batch errors: {results}")
+        print(sender.stats())
+        sender.close()
     except Exception as e:
-        print(f"Error: {e}")
\ No newline at end of file
+        print(f"Error: {e}")
@@ -0,0 +1,29 @@
+import re
+from typing import Optional
+
+# Separators people type between digit groups; '+' is kept to detect the country code
+_SEPARATORS = re.compile(r'[\s\-().\/]')
+_E164_DIGITS = re.compile(r'[0-9]{8,15}')
+
+def normalize_phone(raw: str, country_code: str = '48') -> Optional[str]:
+    """Return raw as an E.164 number (+48123456789), or None if it is not a phone number.
+    
+    Accepts +CC..., 00CC..., 9-digit national numbers (given country_code) and
+    national numbers already prefixed with country_code. Must stay in step with
+    the clients_phone_normalized view in migration 005, which stores the same
+    value in clients.phone_e164.
+    """
+    if not raw or not isinstance(raw, str):
+        return None
+    compact = _SEPARATORS.sub('', raw)
+    if compact.startswith('+'):
+        digits = compact[1:]
+    elif compact.startswith('00'):
+        digits = compact[2:]
+    elif len(compact) == 9:
+        digits = country_code + compact
+    elif len(compact) == 9 + len(country_code) and compact.startswith(country_code):
+        digits = compact
+    else:
+        return None
+    return '+' + digits if _E164_DIGITS.fullmatch(digits) else None
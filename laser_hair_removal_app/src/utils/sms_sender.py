@@ -1,19 +1,114 @@
+import math
 import requests
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from src.utils.config import Config
 import logging
-from typing import Optional
+from typing import List, Optional
+
+class TokenBucket:
+    """Thread-safe token bucket: rate tokens per second, bursts of up to capacity."""
+    
+    def __init__(self, rate: float, capacity: float):
+        """Initialize full; a rate of 0 disables limiting."""
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self) -> float:
+        """Take one token, sleeping until one is available; return the seconds waited."""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
 
 class SMSSender:
-    """Handles sending SMS notifications for the application."""
+    """Handles sending SMS notifications for the application.
+    
+    Requests go through one requests.Session, so connections to the gateway
+    are kept alive and reused. send_many() sends on a bounded thread pool,
+    and every send, from any thread, takes a token from a shared bucket sized
+    to the gateway quota (sms_rate_per_second, sms_burst).
+    """
     
     def __init__(self, config_path: str, secrets_path: str):
         """Initialize with configuration and secrets paths."""
         self.config = Config(config_path, secrets_path)
         self.logger = logging.getLogger(__name__)
         self.notification_config = self.config.get_notification_config()
+        self.max_workers = max(1, int(self.notification_config.get('sms_max_workers', 4)))
+        self.timeout = (float(self.notification_config.get('sms_connect_timeout_seconds', 3.05)),
+                        float(self.notification_config.get('sms_read_timeout_seconds', 10)))
+        rate = float(self.notification_config.get('sms_rate_per_second', 1))
+        self.rate_limiter = TokenBucket(rate, float(self.notification_config.get('sms_burst', rate)))
+        self.session = requests.Session()
+        # One pooled connection per worker, so concurrent sends never queue for a socket
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._executor = None
+        self._lock = threading.Lock()
+        self._timings = deque(maxlen=1000)  # ms per gateway request, excluding rate-limit waits
+        self.sent = self.failed = 0
+        self.throttled_seconds = 0.0
     
     def send_sms(self, to_phone: str, message: str) -> bool:
         """Send an SMS to the specified phone number."""
+        try:
+            self._deliver(to_phone, message)
+            self.logger.info(f"SMS sent to {to_phone}")
+            return True
+        except ValueError as e:
+            self.logger.error(f"Validation error sending SMS to {to_phone}: {e}")
+            raise
+        except requests.RequestException as e:
+            self.logger.error(f"Network error sending SMS to {to_phone}: {e}")
+            raise
+        except Exception as e:
+            self.logger.error(f"Error sending SMS to {to_phone}: {e}")
+            raise
+    
+    def send_many(self, messages: List[tuple]) -> List[Optional[Exception]]:
+        """Send (to_phone, message) tuples concurrently within the rate limit.
+        
+        Returns the exception per message, or None where it was sent, in the
+        order given.
+        """
+        started = time.perf_counter()
+        if len(messages) <= 1:
+            results = [self._attempt(to_phone, message) for to_phone, message in messages]
+        else:
+            results = list(self._pool().map(lambda args: self._attempt(*args), messages))
+        sent = sum(1 for error in results if error is None)
+        self.logger.info(f"Sent {sent} of {len(messages)} SMS in {(time.perf_counter() - started) * 1000:.0f} ms")
+        return results
+    
+    def _attempt(self, to_phone: str, message: str) -> Optional[Exception]:
+        """Send one message and return the exception it raised, or None."""
+        try:
+            self._deliver(to_phone, message)
+            return None
+        except Exception as e:
+            self.logger.error(f"Error sending SMS to {to_phone}: {e}")
+            return e
+    
+    def _deliver(self, to_phone: str, message: str) -> None:
+        """POST one message to the gateway over the shared session."""
         try:
             if not to_phone or not isinstance(to_phone, str):
                 raise ValueError("Invalid phone number")
@@ -31,23 +126,58 @@ class SMSSender:
                 'api_key': api_key,
                 'from': self.notification_config.get('sms_from', 'LaserApp')
             }
-            response = requests.post(url, data=payload, timeout=10)
+            waited = self.rate_limiter.acquire()
+            started = time.perf_counter()
+            response = self.session.post(url, data=payload, timeout=self.timeout)
+            elapsed_ms = (time.perf_counter() - started) * 1000
             
-            if response.status_code == 200 and response.json().get('success'):
-                self.logger.info(f"SMS sent to {to_phone}")
-                return True
-            else:
+            if response.status_code == 429 or response.status_code >= 500:
+                # Over quota or gateway trouble: a network-style error, so the outbox retries it
+                response.raise_for_status()
+            if response.status_code != 200 or not response.json().get('success'):
                 self.logger.warning(f"Failed to send SMS to {to_phone}: {response.text}")
                 raise ValueError(f"Failed to send SMS: {response.text}")
-        except ValueError as e:
-            self.logger.error(f"Validation error sending SMS to {to_phone}: {e}")
-            raise
-        except requests.RequestException as e:
-            self.logger.error(f"Network error sending SMS to {to_phone}: {e}")
-            raise
-        except Exception as e:
-            self.logger.error(f"Error sending SMS to {to_phone}: {e}")
+        except Exception:
+            with self._lock:
+                self.failed += 1
             raise
+        with self._lock:
+            self.sent += 1
+            self.throttled_seconds += waited
+            self._timings.append(elapsed_ms)
+    
+    def _pool(self) -> ThreadPoolExecutor:
+        """Return the worker pool, starting it on first use."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='sms-sender')
+            return self._executor
+    
+    def close(self) -> None:
+        """Stop the worker pool and close the gateway connections."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        self.session.close()
+    
+    def stats(self) -> dict:
+        """Return send counts, time spent waiting on the rate limit and request latency percentiles (ms)."""
+        with self._lock:
+            timings = sorted(self._timings)
+        
+        def percentile(fraction: float) -> float:
+            # Nearest rank, as in QueryStats
+            return round(timings[max(0, math.ceil(fraction * len(timings)) - 1)], 3) if timings else 0.0
+        
+        return {
+            'sent': self.sent,
+            'failed': self.failed,
+            'throttled_seconds': round(self.throttled_seconds, 3),
+            'p50_ms': percentile(0.50),
+            'p95_ms': percentile(0.95),
+            'max_ms': round(timings[-1], 3) if timings else 0.0
+        }
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
@@ -58,5 +188,12 @@ if __name__ == "__main__":
             "Your appointment is scheduled for tomorrow at 10:00 AM."
         )
         print(f"SMS sent: {success}")
+        results = sender.send_many([
+            ("+48123456780", "Your appointment is tomorrow at 9:00 AM."),
+            ("+48123456781", "Your appointment is tomorrow at 11:00 AM.")
+        ])
+        print(f"Batch errors: {results}")
+        print(sender.stats())
+        sender.close()
     except Exception as e:
-        print(f"Error: {e}")
\ No newline at end of file
+        print(f"Error: {e}")
@@ -1,8 +1,10 @@
 import unittest
 from src.backend.appointment_manager import AppointmentManager
 from src.backend.client_manager import ClientManager
+from src.backend.outbox import Outbox
 from src.utils.config import Config
-from src.database.db_operations import DatabaseOperations
+from src.database.db_operations import DatabaseOperations, ConnectionManager
+import json
 import os
 import shutil
 from datetime import datetime
@@ -28,14 +30,15 @@ class TestAppointmentManager(unittest.TestCase):
         # Initialize database
         self.db = DatabaseOperations(self.secrets_path, self.db_path)
         self.db.initialize_database()
-        self.client_manager = ClientManager(self.config_path, self.db_path)
-        self.manager = AppointmentManager(self.config_path, self.db_path)
+        self.client_manager = ClientManager(self.secrets_path, self.db_path)
+        self.manager = AppointmentManager(self.secrets_path, self.db_path)
         
         # Add a test client
         self.client_id = self.client_manager.add_client("Test Client", "1234567890", "test@example.com", "1990-01-01")
     
     def tearDown(self):
         """Clean up after each test."""
+        ConnectionManager.close_all_managers()
         if os.path.exists(self.test_dir):
             shutil.rmtree(self.test_dir)
     
@@ -78,5 +81,162 @@ class TestAppointmentManager(unittest.TestCase):
         self.assertEqual(len(appointments), 1)
         self.assertEqual(appointments[0].appointment_date, "2025-07-21")
 
+    def test_overlapping_slot_on_same_machine_rejected(self):
+        """Test that timed bookings use the service duration and cannot overlap on one machine."""
+        appointment_id = self.manager.schedule_appointment(
+            self.client_id, 1, 1, "2025-07-21", 1, 10.5, 50.0, start_time="10:00"
+        )
+        appointment = self.manager.get_appointment(appointment_id)
+        self.assertEqual((appointment.start_time, appointment.end_time), ("2025-07-21 10:00", "2025-07-21 11:00"))
+        with self.assertRaises(ValueError):
+            self.manager.schedule_appointment(self.client_id, 1, 2, "2025-07-21", 1, 10.5, 50.0,
+                                              start_time="10:30", duration_minutes=15)
+        self.assertGreater(self.manager.schedule_appointment(self.client_id, 1, 2, "2025-07-21", 1, 10.5, 50.0,
+                                                             start_time="11:00"), appointment_id)
+        self.assertIsNotNone(self.manager.schedule_appointment(self.client_id, 1, 3, "2025-07-21", 1, 10.5, 50.0,
+                                                               start_time="10:30", hardware_id=2))
+
+    def test_find_available_slots_respects_bookings_hours_and_spacing(self):
+        """Test that free slots avoid bookings, stay in opening hours and wait out the area's spacing rule."""
+        self.manager.schedule_appointment(self.client_id, 1, 1, "2025-07-21", 1, 10.5, 50.0, start_time="09:00")
+        self.manager.schedule_appointment(self.client_id, 1, 2, "2025-07-21", 1, 10.5, 50.0, start_time="10:30")
+        slots = self.manager.find_available_slots(self.client_id, [3], "2025-07-21", days=1, duration=60, limit=100)
+        starts = [slot['start_time'][-5:] for slot in slots]
+        self.assertEqual(starts[0], "11:30")  # packed against the 10:30 booking
+        self.assertNotIn("10:00", starts)  # 10:00-11:00 would overlap the 10:30 booking
+        self.assertEqual(max(slot['end_time'][-5:] for slot in slots), "18:00")
+        self.db.execute_query(
+            "INSERT INTO appointments (client_id, service_id, area_id, appointment_date, session_number_for_area, amount, "
+            "appointment_status) VALUES (?, 1, 3, '2025-07-14', 2, 50.0, 'Completed')", (self.client_id,)
+        )
+        slots = self.manager.find_available_slots(self.client_id, [3], "2025-07-21", days=60, duration=60, limit=1)
+        self.assertEqual(slots[0]["date"], "2025-08-25")  # 6 weeks after session 2
+
+    def test_earliest_dates_break_same_day_ties_by_latest_record(self):
+        """Test that of two completed sessions on one day, the later-recorded one sets the spacing."""
+        query = ("INSERT INTO appointments (client_id, service_id, area_id, appointment_date, session_number_for_area, amount, "
+                 "appointment_status) VALUES (?, 1, ?, '2025-07-14', ?, 50.0, 'Completed')")
+        for area_id, session_number in ((4, 1), (5, 1), (4, 2), (5, 2)):
+            self.db.execute_query(query, (self.client_id, area_id, session_number))
+        earliest = self.manager.earliest_dates_by_area(self.client_id, [4, 5])
+        self.assertEqual({area_id: date.strftime('%Y-%m-%d') for area_id, date in earliest.items()},
+                         {4: "2025-08-25", 5: "2025-08-25"})  # 6 weeks after session 2
+
+    def test_plan_next_sessions_persists_due_dates_and_reports_overdue(self):
+        """Test that the latest completed session per area gets its due date and unbooked late areas are overdue."""
+        query = ("INSERT INTO appointments (client_id, service_id, area_id, appointment_date, session_number_for_area, amount, "
+                 "appointment_status) VALUES (?, 1, ?, ?, ?, 50.0, ?)")
+        self.db.execute_query(query, (self.client_id, 1, "2025-01-10", 1, 'Completed'))
+        self.db.execute_query(query, (self.client_id, 1, "2025-02-12", 2, 'Completed'))
+        self.db.execute_query(query, (self.client_id, 2, "2025-02-12", 1, 'Completed'))
+        self.db.execute_query(query, (self.client_id, 2, "2025-04-01", 2, 'Scheduled'))
+        overdue = self.manager.plan_next_sessions(as_of="2025-04-01")
+        self.assertEqual([(row['area_id'], row['due_date'], row['days_overdue']) for row in overdue],
+                         [(1, "2025-03-26", 6)])  # 6 weeks after session 2; area 2 is already booked
+        due_dates = self.db.execute_query(
+            "SELECT area_id, appointment_date, next_suggested_appointment_date FROM appointments "
+            "WHERE appointment_status = 'Completed' ORDER BY appointment_id")
+        self.assertEqual([row['next_suggested_appointment_date'] for row in due_dates], [None, "2025-03-26", "2025-03-12"])
+        self.assertEqual(self.manager.plan_next_sessions(as_of="2025-03-01"), [])
+
+    def test_bulk_reschedule_moves_a_machine_day_to_free_slots(self):
+        """Test that a machine outage moves only that machine's bookings, keeping times where free."""
+        first = self.manager.schedule_appointment(self.client_id, 1, 1, "2025-07-21", 1, 10.5, 50.0, start_time="09:00")
+        second = self.manager.schedule_appointment(self.client_id, 1, 2, "2025-07-21", 1, 10.5, 50.0, start_time="10:30")
+        other_machine = self.manager.schedule_appointment(self.client_id, 1, 3, "2025-07-21", 1, 10.5, 50.0,
+                                                          start_time="09:00", hardware_id=2)
+        self.manager.schedule_appointment(self.client_id, 1, 4, "2025-07-22", 1, 10.5, 50.0, start_time="10:30")
+        result = self.manager.bulk_reschedule("2025-07-21", strategy='same_time', hardware_id=1)
+        self.assertEqual([(move['appointment_id'], move['start_time']) for move in result['moved']],
+                         [(first, "2025-07-22 09:00"), (second, "2025-07-23 10:30")])
+        self.assertEqual(result['unplaced'], [])
+        self.assertEqual(self.manager.get_appointment(first).appointment_status, "Rescheduled")
+        self.assertEqual(self.manager.get_appointment(other_machine).appointment_date, "2025-07-21")
+        with self.assertRaises(ValueError):
+            self.manager.bulk_reschedule("2025-07-21", strategy='shuffle')
+
+    def test_bulk_reschedule_reads_bookings_and_spacing_once(self):
+        """Test that a day's bulk move reads occupancy and spacing dates once and keeps new slots from colliding."""
+        client_ids = [self.client_id] + [self.client_manager.add_client(f"Moved {name}", f"60030000{i}", None, None)
+                                          for i, name in enumerate(("Ala", "Ewa", "Iga"))]
+        for hour, client_id in zip(("09:00", "10:00", "11:00", "12:00"), client_ids):
+            self.manager.schedule_appointment(client_id, 1, 1, "2030-01-14", 1, 10.5, 50.0, start_time=hour)
+        self.db.reset_stats()
+        result = self.manager.bulk_reschedule("2030-01-14", strategy='same_time')
+        self.assertEqual([move['start_time'] for move in result['moved']],
+                         ["2030-01-15 09:00", "2030-01-15 10:00", "2030-01-15 11:00", "2030-01-15 12:00"])
+        queries = [row['query'] for row in self.db.stats()]
+        self.assertEqual(sum('start_time >= ? AND start_time < ?' in query for query in queries), 1)
+        self.assertEqual(sum('PARTITION BY client_id, area_id' in query for query in queries), 1)
+        self.assertEqual(self.manager.bulk_reschedule("2030-01-15", strategy='earliest')['moved'][1]['start_time'],
+                         "2030-01-16 10:00")
+    
+    def test_schedule_visit_books_areas_back_to_back(self):
+        """Test that a multi-area visit checks spacing per area and books consecutive slots in one go."""
+        self.db.execute_query(
+            "INSERT INTO appointments (client_id, service_id, area_id, appointment_date, session_number_for_area, amount, "
+            "appointment_status) VALUES (?, 1, 2, '2025-07-01', 1, 50.0, 'Completed')", (self.client_id,)
+        )
+        with self.assertRaises(ValueError):
+            self.manager.schedule_visit(self.client_id, 1, "2025-07-21", [(1, 1, 10.0, 80.0), (2, 2, 12.0, 40.0)])
+        ids = self.manager.schedule_visit(self.client_id, 1, "2025-07-29",
+                                          [(1, 1, 10.0, 80.0, 30), (2, 2, 12.0, 40.0, 15)], start_time="09:00")
+        visit = [self.manager.get_appointment(appointment_id) for appointment_id in ids]
+        self.assertEqual([(a.area_id, a.start_time[-5:], a.end_time[-5:]) for a in visit],
+                         [(1, "09:00", "09:30"), (2, "09:30", "09:45")])
+        with self.assertRaises(ValueError):
+            self.manager.schedule_appointment(self.client_id, 1, 3, "2025-07-29", 1, 10.5, 50.0, start_time="09:30")
+
+    def test_schedule_visit_validates_every_area(self):
+        """Test that a visit rejects a bad session or area like a single booking would, and writes nothing."""
+        for areas, message in [([(1, 1, 10.0, 80.0), (2, 11, 12.0, 40.0)], "Session number"),
+                               ([(1, 1, 10.0, 80.0), (0, 1, 12.0, 40.0)], "Area ID"),
+                               ([(1, 1, 10.0, 80.0), ("2", 1, 12.0, 40.0)], "Area ID")]:
+            with self.assertRaisesRegex(ValueError, message):
+                self.manager.schedule_visit(self.client_id, 1, "2030-01-15", areas, start_time="09:00")
+        with self.assertRaisesRegex(ValueError, "YYYY-MM-DD"):
+            self.manager.schedule_visit(self.client_id, 1, "15/01/2030", [(1, 1, 10.0, 80.0)])
+        self.assertEqual(self.db.execute_query("SELECT appointment_id FROM appointments"), [])
+        self.assertEqual(self.db.execute_query("SELECT message_id FROM outbox"), [])
+    
+    def test_booking_queues_side_effects_in_its_transaction(self):
+        """Test that a booking queues its calendar event and reminders instead of sending them inline."""
+        appointment_id = self.manager.schedule_appointment(self.client_id, 1, 1, "2030-01-15", 1, 10.5, 50.0,
+                                                           start_time="09:00")
+        queued = self.db.execute_query("SELECT channel, idempotency_key FROM outbox ORDER BY message_id")
+        self.assertEqual([row['channel'] for row in queued], ['calendar', 'email', 'sms'])
+        self.assertEqual(queued[0]['idempotency_key'], f"calendar:{appointment_id}:0:2030-01-15 09:00")
+        with self.assertRaises(ValueError):
+            self.manager.schedule_appointment(self.client_id, 1, 2, "2030-01-15", 1, 10.5, 50.0, start_time="09:30")
+        self.assertEqual(len(self.db.execute_query("SELECT message_id FROM outbox")), 3)
+    
+    def test_reschedule_back_to_original_slot_queues_new_side_effects(self):
+        """Test that moving a booking A -> B -> A queues a calendar update and reminders for every move."""
+        appointment_id = self.manager.schedule_appointment(self.client_id, 1, 1, "2030-01-15", 1, 10.5, 50.0,
+                                                           start_time="09:00")
+        self.manager.reschedule_appointment(appointment_id, "2030-01-16")
+        self.manager.reschedule_appointment(appointment_id, "2030-01-15")
+        queued = self.db.execute_query("SELECT idempotency_key, payload FROM outbox WHERE channel = 'calendar' "
+                                       "ORDER BY message_id")
+        payloads = [json.loads(row['payload']) for row in queued]
+        self.assertEqual([payload['slot_start'] for payload in payloads],
+                         ["2030-01-15 09:00", "2030-01-16 09:00", "2030-01-15 09:00"])
+        # Each move replaces the event queued before it, and the appointment remembers the latest one
+        event_ids = [Outbox.event_id(row['idempotency_key']) for row in queued]
+        self.assertEqual([payload['replaces_event_id'] for payload in payloads], [None] + event_ids[:-1])
+        stored = self.db.execute_query("SELECT calendar_event_id FROM appointments WHERE appointment_id = ?",
+                                       (appointment_id,))
+        self.assertEqual(stored[0]['calendar_event_id'], event_ids[-1])
+        self.assertEqual(len(self.db.execute_query("SELECT message_id FROM outbox WHERE channel != 'calendar'")), 6)
+        result = self.manager.bulk_reschedule("2030-01-15")
+        self.assertEqual(len(result['moved']), 1)
+        queued = self.db.execute_query("SELECT idempotency_key, payload FROM outbox WHERE channel = 'calendar' "
+                                       "ORDER BY message_id")
+        self.assertEqual(len(queued), 4)
+        self.assertEqual(json.loads(queued[-1]['payload'])['replaces_event_id'], event_ids[-1])
+        stored = self.db.execute_query("SELECT calendar_event_id FROM appointments WHERE appointment_id = ?",
+                                       (appointment_id,))
+        self.assertEqual(stored[0]['calendar_event_id'], Outbox.event_id(queued[-1]['idempotency_key']))
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
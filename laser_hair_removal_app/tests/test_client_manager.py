@@ -1,7 +1,9 @@
 import unittest
 from src.backend.client_manager import ClientManager
+from src.backend.duplicate_detector import DuplicateDetector
+from src.utils.csv_importer import CSVImporter
 from src.utils.config import Config
-from src.database.db_operations import DatabaseOperations
+from src.database.db_operations import DatabaseOperations, ConnectionManager
 import os
 import shutil
 
@@ -26,10 +28,11 @@ class TestClientManager(unittest.TestCase):
         # Initialize database
         self.db = DatabaseOperations(self.secrets_path, self.db_path)
         self.db.initialize_database()
-        self.manager = ClientManager(self.config_path, self.db_path)
+        self.manager = ClientManager(self.secrets_path, self.db_path)
     
     def tearDown(self):
         """Clean up after each test."""
+        ConnectionManager.close_all_managers()
         if os.path.exists(self.test_dir):
             shutil.rmtree(self.test_dir)
     
@@ -61,6 +64,108 @@ class TestClientManager(unittest.TestCase):
         self.assertEqual(len(results), 1)
         self.assertEqual(results[0].full_name, "Alice Brown")
     
+    def test_search_clients_folds_polish_diacritics(self):
+        """Test FTS search by unaccented prefix, phone digits and email, and that edits reindex."""
+        client_id = self.db.add_client("Zofia NAPIERAŁA", "+48 123 456 789", "zofia.n@example.com", None)
+        self.db.add_client("Anna Żółć", "987654321", None, None)
+        for term in ("napierala", "napi", "ZOFIA nap", "123 45", "zofia.n"):
+            self.assertEqual([c.client_id for c in self.manager.search_clients(term)], [client_id], term)
+        self.assertEqual([c.full_name for c in self.manager.search_clients("zolc")], ["Anna Żółć"])
+        self.db.execute_query("UPDATE clients SET is_active = FALSE WHERE client_id = ?", (client_id,))
+        self.assertEqual(self.manager.search_clients("napierala"), [])
+    
+    def test_find_by_phone_any_format(self):
+        """Test caller lookup through the stored E.164 column, whatever the input format."""
+        client_id = self.db.add_client("Caller Id", "452793256", None, None)
+        for raw in ("452793256", "+48 452 793 256", "0048-452-793-256", "48452793256"):
+            self.assertEqual(self.manager.find_by_phone(raw).client_id, client_id, raw)
+        self.assertIsNone(self.manager.find_by_phone("+48 111 222 333"))
+        self.assertIsNone(self.manager.find_by_phone("not a phone"))
+        rejects = self.db.add_clients_bulk([("Same Phone", "+48 452-793-256", None, None)])['rejects']
+        self.assertEqual(rejects, [(0, "Duplicate phone_e164: +48452793256")])
+    
+    def test_iter_clients_is_lazy(self):
+        """Test that iter_clients yields clients page by page without building a list."""
+        names = [f"Lazy {letter}" for letter in "ABCDE"]
+        for i, name in enumerate(names):
+            self.db.add_client(name, f"88800000{i}", f"lazy{i}@example.com", "1990-01-01")
+        clients = self.manager.iter_clients("Lazy", page_size=2)
+        self.assertNotIsInstance(clients, list)
+        self.assertEqual([c.full_name for c in clients], names)
+    
+    def test_find_and_merge_duplicates(self):
+        """Test that a reordered, unaccented name with the same mailbox is queued and merges into the older record."""
+        keep_id = self.db.add_client("Anna Napierała", "452793256", "anna.napierala@example.com", None)
+        drop_id = self.db.add_client("Napierala Anna", "600 700 800", "annanapierala+spa@example.pl", "1990-01-01")
+        self.db.add_client("Ewa Nowak", "600100200", "ewa@example.com", None)
+        self.db.execute_query(
+            "INSERT INTO appointments (client_id, service_id, appointment_date, session_number_for_area, amount, appointment_status) "
+            "VALUES (?, 1, '2026-01-10', 1, 100.0, 'Completed')", (drop_id,)
+        )
+        queue = self.manager.find_duplicates()
+        self.assertEqual([(item['keep_id'], item['drop_id']) for item in queue], [(keep_id, drop_id)])
+        self.assertIn('same email mailbox', queue[0]['reasons'])
+        self.assertEqual(self.manager.merge_clients(keep_id, drop_id), 1)
+        clients = self.db.execute_query("SELECT client_id, dob FROM clients WHERE client_id IN (?, ?)", (keep_id, drop_id))
+        self.assertEqual(clients, [{'client_id': keep_id, 'dob': "1990-01-01"}])
+        appointments = self.db.execute_query("SELECT client_id FROM appointments")
+        self.assertEqual(appointments, [{'client_id': keep_id}])
+        self.assertEqual(self.manager.find_duplicates(), [])
+    
+    def test_csv_import_rejects_invalid_rows(self):
+        """Test that a CSV import stores the valid rows and rejects ones the Client model would not load."""
+        csv_path = f"{self.test_dir}/clients.csv"
+        with open(csv_path, 'w', encoding='utf-8') as f:
+            f.write("full_name,phone_number,email,dob\n"
+                    "Zofia Imported,600900100,zofia@example.com,1991-04-05\n"
+                    "Jan 3rd,call me,not-an-email,\n"
+                    "Olga Imported,600900200,olga.example.com,\n")
+        self.assertTrue(CSVImporter(self.config_path, self.secrets_path, self.db_path).import_clients(csv_path))
+        rows = self.db.execute_query("SELECT client_id, full_name FROM clients WHERE full_name LIKE '%Imported'")
+        self.assertEqual([row['full_name'] for row in rows], ["Zofia Imported"])
+        self.assertEqual(self.manager.get_client(rows[0]['client_id']).email, "zofia@example.com")
+    
+    def test_find_duplicates_skips_oversized_phone_block(self):
+        """Test that a phone shared by more than max_block_size clients yields no candidate pairs."""
+        # Only clients kept from before phone_e164 was unique can share a number, so block in memory
+        clients = {
+            client_id: {'phone': "+48221234567", 'email': None, 'email_local': None, 'dob': None,
+                        'trigrams': DuplicateDetector.trigrams(DuplicateDetector.fold_name(name))}
+            for client_id, name in enumerate(["Iga Wrona", "Olga Sikora", "Marta Zając", "Zofia Lis"], start=1)
+        }
+        self.assertEqual(DuplicateDetector(self.db, max_block_size=3)._candidate_pairs(clients), set())
+        self.assertEqual(len(DuplicateDetector(self.db, max_block_size=4)._candidate_pairs(clients)), 6)
+
+    def test_client_summary_aggregates_and_refreshes(self):
+        """Test per-area progress, spend and reminders, and that an appointment change refreshes the cached summary."""
+        client_id = self.db.add_client("Summary Client", "600200300", None, None)
+        query = ("INSERT INTO appointments (client_id, service_id, area_id, appointment_date, session_number_for_area, "
+                 "power, amount, appointment_status, next_suggested_appointment_date) VALUES (?, 1, ?, ?, ?, ?, ?, ?, ?)")
+        self.db.execute_query(query, (client_id, 1, "2026-01-05", 1, 10.0, 100.0, 'Completed', "2026-02-05"))
+        self.db.execute_query(query, (client_id, 1, "2026-02-05", 2, 12.0, 100.0, 'Completed', "2026-03-10"))
+        self.db.execute_query(query, (client_id, 2, "2026-03-01", 1, None, 60.0, 'Scheduled', None))
+        self.db.execute_query(
+            "INSERT INTO owner_reminders (reminder_type, related_id, due_date, reminder_date, message, delivery_method) "
+            "VALUES ('Visit', ?, '2026-03-10', '2026-03-09', 'Next session', 'SMS')", (client_id,)
+        )
+        # Client reminders are told apart by type, not delivery: a Popup visit reminder counts,
+        # an emailed insurance reminder for hardware with the same id does not
+        self.db.execute_query(
+            "INSERT INTO owner_reminders (reminder_type, related_id, due_date, reminder_date, message, delivery_method) "
+            "VALUES ('Visit', ?, '2026-03-20', '2026-03-19', 'Call back', 'Popup'), "
+            "('Insurance', ?, '2026-03-15', '2026-03-01', 'Renew insurance', 'Email')", (client_id, client_id)
+        )
+        summary = self.manager.get_client_summary(client_id)
+        self.assertEqual(summary['areas'], [{'area_id': 1, 'sessions_completed': 2, 'last_session_date': "2026-02-05",
+                                             'last_power': 12.0, 'next_suggested_date': "2026-03-10", 'spend': 200.0}])
+        self.assertEqual((summary['sessions_completed'], summary['total_spend']), (2, 200.0))
+        self.assertEqual([r['message'] for r in summary['outstanding_reminders']], ["Next session", "Call back"])
+        self.manager.get_client_summary(client_id)
+        self.assertGreaterEqual(self.db.cache_stats()['hits'], 1)
+        self.db.execute_query("UPDATE appointments SET appointment_status = 'Completed', power = 8.0 WHERE area_id = 2")
+        self.assertEqual(self.manager.get_client_summary(client_id)['total_spend'], 260.0)
+        self.assertIsNone(self.manager.get_client_summary(client_id + 1))
+
     def test_delete_client(self):
         """Test deleting a client."""
         client_id = self.manager.add_client("Charlie Black", "7777777777", "charlie@example.com", "1987-05-05")
@@ -1,7 +1,28 @@
 import unittest
-from src.database.db_operations import DatabaseOperations
+from src.database.db_operations import DatabaseOperations, ConnectionManager, QueryStats
+from src.database.db_backup import DatabaseBackup
+from src.database.db_setup import DatabaseSetup
+from src.backend.appointment_manager import AppointmentManager
+from src.backend.finance_manager import FinanceManager
+from src.utils.phone import normalize_phone
 import os
 import shutil
+import threading
+from pysqlcipher3 import dbapi2 as sqlite3
+
+class _PragmaConnection:
+    """Answers PRAGMA queries from a dict, like a connection to a given SQLCipher build."""
+    
+    def __init__(self, pragmas: dict):
+        self.pragmas = pragmas
+        self.row = None
+    
+    def execute(self, query: str):
+        self.row = self.pragmas.get(query.split()[-1])
+        return self
+    
+    def fetchone(self):
+        return self.row
 
 class TestDatabaseOperations(unittest.TestCase):
     """Test cases for the DatabaseOperations class."""
@@ -24,6 +45,7 @@ class TestDatabaseOperations(unittest.TestCase):
     
     def tearDown(self):
         """Clean up after each test."""
+        ConnectionManager.close_all_managers()
         if os.path.exists(self.test_dir):
             shutil.rmtree(self.test_dir)
     
@@ -38,6 +60,15 @@ class TestDatabaseOperations(unittest.TestCase):
         self.assertIsNotNone(cursor.fetchone())
         conn.close()
     
+    def test_migrations_recorded_and_idempotent(self):
+        """Test that migrations are tracked in schema_migrations and a rerun applies nothing."""
+        setup = DatabaseSetup("config/app_config.yaml", self.secrets_path, self.db_path)
+        latest_file_version = setup.get_migration_files()[-1][0]
+        self.assertEqual(DatabaseSetup.SCHEMA_VERSION, latest_file_version)
+        self.assertEqual(setup.get_schema_version(), latest_file_version)
+        self.assertEqual(sorted(setup.get_applied_migrations()), [v for v, _ in setup.get_migration_files()])
+        self.assertEqual(self.db.initialize_database(), [])
+    
     def test_add_client(self):
         """Test adding a client to the database."""
         client_id = self.db.add_client("Test Client", "1234567890", "test@example.com", "1990-01-01")
@@ -70,6 +101,272 @@ class TestDatabaseOperations(unittest.TestCase):
         count = cursor.fetchone()[0]
         self.assertEqual(count, 0)
         conn.close()
+    
+    def test_connections_shared_per_thread(self):
+        """Test that instances for the same database reuse one connection per thread."""
+        other = DatabaseOperations(self.secrets_path, self.db_path)
+        self.assertIs(other.get_connection(), self.db.get_connection())
+        stats = self.db.connection_stats()
+        self.assertEqual(stats['open_connections'], 1)
+        self.assertEqual(stats['connections_opened'], len(stats['open_times_ms']))
+    
+    def test_opens_database_created_with_passphrase(self):
+        """Test that a database keyed with the passphrase by another tool opens on every connection."""
+        path = f"{self.test_dir}/passphrase.db"
+        manager = ConnectionManager.for_database(self.secrets_path, path)
+        conn = sqlite3.connect(path)
+        conn.execute(f"PRAGMA key = {manager.passphrase_literal()}")
+        conn.execute("CREATE TABLE notes (body TEXT)")
+        conn.execute("INSERT INTO notes VALUES ('kept')")
+        conn.commit()
+        conn.close()
+        rows = [manager.get_connection().execute("SELECT body FROM notes").fetchall()]
+        reader = threading.Thread(target=lambda: rows.append(manager.get_connection().execute("SELECT body FROM notes").fetchall()))
+        reader.start()
+        reader.join()
+        self.assertEqual(rows, [[("kept",)], [("kept",)]])
+        self.assertEqual(manager.stats()['connections_opened'], 2)
+    
+    def test_kdf_settings_follow_linked_sqlcipher(self):
+        """Test that the raw key is derived with the KDF of the SQLCipher actually linked, or not at all."""
+        manager = self.db.connection_manager
+        sqlcipher_4 = {'cipher_version': ("4.5.6 community",), 'cipher_default_kdf_iter': (256000,),
+                       'cipher_default_kdf_algorithm': ("PBKDF2_HMAC_SHA512",)}
+        sqlcipher_3 = {'cipher_version': ("3.4.2",), 'cipher_default_kdf_iter': (64000,)}
+        self.assertEqual(manager._kdf_settings(_PragmaConnection(sqlcipher_4)), ('sha512', 256000))
+        self.assertEqual(manager._kdf_settings(_PragmaConnection(sqlcipher_3)), ('sha1', 64000))
+        self.assertIsNone(manager._kdf_settings(_PragmaConnection({})))
+    
+    def test_execute_query_reads_and_writes(self):
+        """Test that execute_query returns dict rows for reads and row counts for writes."""
+        client_id = self.db.add_client("Read Me", "4444444444", "read@example.com", "1990-01-01")
+        updated = self.db.execute_query("UPDATE clients SET email = ? WHERE client_id = ?", ("new@example.com", client_id))
+        self.assertEqual(updated, 1)
+        rows = self.db.execute_query("SELECT full_name, email FROM clients WHERE client_id = ?", (client_id,))
+        self.assertEqual(rows, [{'full_name': "Read Me", 'email': "new@example.com"}])
+        if not self.db.connection_manager.use_wal:
+            self.assertIs(self.db.get_reader_connection(), self.db.get_connection())
+    
+    def test_wal_reads_use_query_only_reader(self):
+        """Test that in WAL mode reads, including WITH queries, run on the query_only reader and see commits."""
+        ConnectionManager.close_all_managers()
+        db = DatabaseOperations(self.secrets_path, self.db_path)
+        db.connection_manager.journal_mode, db.connection_manager.use_wal = 'wal', True
+        client_id = db.add_client("Wal Reader", "3333333333", "wal@example.com", "1990-01-01")
+        self.assertEqual(db.get_connection().execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+        reader = db.get_reader_connection()
+        self.assertIsNot(reader, db.get_connection())
+        self.assertEqual(reader.execute("PRAGMA query_only").fetchone()[0], 1)
+        
+        cte = "WITH named AS (SELECT client_id, replace(full_name, 'Wal', 'WAL') AS name FROM clients) "
+        rows = db.execute_query(cte + "SELECT name FROM named WHERE client_id = ?", (client_id,))
+        self.assertEqual(rows, [{'name': "WAL Reader"}])
+        self.assertEqual(db.get_client(client_id)['full_name'], "Wal Reader")  # now cached
+        self.assertEqual(db.execute_query(cte + "UPDATE clients SET full_name = 'Renamed' "
+                                          "WHERE client_id IN (SELECT client_id FROM named)"), 1)
+        self.assertEqual(db.get_client(client_id)['full_name'], "Renamed")
+        with db.transaction():
+            db.execute_query("UPDATE clients SET email = ? WHERE client_id = ?", ("pending@example.com", client_id))
+            # Uncommitted work is only visible on the writer, so reads in a transaction go there
+            self.assertEqual(db.execute_query(cte + "SELECT c.email FROM clients c JOIN named USING (client_id)"),
+                             [{'email': "pending@example.com"}])
+            self.assertEqual(reader.execute("SELECT email FROM clients").fetchall(), [("wal@example.com",)])
+        self.assertEqual(db.connection_stats()['open_readers'], 1)
+    
+    def test_row_mapper_cached_per_description(self):
+        """Test that repeated reads with the same columns reuse one row mapper."""
+        self.db.add_client("Cache Me", "5555555555", "cache@example.com", "1990-01-01")
+        for _ in range(3):
+            rows = self.db.execute_query("SELECT client_id, full_name FROM clients")
+        self.assertEqual(rows[0]['full_name'], "Cache Me")
+        self.assertEqual(list(self.db._row_mappers), [('client_id', 'full_name')])
+    
+    def test_transaction_nests_with_savepoints(self):
+        """Test that a failed nested unit of work only rolls back its own rows."""
+        with self.db.transaction():
+            kept_id = self.db.add_client("Kept Client", "3333333333", "kept@example.com", "1990-01-01")
+            with self.assertRaises(Exception):
+                with self.db.transaction():
+                    self.db.add_client("Dropped Client", "2222222222", "dropped@example.com", "1990-01-01")
+                    self.db.add_client("Duplicate Phone", "2222222222", "dup@example.com", "1990-01-01")
+        rows = self.db.execute_query("SELECT client_id FROM clients ORDER BY client_id")
+        self.assertEqual([row['client_id'] for row in rows], [kept_id])
+        self.assertFalse(self.db.get_connection().in_transaction)
+    
+    def test_add_clients_bulk(self):
+        """Test bulk client insert returns ids in input order and per-row rejects."""
+        existing_id = self.db.add_client("Existing", "1111111111", "existing@example.com", "1990-01-01")
+        result = self.db.add_clients_bulk([
+            ("Bulk One", "6000000001", "one@example.com", "1990-01-01"),
+            ("Bulk Dup", "1111111111", None, None),
+            ("", "6000000002", None, None),
+            ("Bulk Two", "6000000003", None, "1990-02-30"),
+            ("Jan 3rd", "6000000005", None, None),
+            ("Bulk Four", "call me", None, None),
+            ("Bulk Five", "6000000006", "not-an-email", None),
+            ("Bulk Three", "6000000004", None, None)
+        ])
+        self.assertEqual(result['ids'], [existing_id + 1, None, None, None, None, None, None, existing_id + 2])
+        self.assertEqual([index for index, _ in result['rejects']], [1, 2, 3, 4, 5, 6])
+        self.assertEqual(dict(result['rejects'])[6], "Invalid email format")
+        rows = self.db.execute_query("SELECT full_name FROM clients WHERE client_id > ? ORDER BY client_id", (existing_id,))
+        self.assertEqual([row['full_name'] for row in rows], ["Bulk One", "Bulk Three"])
+    
+    def test_add_appointments_bulk(self):
+        """Test bulk appointment insert with status, area and machine slots, rejecting overlaps and bad values."""
+        client_id = self.db.add_client("Bulk Visits", "6000000010", None, None)
+        result = self.db.add_appointments_bulk([
+            (client_id, 1, 1, "2025-07-01", 1, 10.0, 100.0),
+            (client_id, 1, 2, "2025-06-01", 1, 10.0, 80.0, 'Completed'),
+            (client_id, 1, 2, "2025-06-02", 1, 10.0, 80.0, 'Done'),
+            (client_id, 1, 3, "2025-07-02", 1, None, 50.0, 'Scheduled', "2025-07-02 09:00", "2025-07-02 10:00", 1),
+            (client_id, 1, 4, "2025-07-02", 1, None, 50.0, 'Scheduled', "2025-07-02 09:30", "2025-07-02 10:30", 1),
+            (client_id, 1, 4, "2025-07-02", 1, None, 50.0, 'Scheduled', "2025-07-02 09:30", "2025-07-02 10:30", 2),
+            (client_id, 1, 5, "2025-07-02", 1, None, 50.0, 'Cancelled', "2025-07-02 09:00", "2025-07-02 10:00", 1),
+            (client_id, 1, 5, "2025-07-02", 1, None, 50.0, 'Scheduled', "2025-07-02 11:00", "2025-07-02 10:00", 1),
+            (client_id + 1, 1, 1, "2025-07-01", 1, None, 50.0)
+        ])
+        self.assertEqual([index for index, _ in result['rejects']], [2, 4, 7, 8])
+        stored = self.db.get_appointment(result['ids'][1])
+        self.assertEqual((stored['area_id'], stored['appointment_status'], stored['hardware_id']), (2, 'Completed', 1))
+        self.assertEqual(self.db.get_appointment(result['ids'][5])['start_time'], "2025-07-02 09:30")
+        clash = self.db.add_appointments_bulk([
+            (client_id, 1, 6, "2025-07-02", 1, None, 50.0, 'Scheduled', "2025-07-02 09:45", "2025-07-02 10:15", 1)
+        ])
+        self.assertEqual(clash['ids'], [None])
+    
+    def test_backup_copies_and_rotates(self):
+        """Test that online backups report progress and keep only the newest copies."""
+        self.db.add_client("Backed Up", "8888888888", "backup@example.com", "1990-01-01")
+        backup = DatabaseBackup(self.db, f"{self.test_dir}/backups")
+        backup.keep = 2
+        steps = []
+        for _ in range(3):
+            result = backup.run(lambda copied, total: steps.append((copied, total)))
+        self.assertTrue(os.path.exists(result['path']))
+        self.assertEqual(steps[-1][0], steps[-1][1])
+        backups = [f for f in os.listdir(backup.backup_dir) if f.endswith('.db')]
+        self.assertEqual(len(backups), 2)
+    
+    def test_backup_falls_back_to_export_off_the_reader(self):
+        """Test that without the backup API the export runs on a writable connection, even in WAL mode."""
+        ConnectionManager.close_all_managers()
+        db = DatabaseOperations(self.secrets_path, self.db_path)
+        db.connection_manager.journal_mode, db.connection_manager.use_wal = 'wal', True
+        db.add_client("Exported", "8888888880", None, None)
+        backup = DatabaseBackup(db, f"{self.test_dir}/backups")
+        backup._supports_backup_api = lambda conn: False
+        self.assertEqual(db.get_reader_connection().execute("PRAGMA query_only").fetchone()[0], 1)
+        export_conn = db.connection_manager.open_connection()
+        self.assertEqual(export_conn.execute("PRAGMA query_only").fetchone()[0], 0)
+        export_conn.close()
+        if not db.get_connection().execute("PRAGMA cipher_version").fetchone():
+            self.skipTest("sqlcipher_export needs SQLCipher")
+        steps = []
+        result = backup.run(lambda copied, total: steps.append((copied, total)))
+        self.assertEqual(steps[0][0], 0)
+        self.assertEqual(steps[-1], (result['pages'], result['pages']))
+        copy = sqlite3.connect(result['path'])
+        copy.execute(f"PRAGMA key = {db.connection_manager.passphrase_literal()}")
+        self.assertEqual(copy.execute("SELECT full_name FROM clients").fetchall(), [("Exported",)])
+        copy.close()
+    
+    def test_hot_queries_use_indexes(self):
+        """Test via EXPLAIN QUERY PLAN that the statements the managers issue for hot lookups never scan a table."""
+        client_id = self.db.add_client("Hot Path", "5551234567", "hot@example.com", "1990-01-01")
+        appointments = AppointmentManager(self.secrets_path, self.db_path)
+        finance = FinanceManager(self.secrets_path, self.db_path)
+        hot_calls = {
+            'get_previous_appointment': lambda: appointments.get_previous_appointment(client_id, 1),
+            'get_appointments_by_date': lambda: appointments.get_appointments_by_date("2025-07-21"),
+            'get_revenue_by_date': lambda: finance.get_revenue_by_date("2025-07-01", "2025-07-31")
+        }
+        # A zero threshold makes QueryStats explain every statement it times
+        self.db.connection_manager.query_stats.slow_query_ms = 0
+        for name, call in hot_calls.items():
+            self.db.reset_stats()
+            call()
+            plans = [row['plan'] for row in self.db.stats()]
+            self.assertTrue(plans, f"{name} issued no statements")
+            for details in plans:
+                self.assertFalse(any(detail.lstrip().startswith('SCAN') for detail in details), f"{name}: {details}")
+                self.assertFalse(any('TEMP B-TREE' in detail for detail in details), f"{name}: {details}")
+        # ReminderManager.get_due_reminders' statement, planned directly as its model module does not import here
+        due_reminders = self.db.execute_query(
+            "EXPLAIN QUERY PLAN SELECT * FROM owner_reminders WHERE reminder_date <= ? AND is_active = TRUE",
+            ("2025-07-21",)
+        )
+        details = [row['detail'] for row in due_reminders]
+        self.assertTrue(any('idx_owner_reminders_active_reminder_date' in detail for detail in details), details)
+        self.assertFalse(any(detail.lstrip().startswith('SCAN') for detail in details), details)
+    
+    def test_phone_e164_matches_python_normalization(self):
+        """Test that the stored phone_e164 agrees with normalize_phone for every input shape."""
+        for raw in ("452793256", "+48 123 456 789", "0048 223-456-789", "48323456789",
+                    "(42) 345 67 89", "+1 (212) 555-0100", "12", "+48 12a 456 789"):
+            client_id = self.db.add_client("Phone Shape", raw, None, None)
+            stored = self.db.execute_query("SELECT phone_e164 FROM clients WHERE client_id = ?", (client_id,))
+            self.assertEqual(stored[0]['phone_e164'], normalize_phone(raw), raw)
+    
+    def test_keyset_pages_and_iterators(self):
+        """Test that page_after walks the key range and iter_clients streams every match."""
+        # Names spell the index in letters (1 -> "b", 12 -> "bc"), as client names cannot hold digits
+        letters = str.maketrans('0123456789', 'abcdefghij')
+        page_name = lambda i: f"Page {str(i).translate(letters)}"
+        self.db.add_clients_bulk([(page_name(i), f"70000000{i:02d}", None, None) for i in range(25)])
+        first = self.db.page_after('clients', 0, 10)
+        second = self.db.page_after('clients', first[-1]['client_id'], 10)
+        self.assertEqual(len(first), 10)
+        self.assertGreater(second[0]['client_id'], first[-1]['client_id'])
+        names = [row['full_name'] for row in self.db.iter_clients("Page b", page_size=4)]
+        self.assertEqual(names, [page_name(1)] + [page_name(i) for i in range(10, 20)])
+        self.assertEqual(len(list(self.db.iter_clients(page_size=7))), 25)
+        with self.assertRaises(ValueError):
+            self.db.page_after('inventory', 0, 10)
+    
+    def test_query_stats_group_by_shape_and_capture_slow_plans(self):
+        """Test that execute_query timings are grouped by shape and slow ones keep their plan."""
+        self.db.reset_stats()
+        self.db.connection_manager.query_stats.slow_query_ms = 0
+        for client_id in (1, 2, 3):
+            self.db.execute_query("SELECT * FROM clients WHERE client_id = ?", (client_id,))
+        self.db.execute_query("SELECT * FROM clients WHERE client_id = 42")
+        stats = {row['query']: row for row in self.db.stats()}
+        row = stats["SELECT * FROM clients WHERE client_id = ?"]
+        self.assertEqual(row['count'], 4)
+        self.assertLessEqual(row['p50_ms'], row['p95_ms'])
+        self.assertLessEqual(row['p95_ms'], row['max_ms'])
+        self.assertTrue(any('clients' in line for line in row['plan']))
+        self.assertEqual(len(self.db.slow_queries()), 4)
+        
+        # Shapes are memoized by query text; inlined literals must not grow the memo without bound
+        query_stats = QueryStats(slow_query_ms=float('inf'))
+        for client_id in range(QueryStats.SHAPE_CACHE_SIZE + 10):
+            query_stats.record(None, f"SELECT * FROM clients WHERE client_id = {client_id}", (), 0.001)
+        self.assertLessEqual(len(query_stats._shape_cache), QueryStats.SHAPE_CACHE_SIZE)
+        self.assertEqual([row['count'] for row in query_stats.snapshot()], [QueryStats.SHAPE_CACHE_SIZE + 10])
+
+    def test_identity_map_caches_and_invalidates_on_write(self):
+        """Test that repeated get_client calls hit the shared cache and writes or rollbacks are not served stale."""
+        client_id = self.db.add_client("Cached Client", "6000000001", None, None)
+        other = DatabaseOperations(self.secrets_path, self.db_path)
+        self.db.reset_stats()
+        self.assertEqual(self.db.get_client(client_id)['full_name'], "Cached Client")
+        self.assertEqual(other.get_client(client_id)['full_name'], "Cached Client")
+        self.assertEqual((self.db.cache_stats()['hits'], self.db.cache_stats()['misses']), (1, 1))
+        self.db.execute_query("UPDATE clients SET full_name = 'Renamed' WHERE client_id = ?", (client_id,))
+        self.assertEqual(other.get_client(client_id)['full_name'], "Renamed")
+        with self.assertRaises(RuntimeError):
+            with self.db.transaction():
+                self.db.update_client(client_id, "Uncommitted", "6000000001", None, None)
+                self.assertEqual(self.db.get_client(client_id)['full_name'], "Uncommitted")
+                raise RuntimeError("roll back")
+        self.assertEqual(self.db.get_client(client_id)['full_name'], "Renamed")
+        self.db.connection_manager.identity_map.capacity = 1
+        second_id = self.db.add_client("Second Client", "6000000002", None, None)
+        self.db.get_client(second_id)
+        self.assertEqual(self.db.cache_stats()['size'], 1)
+        self.assertGreaterEqual(self.db.cache_stats()['evictions'], 1)
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
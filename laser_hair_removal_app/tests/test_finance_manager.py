@@ -3,7 +3,7 @@ from src.backend.finance_manager import FinanceManager
 from src.backend.appointment_manager import AppointmentManager
 from src.backend.client_manager import ClientManager
 from src.utils.config import Config
-from src.database.db_operations import DatabaseOperations
+from src.database.db_operations import DatabaseOperations, ConnectionManager
 import os
 import shutil
 from datetime import datetime
@@ -29,9 +29,9 @@ class TestFinanceManager(unittest.TestCase):
         # Initialize database
         self.db = DatabaseOperations(self.secrets_path, self.db_path)
         self.db.initialize_database()
-        self.client_manager = ClientManager(self.config_path, self.db_path)
-        self.appointment_manager = AppointmentManager(self.config_path, self.db_path)
-        self.manager = FinanceManager(self.config_path, self.db_path)
+        self.client_manager = ClientManager(self.secrets_path, self.db_path)
+        self.appointment_manager = AppointmentManager(self.secrets_path, self.db_path)
+        self.manager = FinanceManager(self.secrets_path, self.db_path)
         
         # Add a test client and appointment
         self.client_id = self.client_manager.add_client("Test Client", "1234567890", "test@example.com", "1990-01-01")
@@ -41,6 +41,7 @@ class TestFinanceManager(unittest.TestCase):
     
     def tearDown(self):
         """Clean up after each test."""
+        ConnectionManager.close_all_managers()
         if os.path.exists(self.test_dir):
             shutil.rmtree(self.test_dir)
     
@@ -65,6 +66,39 @@ class TestFinanceManager(unittest.TestCase):
         profit = self.manager.get_profit_by_date("2025-07-20", "2025-07-20")
         self.assertEqual(profit, 80.0)  # 100.0 revenue - 20.0 expense
     
+    def test_daily_finance_follows_status_changes(self):
+        """Test that the daily_finance rollup tracks completions and matches a rebuild."""
+        self.db.execute_query(
+            "UPDATE appointments SET appointment_status = 'Completed', amount = 120.0 WHERE appointment_id = ?",
+            (self.appointment_id,)
+        )
+        self.db.execute_query("INSERT INTO expenses (expense_date, amount) VALUES (?, ?)", ("2025-07-20", 20.0))
+        self.assertEqual(self.manager.get_revenue_by_date("2025-07-20", "2025-07-20"), 120.0)
+        self.assertEqual(self.manager.get_profit_by_date("2025-07-01", "2025-07-31"), 100.0)
+        rollup = self.db.execute_query("SELECT * FROM daily_finance ORDER BY day")
+        self.assertEqual(self.manager.rebuild_daily_finance(), 1)
+        self.assertEqual(self.db.execute_query("SELECT * FROM daily_finance ORDER BY day"), rollup)
+        self.db.execute_query(
+            "UPDATE appointments SET appointment_status = 'Cancelled' WHERE appointment_id = ?", (self.appointment_id,)
+        )
+        self.assertEqual(self.manager.get_revenue_by_date("2025-07-20", "2025-07-20"), 0.0)
+    
+    def test_get_pnl_buckets(self):
+        """Test P&L grouping by day, Monday-based week and month."""
+        self.db.execute_query(
+            "UPDATE appointments SET appointment_status = 'Completed' WHERE appointment_id = ?", (self.appointment_id,)
+        )
+        self.db.execute_query("INSERT INTO expenses (expense_date, amount) VALUES (?, ?)", ("2025-07-21", 30.0))
+        days = self.manager.get_pnl("2025-07-01", "2025-07-31", 'day')
+        self.assertEqual([row['period'] for row in days], ["2025-07-20", "2025-07-21"])
+        weeks = self.manager.get_pnl("2025-07-01", "2025-07-31", 'week')
+        self.assertEqual([row['period'] for row in weeks], ["2025-07-14", "2025-07-21"])
+        month, = self.manager.get_pnl("2025-07-01", "2025-07-31", 'month')
+        self.assertEqual((month['period'], month['revenue'], month['expenses'], month['profit'], month['appointment_count']),
+                         ("2025-07-01", 100.0, 30.0, 70.0, 1))
+        with self.assertRaises(ValueError):
+            self.manager.get_pnl("2025-07-01", "2025-07-31", 'year')
+    
     def test_get_client_activity_report(self):
         """Test generating a client activity report."""
         self.appointment_manager.schedule_appointment(
@@ -1,7 +1,7 @@
 import unittest
 from src.backend.hardware_manager import HardwareManager
 from src.utils.config import Config
-from src.database.db_operations import DatabaseOperations
+from src.database.db_operations import DatabaseOperations, ConnectionManager
 import os
 import shutil
 from datetime import datetime
@@ -24,10 +24,11 @@ class TestHardwareManager(unittest.TestCase):
         
         self.db = DatabaseOperations(self.secrets_path, self.db_path)
         self.db.initialize_database()
-        self.manager = HardwareManager(self.config_path, self.db_path)
+        self.manager = HardwareManager(self.secrets_path, self.db_path)
     
     def tearDown(self):
         """Clean up after each test."""
+        ConnectionManager.close_all_managers()
         if os.path.exists(self.test_dir):
             shutil.rmtree(self.test_dir)
     
@@ -1,7 +1,7 @@
 import unittest
 from src.backend.inventory_manager import InventoryManager
 from src.utils.config import Config
-from src.database.db_operations import DatabaseOperations
+from src.database.db_operations import DatabaseOperations, ConnectionManager
 import os
 import shutil
 
@@ -23,10 +23,11 @@ class TestInventoryManager(unittest.TestCase):
         
         self.db = DatabaseOperations(self.secrets_path, self.db_path)
         self.db.initialize_database()
-        self.manager = InventoryManager(self.config_path, self.db_path)
+        self.manager = InventoryManager(self.secrets_path, self.db_path)
     
     def tearDown(self):
         """Clean up after each test."""
+        ConnectionManager.close_all_managers()
         if os.path.exists(self.test_dir):
             shutil.rmtree(self.test_dir)
     
@@ -0,0 +1,131 @@
+import unittest
+from src.backend.outbox import Outbox, OutboxDispatcher
+from src.database.db_operations import DatabaseOperations, ConnectionManager
+import os
+import shutil
+
+class FakeCalendar:
+    """Records batched event inserts and deletes; the first delete_fails deletes fail."""
+
+    def __init__(self, delete_fails: int = 0):
+        self.batches = []
+        self.deleted = []
+        self.delete_fails = delete_fails
+
+    def add_events(self, events):
+        self.batches.append(events)
+        return [event[5] for event in events]
+
+    def delete_events(self, event_ids):
+        if self.delete_fails:
+            self.delete_fails -= 1
+            raise ConnectionError("Calendar API unreachable")
+        self.deleted.extend(event_ids)
+        return [True for _ in event_ids]
+
+class FlakyEmail:
+    """Fails with a network error on the first batch, then succeeds."""
+
+    def __init__(self):
+        self.sent = []
+        self.batches = 0
+
+    def send_batch(self, messages):
+        self.batches += 1
+        if self.batches == 1:
+            return [ConnectionError("SMTP server unreachable") for _ in messages]
+        self.sent.extend(to_email for to_email, _, _ in messages)
+        return [None for _ in messages]
+
+    def close(self):
+        pass
+
+class MisconfiguredSMS:
+    """Rejects every message the way SMSSender does without a gateway."""
+
+    def send_many(self, messages):
+        return [ValueError("SMS gateway or API key not configured") for _ in messages]
+
+    def close(self):
+        pass
+
+class TestOutbox(unittest.TestCase):
+    """Test cases for the Outbox queue and OutboxDispatcher."""
+
+    def setUp(self):
+        """Set up test environment before each test."""
+        self.test_dir = "test_data"
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.secrets_path = f"{self.test_dir}/secrets.yaml"
+        self.db_path = f"{self.test_dir}/test_database.db"
+        with open(self.secrets_path, 'w') as f:
+            f.write("database:\n  encryption_key: testkey12345678901234567890123456789012\n")
+        self.db = DatabaseOperations(self.secrets_path, self.db_path)
+        self.db.initialize_database()
+        self.outbox = Outbox(self.db)
+
+    def tearDown(self):
+        """Clean up after each test."""
+        ConnectionManager.close_all_managers()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_enqueue_is_idempotent_and_transactional(self):
+        """Test that a repeated key is ignored and a rolled-back transaction leaves nothing queued."""
+        self.assertTrue(self.outbox.enqueue('sms', "sms:reminder:1", {'to': "600100200", 'message': "Hi"}))
+        self.assertFalse(self.outbox.enqueue('sms', "sms:reminder:1", {'to': "600100200", 'message': "Hi"}))
+        with self.assertRaises(RuntimeError):
+            with self.db.transaction():
+                self.outbox.enqueue('email', "email:reminder:2", {'to': "a@example.com", 'subject': "S", 'message': "M"})
+                raise RuntimeError("booking failed")
+        self.assertEqual(self.outbox.counts(), {'pending': 1})
+        with self.assertRaises(ValueError):
+            self.outbox.enqueue('fax', "fax:1", {})
+
+    def test_dispatch_batches_retries_and_gives_up_on_permanent_errors(self):
+        """Test calendar batching, backoff after a network error and immediate failure on a ValueError."""
+        calendar, email = FakeCalendar(), FlakyEmail()
+        dispatcher = OutboxDispatcher(self.db, calendar, email, MisconfiguredSMS())
+        for appointment_id in (1, 2):
+            self.outbox.enqueue('calendar', f"calendar:{appointment_id}:2030-01-15 09:00", {
+                'appointment_id': appointment_id, 'appointment_date': "2030-01-15", 'client_name': "Anna",
+                'slot_start': "2030-01-15 09:00", 'slot_end': "2030-01-15 10:00"})
+        self.outbox.enqueue('email', "email:reminder:1", {'to': "anna@example.com", 'subject': "S", 'message': "M"})
+        self.outbox.enqueue('sms', "sms:reminder:1", {'to': "600100200", 'message': "M"})
+
+        self.assertEqual(dispatcher.dispatch_once(), 4)
+        self.assertEqual(len(calendar.batches), 1)
+        self.assertEqual(calendar.batches[0][0][5], Outbox.event_id("calendar:1:2030-01-15 09:00"))
+        rows = {row['channel']: row for row in self.db.execute_query(
+            "SELECT channel, status, attempts, next_attempt_at > datetime('now') AS deferred FROM outbox "
+            "WHERE channel != 'calendar'")}
+        self.assertEqual((rows['email']['status'], rows['email']['attempts'], rows['email']['deferred']), ('pending', 1, 1))
+        self.assertEqual((rows['sms']['status'], rows['sms']['attempts']), ('failed', 1))
+        self.assertEqual(dispatcher.dispatch_once(), 0)  # the email is backing off
+
+        self.db.execute_query("UPDATE outbox SET next_attempt_at = datetime('now') WHERE channel = 'email'")
+        self.assertEqual(dispatcher.dispatch_once(), 1)
+        self.assertEqual(email.sent, ["anna@example.com"])
+        self.assertEqual(self.outbox.counts(), {'sent': 3, 'failed': 1})
+        self.assertEqual(self.outbox.requeue_failed(), 1)
+
+    def test_rescheduled_event_replaces_the_previous_one(self):
+        """Test that the event a calendar message replaces is deleted after the insert, and retried if that fails."""
+        calendar = FakeCalendar(delete_fails=1)
+        dispatcher = OutboxDispatcher(self.db, calendar)
+        old_event_id = Outbox.event_id("calendar:1:0:2030-01-15 09:00")
+        self.outbox.enqueue('calendar', "calendar:1:1:2030-01-16 09:00", {
+            'appointment_id': 1, 'appointment_date': "2030-01-16", 'client_name': "Anna",
+            'slot_start': "2030-01-16 09:00", 'slot_end': "2030-01-16 10:00", 'replaces_event_id': old_event_id})
+
+        self.assertEqual(dispatcher.dispatch_once(), 1)
+        self.assertEqual(calendar.deleted, [])
+        self.assertEqual(self.outbox.counts(), {'pending': 1})
+        self.db.execute_query("UPDATE outbox SET next_attempt_at = datetime('now')")
+        self.assertEqual(dispatcher.dispatch_once(), 1)
+        self.assertEqual(len(calendar.batches), 2)  # the repeated insert reuses the key's event id
+        self.assertEqual(calendar.deleted, [old_event_id])
+        self.assertEqual(self.outbox.counts(), {'sent': 1})
+
+if __name__ == "__main__":
+    unittest.main()